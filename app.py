@@ -6,12 +6,41 @@ import plotly.graph_objects as go
 from datetime import datetime, timedelta
 import time
 import json
+import os
 
 # Import our modules
-from fraudguard_app.components.fraud_detector import FraudDetector
-from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+from fraudguard_app.components.scoring_backend import ScoringBackend
+from fraudguard_app.components.alert_bus import AlertBus, FileSink, HttpSink
+from fraudguard_app.components.fraud_detector import MAX_FLAG_FRACTION
+from fraudguard_app.components.model_backends import BACKENDS, create_backend
+from fraudguard_app.components.risk_rules import RuleError
 from fraudguard_app.data.data_generator import generate_transaction_stream
 
+# Registry snapshot location and registry view settings
+SNAPSHOT_DIR = "snapshots/registry"
+PAGE_SIZE = 50
+# Rows shown in the Recent Transactions table
+RECENT_TRANSACTIONS = 10
+TIME_WINDOWS = {
+    "All time": None,
+    "Last 5 minutes": timedelta(minutes=5),
+    "Last hour": timedelta(hours=1),
+    "Last 24 hours": timedelta(days=1),
+}
+# Fraud trend chart ranges and the most points it draws
+TREND_RANGES = {
+    "Last 5 minutes": timedelta(minutes=5),
+    "Last hour": timedelta(hours=1),
+    "Last 24 hours": timedelta(days=1),
+    "Last 30 days": timedelta(days=30),
+    "Last year": timedelta(days=365),
+}
+TREND_POINTS = 200
+# Alert delivery: always appended to a local file, and POSTed to a webhook if
+# FRAUDGUARD_ALERT_WEBHOOK is set
+ALERT_LOG = "alerts/alerts.jsonl"
+ALERT_WEBHOOK = os.environ.get("FRAUDGUARD_ALERT_WEBHOOK")
+
 # Page config
 st.set_page_config(
     page_title="FraudGuard Labs",
@@ -94,24 +123,55 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state
-if 'detector' not in st.session_state:
-    st.session_state.detector = FraudDetector()
-    
-if 'risk_registry' not in st.session_state:
-    st.session_state.risk_registry = RiskScoreRegistry()
-    
-if 'fraud_registry' not in st.session_state:
-    st.session_state.fraud_registry = FraudFlagRegistry()
-    
-if 'audit_trail' not in st.session_state:
-    st.session_state.audit_trail = AuditTrail()
+@st.cache_resource
+def get_backend():
+    """Create the scoring backend shared by every session in this process"""
+    sinks = [FileSink(ALERT_LOG)]
+    if ALERT_WEBHOOK:
+        sinks.append(HttpSink(ALERT_WEBHOOK))
+    return ScoringBackend(alert_bus=AlertBus(sinks))
 
-if 'transaction_data' not in st.session_state:
-    st.session_state.transaction_data = []
+backend = get_backend()
+view = backend.view()
 
-if 'alerts' not in st.session_state:
-    st.session_state.alerts = []
+# Initialize session state (UI state only; data lives in the shared backend)
+if 'registry_view' not in st.session_state:
+    st.session_state.registry_view = None
+
+def render_registry_page(registry_view):
+    """Render one page of a registry view using the registry query API"""
+    filter_col1, filter_col2, filter_col3, filter_col4 = st.columns(4)
+    filters = {}
+    with filter_col1:
+        tx_id_prefix = st.text_input("Transaction ID prefix", key=f"{registry_view}_prefix")
+        if tx_id_prefix:
+            filters['tx_id_prefix'] = tx_id_prefix
+    with filter_col2:
+        time_window = st.selectbox("Time range", list(TIME_WINDOWS), key=f"{registry_view}_window")
+        if TIME_WINDOWS[time_window] is not None:
+            filters['start_time'] = datetime.now() - TIME_WINDOWS[time_window]
+    sort_fields = ['timestamp', 'tx_id']
+    if registry_view != 'fraud_flags':
+        sort_fields.insert(1, 'risk_score')
+        with filter_col3:
+            risk_range = st.slider("Risk range", 0.0, 1.0, (0.0, 1.0), key=f"{registry_view}_risk")
+            if risk_range != (0.0, 1.0):
+                filters['min_risk'], filters['max_risk'] = risk_range
+            if st.checkbox("Flagged only", key=f"{registry_view}_flagged"):
+                filters['flagged_only'] = True
+    with filter_col4:
+        sort_by = st.selectbox("Sort by", sort_fields, key=f"{registry_view}_sort")
+        descending = st.checkbox("Descending", value=True, key=f"{registry_view}_desc")
+        page_number = st.number_input("Page", min_value=1, value=1, key=f"{registry_view}_page")
+    
+    result = view.query_registry(registry_view, sort_by=sort_by, descending=descending,
+                                 offset=(page_number - 1) * PAGE_SIZE, limit=PAGE_SIZE, **filters)
+    if result['total'] is not None:
+        num_pages = max(1, (result['total'] + PAGE_SIZE - 1) // PAGE_SIZE)
+        st.caption(f"{result['total']} matching entries - page {page_number} of {num_pages}")
+    else:
+        st.caption(f"Page {page_number}" + (" - more results available" if result['has_more'] else ""))
+    st.dataframe(pd.DataFrame(result['items']), use_container_width=True)
 
 # Title and header
 st.markdown("<h1 class='header'>🛡️ FraudGuard Labs - Real-Time Fraud Detection</h1>", unsafe_allow_html=True)
@@ -135,8 +195,35 @@ with st.sidebar:
     
     # Model settings
     st.markdown("### 🤖 AI Model")
-    sensitivity = st.slider("Fraud Sensitivity", 0.0, 1.0, 0.5)
-    
+    # Each session keeps its own sensitivity and applies it when displaying
+    # results; the shared detector keeps flagging at its default
+    sensitivity = st.slider("Fraud Sensitivity", 0.0, 1.0, backend.detector.sensitivity, key="sensitivity")
+    st.caption(f"Flags decision scores below {backend.detector.threshold_for(sensitivity):.3f} "
+               f"(~{sensitivity * MAX_FLAG_FRACTION:.0%} of traffic)")
+
+    # Pick up edits to the risk rule table on every rerun
+    try:
+        if backend.detector.rules.reload_if_changed():
+            st.info("Risk rules reloaded")
+    except RuleError as e:
+        st.error(f"Risk rule table not reloaded, keeping the previous rules: {e}")
+    st.caption(f"{len(backend.detector.rules.ruleset)} risk rules active")
+
+    # Challenger model shadow-scoring live traffic next to the champion
+    shadow = backend.detector.shadow
+    challenger_options = ["None"] + sorted(BACKENDS)
+    challenger = st.selectbox("Shadow Challenger", challenger_options,
+                              index=challenger_options.index(shadow.challenger.name) if shadow else 0)
+    if challenger == "None" and shadow is not None:
+        backend.detector.stop_shadow()
+    elif challenger != "None" and (shadow is None or shadow.challenger.name != challenger):
+        with st.spinner(f"Training {challenger} challenger..."):
+            backend.detector.start_shadow(create_backend(challenger))
+    shadow_stats = backend.detector.backend_stats()['shadow']
+    if shadow_stats and shadow_stats['rows']:
+        st.caption(f"Challenger agrees on {shadow_stats['agreement']:.1%} of "
+                   f"{shadow_stats['rows']:,} transactions")
+
     # Blockchain simulation
     st.markdown("### 🔗 Blockchain")
     enable_blockchain = st.checkbox("Enable Blockchain Simulation", value=True)
@@ -147,57 +234,9 @@ with st.sidebar:
         # Generate transactions
         new_transactions = generate_transaction_stream(num_transactions)
         
-        # Process each transaction
+        # Process each transaction through the shared backend
         for tx in new_transactions:
-            # Get fraud prediction
-            is_fraud, risk_score = st.session_state.detector.predict(tx)
-            
-            # Store in registries if enabled
-            if enable_blockchain:
-                tx_id = tx['transaction_id']
-                st.session_state.risk_registry.store_risk(tx_id, risk_score)
-                if is_fraud:
-                    st.session_state.fraud_registry.flag_fraud(tx_id, "High risk score detected")
-                st.session_state.audit_trail.log_audit(tx_id, risk_score, datetime.now())
-                
-                # Add blockchain transaction info
-                if is_fraud:
-                    # Simulate blockchain transaction hash
-                    import hashlib
-                    hash_input = f"{tx_id}{risk_score}{datetime.now().timestamp()}".encode()
-                    tx_hash = "0x" + hashlib.sha256(hash_input).hexdigest()[:64]
-                    
-                    # Store transaction hash in session state
-                    if 'blockchain_txs' not in st.session_state:
-                        st.session_state.blockchain_txs = []
-                    
-                    st.session_state.blockchain_txs.append({
-                        'transaction_id': tx_id,
-                        'blockchain_tx_hash': tx_hash,
-                        'timestamp': datetime.now()
-                    })
-            
-            # Add to transaction data
-            tx_record = {
-                "timestamp": datetime.now(),
-                "transaction_id": tx['transaction_id'],
-                "amount": tx['amount'],
-                "merchant": tx['merchant'],
-                "category": tx['category'],
-                "risk_score": risk_score,
-                "is_fraud": is_fraud
-            }
-            st.session_state.transaction_data.append(tx_record)
-            
-            # Add to alerts if fraudulent
-            if is_fraud:
-                alert = {
-                    "timestamp": datetime.now(),
-                    "transaction_id": tx['transaction_id'],
-                    "risk_score": risk_score,
-                    "reason": "High risk score detected"
-                }
-                st.session_state.alerts.append(alert)
+            backend.process_transaction(tx, enable_blockchain=enable_blockchain)
                 
             # Wait based on speed setting
             if processing_speed == "Slow":
@@ -210,28 +249,51 @@ with st.sidebar:
         st.success(f"Processed {num_transactions} transactions!")
     
     if st.button("🧹 Clear Data", key="clear"):
-        st.session_state.transaction_data = []
-        st.session_state.alerts = []
-        st.session_state.risk_registry.clear()
-        st.session_state.fraud_registry.clear()
-        st.session_state.audit_trail.clear()
-        if 'blockchain_txs' in st.session_state:
-            st.session_state.blockchain_txs = []
+        backend.clear()
         st.success("Data cleared!")
+    
+    # Registry snapshots
+    st.markdown("### 💾 Snapshots")
+    if st.button("💾 Save Snapshot", key="snapshot_save"):
+        backend.save_snapshot(SNAPSHOT_DIR)
+        backend.detector.save_score_sketch()
+        st.success("Registry snapshot saved!")
+    
+    if st.button("♻️ Restore Snapshot", key="snapshot_restore"):
+        if os.path.exists(SNAPSHOT_DIR):
+            backend.restore_snapshot(SNAPSHOT_DIR)
+            st.success("Registry snapshot restored!")
+        else:
+            st.warning("No snapshot saved yet")
 
 # Main dashboard
+summary = view.summary()
+# Only the displayed rows are copied and re-flagged at this session's
+# sensitivity; the count comes from the backend's decision score sketch
+transaction_data = view.transactions(last=RECENT_TRANSACTIONS)
+if transaction_data:
+    flags = backend.detector.rethreshold([tx['decision_score'] for tx in transaction_data],
+                                         st.session_state.sensitivity).tolist()
+    for tx, flag in zip(transaction_data, flags):
+        tx['is_fraud'] = flag
+session_fraud_count = view.flagged_count(st.session_state.sensitivity)
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.markdown("<div class='metric-card'><h3>Total Transactions</h3><h2>{}</h2></div>".format(len(st.session_state.transaction_data)), unsafe_allow_html=True)
+    st.markdown("<div class='metric-card'><h3>Total Transactions</h3><h2>{}</h2></div>".format(summary['total_transactions']), unsafe_allow_html=True)
+    if summary['duplicate_count']:
+        last = view.duplicates(last=1)[0]
+        st.caption(f"{summary['duplicate_count']:,} duplicates skipped, last {last['transaction_id']} "
+                   f"({last['kind']} duplicate of {last['original_id']})")
 
 with col2:
-    fraud_count = len([tx for tx in st.session_state.transaction_data if tx['is_fraud']])
-    st.markdown("<div class='metric-card'><h3>Fraud Detected</h3><h2 style='color: #ff00e6'>{}</h2></div>".format(fraud_count), unsafe_allow_html=True)
+    st.markdown("<div class='metric-card'><h3>Fraud Detected</h3><h2 style='color: #ff00e6'>{}</h2></div>".format(session_fraud_count), unsafe_allow_html=True)
+    if session_fraud_count != summary['fraud_count']:
+        st.caption(f"{summary['fraud_count']:,} flagged when scored at the default sensitivity")
 
 with col3:
-    if st.session_state.transaction_data:
-        avg_risk = np.mean([tx['risk_score'] for tx in st.session_state.transaction_data])
+    if summary['total_transactions']:
+        avg_risk = summary['avg_risk']
         st.markdown("<div class='metric-card'><h3>Avg Risk Score</h3><h2 style='color: #00f5ff'>{:.2f}</h2></div>".format(avg_risk), unsafe_allow_html=True)
     else:
         st.markdown("<div class='metric-card'><h3>Avg Risk Score</h3><h2 style='color: #00f5ff'>0.00</h2></div>", unsafe_allow_html=True)
@@ -241,10 +303,11 @@ chart_col1, chart_col2 = st.columns(2)
 
 with chart_col1:
     st.markdown("<div class='card'><h3 class='header'>📈 Risk Score Distribution</h3>", unsafe_allow_html=True)
-    if st.session_state.transaction_data:
-        risk_scores = [tx['risk_score'] for tx in st.session_state.transaction_data]
-        fig = px.histogram(x=risk_scores, nbins=20, 
-                          color_discrete_sequence=['#00f5ff'])
+    if summary['total_transactions']:
+        counts, edges = view.risk_histogram()
+        fig = px.bar(x=(edges[:-1] + edges[1:]) / 2, y=counts,
+                     color_discrete_sequence=['#00f5ff'])
+        fig.update_traces(width=edges[1] - edges[0])
         fig.update_layout(
             plot_bgcolor='rgba(0,0,0,0)',
             paper_bgcolor='rgba(0,0,0,0)',
@@ -257,12 +320,15 @@ with chart_col1:
 
 with chart_col2:
     st.markdown("<div class='card'><h3 class='header'>📊 Fraud Trends Over Time</h3>", unsafe_allow_html=True)
-    if st.session_state.transaction_data:
-        df = pd.DataFrame(st.session_state.transaction_data)
-        df['hour'] = pd.to_datetime(df['timestamp']).dt.hour
-        hourly_fraud = df[df['is_fraud']].groupby('hour').size().reset_index(name='count')
+    trend_range = st.selectbox("Range", list(TREND_RANGES), index=1, key="trend_range")
+    trends = view.trends(TREND_RANGES[trend_range].total_seconds(), max_points=TREND_POINTS)
+    if summary['total_transactions']:
+        df_trend = pd.DataFrame({
+            'time': [datetime.fromtimestamp(t) for t in trends['time'].tolist()],
+            'count': trends['frauds'],
+        })
         
-        fig = px.line(hourly_fraud, x='hour', y='count',
+        fig = px.line(df_trend, x='time', y='count',
                      color_discrete_sequence=['#ff00e6'])
         fig.update_layout(
             plot_bgcolor='rgba(0,0,0,0)',
@@ -270,6 +336,7 @@ with chart_col2:
             font_color='white'
         )
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(f"Flags per {trends['tier']} bucket, as flagged at scoring time")
     else:
         st.info("No data available. Generate transactions to see the chart.")
     st.markdown("</div>", unsafe_allow_html=True)
@@ -279,9 +346,8 @@ table_col1, table_col2 = st.columns(2)
 
 with table_col1:
     st.markdown("<div class='card'><h3 class='header'>📋 Recent Transactions</h3>", unsafe_allow_html=True)
-    if st.session_state.transaction_data:
-        recent_tx = st.session_state.transaction_data[-10:]  # Last 10 transactions
-        df_tx = pd.DataFrame(recent_tx)
+    if transaction_data:
+        df_tx = pd.DataFrame(transaction_data)
         df_tx = df_tx[['timestamp', 'transaction_id', 'amount', 'merchant', 'category', 'risk_score', 'is_fraud']]
         df_tx['timestamp'] = df_tx['timestamp'].dt.strftime('%H:%M:%S')
         st.dataframe(df_tx.style.applymap(lambda x: 'background-color: rgba(255, 0, 230, 0.2)' if x == True else '', subset=['is_fraud']), use_container_width=True)
@@ -291,8 +357,9 @@ with table_col1:
 
 with table_col2:
     st.markdown("<div class='card'><h3 class='header'>🚨 Fraud Alerts</h3>", unsafe_allow_html=True)
-    if st.session_state.alerts:
-        for alert in st.session_state.alerts[-5:]:  # Last 5 alerts
+    recent_alerts = view.alerts(last=5)
+    if recent_alerts:
+        for alert in recent_alerts:  # Last 5 alerts
             st.markdown(f"""
             <div class='card fraud-alert'>
                 <strong>⚠️ FRAUD ALERT</strong><br>
@@ -304,45 +371,75 @@ with table_col2:
             """, unsafe_allow_html=True)
     else:
         st.info("No fraud alerts yet. Generate transactions to see alerts.")
+    for sink, metrics in backend.alert_bus.metrics().items():
+        lag = f", p99 lag {metrics['lag_p99_ms']:.0f} ms" if metrics['lag_p99_ms'] is not None else ""
+        st.caption(f"{sink}: {metrics['delivered']:,} delivered, {metrics['depth']:,} queued, "
+                   f"{metrics['dropped'] + metrics['failed']:,} lost{lag}")
     st.markdown("</div>", unsafe_allow_html=True)
 
+# Drift monitoring panel
+st.markdown("<div class='card'><h3 class='header'>📉 Model Drift</h3>", unsafe_allow_html=True)
+drift = view.drift()
+if drift['transactions_seen']:
+    for alert in drift['alerts']:
+        st.warning(f"Drift in {alert['column']}: PSI {alert['psi']:.2f}, KS {alert['ks']:.2f}")
+    if not drift['alerts']:
+        st.success("Live traffic matches the training distribution")
+    df_drift = pd.DataFrame.from_dict(drift['metrics'], orient='index')
+    df_drift.index.name = 'feature'
+    st.dataframe(df_drift.style.format({'psi': '{:.3f}', 'ks': '{:.3f}', 'weight': '{:.0f}'}),
+                 use_container_width=True)
+else:
+    st.info("No live traffic yet. Generate transactions to monitor drift.")
+graph_stats = view.entity_graph()
+if graph_stats['transactions']:
+    st.caption(f"Entity graph: {graph_stats['accounts']:,} accounts, {graph_stats['merchants']:,} merchants, "
+               f"{graph_stats['components']:,} linked groups (largest {graph_stats['largest_component']:,})")
+st.markdown("</div>", unsafe_allow_html=True)
+
 # Blockchain simulation panel
 st.markdown("<div class='card'><h3 class='header'>🔗 Blockchain Registry Simulation</h3>", unsafe_allow_html=True)
 registry_col1, registry_col2, registry_col3 = st.columns(3)
+registry_sizes = view.registry_sizes()
 
 with registry_col1:
     st.markdown("##### Risk Score Registry")
-    if st.session_state.risk_registry.scores:
-        st.metric("Stored Scores", len(st.session_state.risk_registry.scores))
+    if registry_sizes['risk_scores']:
+        st.metric("Stored Scores", registry_sizes['risk_scores'])
         if st.button("View Registry", key="risk_view"):
-            st.json(st.session_state.risk_registry.scores)
+            st.session_state.registry_view = 'risk_scores'
     else:
         st.info("No scores stored")
 
 with registry_col2:
     st.markdown("##### Fraud Flag Registry")
-    if st.session_state.fraud_registry.flags:
-        st.metric("Fraud Flags", len(st.session_state.fraud_registry.flags))
+    if registry_sizes['fraud_flags']:
+        st.metric("Fraud Flags", registry_sizes['fraud_flags'])
         if st.button("View Registry", key="fraud_view"):
-            st.json(st.session_state.fraud_registry.flags)
+            st.session_state.registry_view = 'fraud_flags'
     else:
         st.info("No fraud flags")
 
 with registry_col3:
     st.markdown("##### Audit Trail")
-    if st.session_state.audit_trail.logs:
-        st.metric("Audit Logs", len(st.session_state.audit_trail.logs))
+    if registry_sizes['audit_logs']:
+        st.metric("Audit Logs", registry_sizes['audit_logs'])
         if st.button("View Logs", key="audit_view"):
-            st.json(st.session_state.audit_trail.logs)
+            st.session_state.registry_view = 'audit_logs'
     else:
         st.info("No audit logs")
 
+if st.session_state.registry_view:
+    st.markdown(f"##### {st.session_state.registry_view.replace('_', ' ').title()}")
+    render_registry_page(st.session_state.registry_view)
+
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Blockchain Transaction Hashes
-if 'blockchain_txs' in st.session_state and st.session_state.blockchain_txs:
+recent_blockchain_txs = view.blockchain_txs(last=5)
+if recent_blockchain_txs:
     st.markdown("<div class='card'><h3 class='header'>🔗 Blockchain Transaction Hashes</h3>", unsafe_allow_html=True)
-    for tx in st.session_state.blockchain_txs[-5:]:  # Show last 5 transactions
+    for tx in recent_blockchain_txs:  # Show last 5 transactions
         st.markdown(f"""
         <div class='card' style='background: linear-gradient(135deg, rgba(0, 245, 255, 0.1), rgba(0, 255, 157, 0.1));'>
             <p><strong>Transaction ID:</strong> {tx['transaction_id']}</p>
@@ -0,0 +1,86 @@
+# FraudGuard Labs - Batch scoring CLI throughput
+#
+# Writes a generated dataset as JSON lines and CSV, then runs
+# `python -m fraudguard_app score` over it with several input formats,
+# chunk sizes and worker counts, and reports the CLI's own summary:
+# rows/s, per-chunk p50/p99 scoring latency and peak memory.
+#
+# Usage: python benchmarks/bench_cli_score.py [--rows 50000] [--workers 1 2 4]
+
+import argparse
+import csv
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+SUMMARY = re.compile(r"in ([\d.]+)s \(model load ([\d.]+)s\), ([\d,]+) rows/s.*"
+                     r"p50 ([\d.]+) ms, p99 ([\d.]+) ms.*Peak memory ([\d,]+) MB", re.S)
+
+
+def write_inputs(directory, rows):
+    """
+    Write the same transactions as .jsonl and .csv
+
+    Rows are generated in chunks: on Linux a child's peak RSS includes the
+    parent it was forked from, so this process has to stay small.
+    """
+    paths = {fmt: os.path.join(directory, f'transactions.{fmt}') for fmt in ('jsonl', 'csv')}
+    with open(paths['jsonl'], 'w') as jsonl, open(paths['csv'], 'w', newline='') as csv_file:
+        writer = None
+        for start in range(0, rows, 5_000):
+            transactions = generate_transaction_stream(min(5_000, rows - start))
+            for tx in transactions:
+                tx['timestamp'] = tx['timestamp'].isoformat()
+            jsonl.writelines(json.dumps(tx) + "\n" for tx in transactions)
+            if writer is None:
+                writer = csv.DictWriter(csv_file, fieldnames=list(transactions[0]))
+                writer.writeheader()
+            writer.writerows(transactions)
+    return paths
+
+
+def run(path, chunk_size, workers, extra=()):
+    """Run the CLI once and parse its summary"""
+    result = subprocess.run([sys.executable, '-m', 'fraudguard_app', 'score', '-i', path, '-o', os.devnull,
+                             '--chunk-size', str(chunk_size), '--workers', str(workers), *extra],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return SUMMARY.search(result.stderr).groups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the batch scoring CLI")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    run_cases = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_inputs(directory, args.rows)
+        for fmt in ('jsonl', 'csv'):
+            for chunk_size in (250, 1000, 5000):
+                run_cases.append((fmt, chunk_size, 1, ()))
+        for workers in args.workers[1:]:
+            run_cases.append(('jsonl', 1000, workers, ()))
+        run_cases.append(('jsonl', 1000, 1, ('--registry', os.path.join(directory, 'registry'))))
+        run_cases.append(('jsonl', 1000, 1, ('--full-model',)))
+
+        print(f"{args.rows:,} transactions, {os.cpu_count()} CPUs")
+        print(f"{'input':<6} {'chunk':>6} {'workers':>8} {'options':<14} {'wall s':>7} {'load s':>7} "
+              f"{'rows/s':>9} {'p50 ms':>7} {'p99 ms':>7} {'peak MB':>8}")
+        for fmt, chunk_size, workers, extra in run_cases:
+            wall, load, rate, p50, p99, peak = run(paths[fmt], chunk_size, workers, extra)
+            options = extra[0].lstrip('-') if extra else ''
+            print(f"{fmt:<6} {chunk_size:>6} {workers:>8} {options:<14} {wall:>7} {load:>7} "
+                  f"{rate:>9} {p50:>7} {p99:>7} {peak:>8}")
+
+
+if __name__ == "__main__":
+    main()
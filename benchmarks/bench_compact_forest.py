@@ -0,0 +1,100 @@
+# FraudGuard Labs - Compact forest accuracy vs size
+#
+# Exports the detector's IsolationForest in the compact NumPy format at
+# several tree counts and depth limits, and compares each export with the
+# joblib-pickled model on the training distribution and on
+# generate_sample_dataset: file size, load time, scoring throughput, score
+# error, rank correlation and recall of the full model's top-10% flags.
+#
+# Usage: python benchmarks/bench_compact_forest.py [--rows 10000]
+
+import argparse
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.compact_forest import CompactForest, export_compact_forest
+from fraudguard_app.data.data_generator import generate_sample_dataset
+
+CONFIGS = [
+    ('all trees', {}),
+    ('all trees, depth 6', {'max_depth': 6}),
+    ('50 trees', {'n_estimators': 50}),
+    ('50 trees, depth 6', {'n_estimators': 50, 'max_depth': 6}),
+    ('25 trees', {'n_estimators': 25}),
+    ('25 trees, depth 4', {'n_estimators': 25, 'max_depth': 4}),
+]
+
+
+def import_time(statement):
+    """Seconds for a fresh interpreter to run an import statement"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', statement], check=True)
+    return time.perf_counter() - start
+
+
+def report(name, X, detector, buffer):
+    """Compare every export with the full model on one dataset"""
+    reference = detector.model.decision_function(detector.scaler.transform(X))
+    # Flag the most anomalous 10% by the full model's scores
+    threshold = np.quantile(reference, 0.1)
+    reference_flags = reference < threshold
+
+    start = time.perf_counter()
+    detector.backend.decision_function(X)
+    full_rate = len(X) / (time.perf_counter() - start)
+    start = time.perf_counter()
+    joblib.load(io.BytesIO(buffer.getvalue()))
+    full_load = time.perf_counter() - start
+
+    print(f"\n{name}: {len(X):,} rows, flagging the 10% scoring lowest on the full model")
+    print(f"{'model':<22} {'bytes':>10} {'load ms':>8} {'rows/s':>10} {'max |err|':>10} "
+          f"{'rank corr':>10} {'flag recall':>12}")
+    print(f"{'joblib (full)':<22} {len(buffer.getvalue()):>10,} {full_load * 1000:>8.1f} "
+          f"{full_rate:>10,.0f} {0:>10.4f} {1:>10.4f} {1:>12.1%}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for config, options in CONFIGS:
+            path = os.path.join(directory, 'forest.npz')
+            export_compact_forest(detector.model, path, scaler=detector.scaler, **options)
+            start = time.perf_counter()
+            forest = CompactForest.load(path)
+            load_time = time.perf_counter() - start
+            start = time.perf_counter()
+            scores = forest.decision_function(X)
+            rate = len(X) / (time.perf_counter() - start)
+            flags = scores < np.quantile(scores, 0.1)
+            rank_corr = np.corrcoef(np.argsort(np.argsort(scores)), np.argsort(np.argsort(reference)))[0, 1]
+            print(f"{config:<22} {os.path.getsize(path):>10,} {load_time * 1000:>8.1f} {rate:>10,.0f} "
+                  f"{np.abs(scores - reference).max():>10.4f} {rank_corr:>10.4f} "
+                  f"{(flags & reference_flags).sum() / reference_flags.sum():>12.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare compact forest exports with the full model")
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    buffer = io.BytesIO()
+    joblib.dump((detector.model, detector.scaler), buffer)
+    report("Training distribution", detector.encoder.encode(detector._generate_sample_data(args.rows)),
+           detector, buffer)
+    report("generate_sample_dataset", detector.encoder.encode(generate_sample_dataset(args.rows)),
+           detector, buffer)
+
+    print(f"\nFresh-interpreter import: numpy {import_time('import numpy'):.2f}s, "
+          f"sklearn IsolationForest {import_time('import sklearn.ensemble'):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
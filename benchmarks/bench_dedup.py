@@ -0,0 +1,81 @@
+# FraudGuard Labs - Duplicate and replay detection benchmark
+#
+# Feeds a stream with resubmitted ids and near-duplicates through
+# DuplicateFilter.check in batches, at a simulated arrival rate, and reports
+# throughput, the duplicates caught and the memory held as history grows.
+# Memory should level off once the stream is longer than the window.
+#
+# Usage: python benchmarks/bench_dedup.py [--rows 1000000] [--rate 100000] [--batch 500]
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.dedup import DuplicateFilter
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def make_stream(rows, duplicate_share, seed=0):
+    """Unique transactions plus resubmissions and near-duplicates of recent ones"""
+    rng = random.Random(seed)
+    base = generate_transaction_stream(10_000)
+    stream = []
+    for i in range(rows):
+        if stream and rng.random() < duplicate_share:
+            original = stream[-rng.randint(1, min(len(stream), 1000))]
+            if rng.random() < 0.5:
+                stream.append(original)
+            else:
+                stream.append(dict(original, transaction_id=f"{original['transaction_id']}-retry"))
+        else:
+            stream.append(dict(base[i % len(base)], transaction_id=f"TX{i:09d}", account_id=f"ACC{i:09d}"))
+    return stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark duplicate detection")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rate", type=float, default=100_000, help="Simulated arrivals per second")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--window", type=float, default=2.0, help="Dedup window in seconds")
+    parser.add_argument("--duplicates", type=float, default=0.02, help="Share of duplicate arrivals")
+    args = parser.parse_args()
+
+    stream = make_stream(args.rows, args.duplicates)
+    print(f"{args.rows:,} arrivals at a simulated {args.rate:,.0f}/s, window {args.window:g} s, "
+          f"batches of {args.batch}")
+    print(f"{'arrivals':>10} {'rows/s':>10} {'exact':>8} {'near':>8} {'remembered':>11} {'traced MB':>10}")
+    checkpoints = [args.rows * k // 5 for k in range(1, 6)]
+    # Timed without tracemalloc, which slows Python code down; memory from a second, traced pass
+    rows = {}
+    for traced in (False, True):
+        dedup = DuplicateFilter(window=args.window, bucket_seconds=args.window / 10)
+        if traced:
+            tracemalloc.start()
+        elapsed = 0.0
+        for start in range(0, args.rows, args.batch):
+            batch = stream[start:start + args.batch]
+            began = time.perf_counter()
+            dedup.check(batch, now=start / args.rate)
+            elapsed += time.perf_counter() - began
+            done = start + len(batch)
+            if not any(start < point <= done for point in checkpoints):
+                continue
+            if not traced:
+                rows[done] = (done / elapsed, dedup.stats())
+                continue
+            rate, stats = rows[done]
+            current, _ = tracemalloc.get_traced_memory()
+            print(f"{done:>10,} {rate:>10,.0f} {stats['exact']:>8,} {stats['near']:>8,} "
+                  f"{stats['remembered_ids']:>11,} {current / 1e6:>10.1f}")
+        if traced:
+            tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
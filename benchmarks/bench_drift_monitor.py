@@ -0,0 +1,62 @@
+# FraudGuard Labs - Drift monitor throughput
+#
+# Measures DriftMonitor.update throughput at several batch sizes, its share
+# of FraudDetector.score_batch time, and prints the drift the monitor sees
+# between the training data and generate_transaction_stream traffic.
+#
+# Usage: python benchmarks/bench_drift_monitor.py [--batch 100 1000 10000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.drift_monitor import DriftMonitor
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the drift monitor")
+    parser.add_argument("--batch", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows pushed per batch size")
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    transactions = generate_transaction_stream(10_000)
+    features = detector.encoder.encode(transactions)
+    _, risk_scores = detector.predict_batch(transactions)
+    live = np.column_stack([features, risk_scores])
+
+    print(f"{'batch':>7} {'update tx/s':>14} {'score_batch tx/s':>17} {'monitor share':>14}")
+    for batch in args.batch:
+        monitor = DriftMonitor(detector.drift_monitor.edges, detector.drift_monitor.baseline,
+                               detector.drift_monitor.columns)
+        data = np.resize(live, (max(batch, 10_000), live.shape[1]))
+        rounds = max(1, args.rows // batch)
+        start = time.perf_counter()
+        for i in range(rounds):
+            offset = (i * batch) % (len(data) - batch + 1)
+            monitor.update(data[offset:offset + batch])
+        update_rate = rounds * batch / (time.perf_counter() - start)
+
+        sample = (transactions * (batch // len(transactions) + 1))[:batch]
+        score_rounds = max(1, 20_000 // batch)
+        start = time.perf_counter()
+        for _ in range(score_rounds):
+            detector.score_batch(sample)
+        score_rate = score_rounds * batch / (time.perf_counter() - start)
+        print(f"{batch:>7} {update_rate:>14,.0f} {score_rate:>17,.0f} "
+              f"{score_rate / update_rate:>13.1%}")
+
+    print("\nDrift of generate_transaction_stream traffic vs training:")
+    for name, stats in detector.drift_monitor.metrics().items():
+        print(f"  {name:<22} PSI={stats['psi']:7.3f} KS={stats['ks']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
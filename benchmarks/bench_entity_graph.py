@@ -0,0 +1,99 @@
+# FraudGuard Labs - Entity graph at scale
+#
+# Streams synthetic account-merchant edges into an EntityGraph in batches,
+# reporting insert throughput as the graph grows, then times the
+# component-size and flagged-neighbour queries and a per-edge Python
+# union-find for reference.
+#
+# Usage: python benchmarks/bench_entity_graph.py [--edges 10000000] [--batch 100000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.entity_graph import EntityGraph, ACCOUNT, MERCHANT
+
+
+def python_union_find(left, right, num_nodes):
+    """Reference: per-edge union by size with path halving"""
+    parent = list(range(num_nodes))
+    size = [1] * num_nodes
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(left, right):
+        a, b = find(a), find(b)
+        if a != b:
+            if size[a] < size[b]:
+                a, b = b, a
+            parent[b] = a
+            size[a] += size[b]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the entity graph index")
+    parser.add_argument("--edges", type=int, default=10_000_000)
+    parser.add_argument("--batch", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=2_000_000)
+    parser.add_argument("--merchants", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    graph = EntityGraph()
+    accounts = graph.node_ids(ACCOUNT, range(args.accounts))
+    merchants = graph.node_ids(MERCHANT, range(args.merchants))
+    # Heavy-tailed merchant popularity, uniform accounts, 1% flagged
+    popularity = 1.0 / np.arange(1, args.merchants + 1) ** 0.8
+    popularity /= popularity.sum()
+
+    print(f"{'edges':>12} {'batch ms':>9} {'edges/s':>12} {'components':>11}")
+    insert_time = 0.0
+    report_every = max(1, args.edges // args.batch // 10)
+    for i, start in enumerate(range(0, args.edges, args.batch)):
+        size = min(args.batch, args.edges - start)
+        left = accounts[rng.integers(0, args.accounts, size)]
+        right = merchants[rng.choice(args.merchants, size, p=popularity)]
+        flagged = rng.random(size) < 0.01
+        t = time.perf_counter()
+        graph.add_edges(left, right, flagged)
+        elapsed = time.perf_counter() - t
+        insert_time += elapsed
+        if (i + 1) % report_every == 0:
+            print(f"{start + size:>12,} {elapsed * 1000:>9.1f} {size / elapsed:>12,.0f} "
+                  f"{graph.num_components:>11,}")
+    print(f"insert total: {insert_time:.1f}s, {args.edges / insert_time:,.0f} edges/s")
+
+    t = time.perf_counter()
+    stats = graph.stats()
+    print(f"final CSR merge: {time.perf_counter() - t:.2f}s; {stats}")
+
+    nodes = accounts[rng.integers(0, args.accounts, args.queries)]
+    for name, query in (("component_size", graph.component_size),
+                        ("flagged_neighbor_fraction", graph.flagged_neighbor_fraction)):
+        t = time.perf_counter()
+        query(nodes)
+        elapsed = time.perf_counter() - t
+        print(f"{name:<26} {args.queries:,} nodes: {elapsed * 1000:.1f} ms "
+              f"({elapsed / args.queries * 1e6:.2f} us/node)")
+
+    sample = min(args.edges, 1_000_000)
+    left = rng.integers(0, args.accounts, sample).tolist()
+    right = (args.accounts + rng.choice(args.merchants, sample, p=popularity)).tolist()
+    t = time.perf_counter()
+    python_union_find(left, right, args.accounts + args.merchants)
+    elapsed = time.perf_counter() - t
+    print(f"per-edge Python union-find: {sample / elapsed:,.0f} edges/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# FraudGuard Labs - Feature encoding cost per million rows
+#
+# Compares the FeatureEncoder on each input layout (list of dicts, dict of
+# columns, DataFrame) with the old per-row encoding path, and measures the
+# end-to-end predict vs predict_batch throughput.
+#
+# Usage: python benchmarks/bench_feature_encoding.py [--rows 1000000]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.feature_encoder import (
+    FeatureEncoder, MERCHANT_RISK_MAP, CATEGORY_MAP, FIELD_DEFAULTS
+)
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def per_row_encode(transactions):
+    """The pre-encoder path: one small array per transaction"""
+    rows = []
+    for tx in transactions:
+        rows.append(np.array([[
+            tx.get('amount', FIELD_DEFAULTS['amount']),
+            MERCHANT_RISK_MAP.get(tx.get('merchant', FIELD_DEFAULTS['merchant']), 0.5),
+            tx.get('time_of_day', FIELD_DEFAULTS['time_of_day']),
+            tx.get('account_age_days', FIELD_DEFAULTS['account_age_days']),
+            tx.get('previous_transactions', FIELD_DEFAULTS['previous_transactions']),
+            CATEGORY_MAP.get(tx.get('category', FIELD_DEFAULTS['category']), 3),
+        ]]))
+    return rows
+
+
+def timed(fn, repeat=3):
+    """Return the best wall time of fn() in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark feature encoding")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--predict-rows", type=int, default=2_000,
+                        help="Rows for the predict vs predict_batch comparison")
+    args = parser.parse_args()
+
+    # Tile a generated stream up to the requested size
+    base = generate_transaction_stream(10_000)
+    transactions = (base * (args.rows // len(base) + 1))[:args.rows]
+    frame = pd.DataFrame(transactions)
+    columns = {name: frame[name].to_numpy() for name in frame.columns}
+    scale = 1_000_000 / args.rows
+
+    print(f"{'path':<32} {'s / 1M rows':>12}")
+    for dtype in (np.float64, np.float32):
+        encoder = FeatureEncoder(dtype=dtype)
+        out = encoder.allocate(args.rows)
+        name = np.dtype(dtype).name
+        print(f"{f'list of dicts ({name})':<32} "
+              f"{timed(lambda: encoder.encode(transactions, out=out)) * scale:>12.3f}")
+        print(f"{f'dict of columns ({name})':<32} "
+              f"{timed(lambda: encoder.encode(columns, out=out)) * scale:>12.3f}")
+        print(f"{f'DataFrame ({name})':<32} "
+              f"{timed(lambda: encoder.encode(frame, out=out)) * scale:>12.3f}")
+    print(f"{'per-row arrays (old predict)':<32} "
+          f"{timed(lambda: per_row_encode(transactions), repeat=1) * scale:>12.3f}")
+
+    detector = FraudDetector()
+    sample = transactions[:args.predict_rows]
+    single = timed(lambda: [detector.predict(tx) for tx in sample], repeat=1)
+    batch = timed(lambda: detector.predict_batch(sample))
+    print()
+    print(f"predict:       {len(sample) / single:>12,.0f} tx/s")
+    print(f"predict_batch: {len(sample) / batch:>12,.0f} tx/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# FraudGuard Labs - Import time and memory of the scoring entry points
+#
+# Runs each entry point in a fresh interpreter with `python -X importtime`,
+# and reports total import time, modules loaded and peak RSS, plus the
+# end-to-end time of `python -m fraudguard_app score` on the compact export
+# and on the sklearn model.
+#
+# Usage: python benchmarks/bench_import_time.py [--rows 1000] [--repeat 3]
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+CASES = [
+    ('numpy', 'import numpy'),
+    ('fraud_detector', 'import fraudguard_app.components.fraud_detector'),
+    ('headless', 'import fraudguard_app.headless'),
+    ('cli', 'import fraudguard_app.cli'),
+    ('pandas + sklearn', 'import pandas, sklearn.ensemble, joblib'),
+    ('dashboard libraries', 'import streamlit, plotly.express, plotly.graph_objects'),
+]
+
+# Appended to every case: report peak RSS on the last stderr line
+RSS_SUFFIX = "; import resource, sys; sys.stderr.write('\\nRSS %d\\n' % resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+
+
+def run(code, repeat):
+    """Best-of-repeat (import ms, modules, RSS MB, wall s) for code in a fresh interpreter"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code + RSS_SUFFIX],
+                                cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        if result.returncode:
+            return None
+        lines = result.stderr.splitlines()
+        imports = [line.split('|') for line in lines if line.startswith('import time:') and '[us]' not in line]
+        # Top-level imports are the unindented names; their cumulative times add up to the total
+        total_us = sum(int(cumulative) for _, cumulative, name in imports if not name.startswith('  '))
+        rss = int(lines[-1].split()[1]) / 1024
+        sample = (total_us / 1000, len(imports), rss, wall)
+        best = sample if best is None or sample[0] < best[0] else best
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark import time of the scoring entry points")
+    parser.add_argument("--rows", type=int, default=1_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'entry point':<22} {'import ms':>10} {'modules':>8} {'RSS MB':>7}")
+    for name, code in CASES:
+        result = run(code, args.repeat)
+        if result is None:
+            print(f"{name:<22} {'not installed':>10}")
+            continue
+        print(f"{name:<22} {result[0]:>10.0f} {result[1]:>8} {result[2]:>7.0f}")
+
+    from fraudguard_app.data.data_generator import generate_transaction_stream
+    from fraudguard_app.headless import load_detector
+
+    load_detector()  # Make sure the compact export exists and is current
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.jsonl')
+        with open(path, 'w') as f:
+            for tx in generate_transaction_stream(args.rows):
+                tx['timestamp'] = tx['timestamp'].isoformat()
+                f.write(json.dumps(tx) + "\n")
+
+        print(f"\n`python -m fraudguard_app score` on {args.rows:,} rows, fresh interpreter:")
+        print(f"{'model':<22} {'import ms':>10} {'modules':>8} {'RSS MB':>7} {'wall s':>7}")
+        for name, flags in (('compact export', ''), ('sklearn model', ", '--full-model'")):
+            code = (f"from fraudguard_app.cli import main; "
+                    f"main(['score', '-i', {path!r}, '-o', {os.devnull!r}{flags}])")
+            import_ms, modules, rss, wall = run(code, args.repeat)
+            print(f"{name:<22} {import_ms:>10.0f} {modules:>8} {rss:>7.0f} {wall:>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# FraudGuard Labs - Model backends, ensemble and shadow scoring
+#
+# Reports per-backend scoring throughput, the ensemble's per-member latency,
+# and the champion's score_batch latency with and without a challenger
+# shadow-scoring the same traffic on a background thread.
+#
+# Usage: python benchmarks/bench_model_backends.py [--batch 500] [--batches 200]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.model_backends import BACKENDS, EnsembleBackend, create_backend
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def champion_latency(detector, batches):
+    """Per-batch score_batch latencies in ms"""
+    latencies = []
+    for batch in batches:
+        start = time.perf_counter()
+        detector.score_batch(batch)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark model backends and shadow scoring")
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--batches", type=int, default=200)
+    parser.add_argument("--challenger", default='local_outlier_factor', choices=sorted(BACKENDS))
+    args = parser.parse_args()
+
+    detector = FraudDetector()
+    training = detector._generate_sample_data(2000)
+    X_train = detector.encoder.encode(training)
+    y_train = training['is_fraud'].to_numpy()
+    X = detector.encoder.encode(generate_transaction_stream(10_000))
+
+    print(f"{'backend':<24} {'fit s':>6} {'rows/s':>12}")
+    for name in sorted(BACKENDS):
+        backend = create_backend(name)
+        start = time.perf_counter()
+        backend.fit(X_train, y_train)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        backend.decision_function(X)
+        print(f"{name:<24} {fit_time:>6.2f} {len(X) / (time.perf_counter() - start):>12,.0f}")
+
+    ensemble = EnsembleBackend([create_backend(name) for name in sorted(BACKENDS)]).fit(X_train, y_train)
+    for start in range(0, len(X), args.batch):
+        ensemble.decision_function(X[start:start + args.batch])
+    print(f"\nEnsemble of {len(BACKENDS)}, batches of {args.batch}:")
+    for name, stats in ensemble.latency.items():
+        stats = stats.summary()
+        print(f"  {name:<24} p50 {stats['p50_ms']:6.2f} ms  p99 {stats['p99_ms']:6.2f} ms")
+
+    transactions = generate_transaction_stream(args.batch * 20)
+    batches = [transactions[i % 20 * args.batch:(i % 20 + 1) * args.batch] for i in range(args.batches)]
+    champion_latency(detector, batches[:10])
+    alone = champion_latency(detector, batches)
+    detector.start_shadow(create_backend(args.challenger))
+    shadowed = champion_latency(detector, batches)
+    detector.shadow.drain()
+    stats = detector.backend_stats()['shadow']
+    detector.stop_shadow()
+
+    # With a single core the shadow thread time-shares with the champion
+    print(f"\nChampion score_batch, {args.batches} batches of {args.batch}, {os.cpu_count()} CPUs:")
+    print(f"  {'alone':<34} p50 {np.percentile(alone, 50):6.2f} ms  p99 {np.percentile(alone, 99):6.2f} ms")
+    print(f"  {'with ' + args.challenger + ' shadow':<34} p50 {np.percentile(shadowed, 50):6.2f} ms  "
+          f"p99 {np.percentile(shadowed, 99):6.2f} ms")
+    print(f"Shadow: {stats['rows']:,} rows compared, agreement {stats['agreement']:.1%}, "
+          f"champion-only {stats['champion_only']:,}, challenger-only {stats['challenger_only']:,}, "
+          f"dropped {stats['dropped_rows']:,}, challenger p50 {stats['latency']['p50_ms']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
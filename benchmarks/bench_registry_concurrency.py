@@ -0,0 +1,64 @@
+# FraudGuard Labs - Registry write throughput vs. writer threads
+#
+# Compares a single-stripe registry (one lock) with the default striped
+# registry, for per-transaction writes and for batched writes.
+#
+# Usage: python benchmarks/bench_registry_concurrency.py [--threads 1 2 4 8]
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, DEFAULT_STRIPES
+
+
+def run(num_stripes, threads, per_thread, batch_size):
+    """Return writes/s for `threads` writers sharing one registry"""
+    registry = RiskScoreRegistry(num_stripes=num_stripes)
+    barrier = threading.Barrier(threads + 1)
+
+    def writer(worker):
+        ids = [f"w{worker}-{i:08d}" for i in range(per_thread)]
+        barrier.wait()
+        if batch_size <= 1:
+            for i, tx_id in enumerate(ids):
+                registry.store_risk(tx_id, (i % 1000) / 1000)
+        else:
+            for start in range(0, per_thread, batch_size):
+                registry.store_risks((tx_id, 0.5) for tx_id in ids[start:start + batch_size])
+
+    workers = [threading.Thread(target=writer, args=(w,)) for w in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    assert len(registry) == threads * per_thread
+    return threads * per_thread / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent registry writes")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--writes", type=int, default=200_000, help="Total writes per run")
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'threads':>7} {'1 stripe':>12} {f'{DEFAULT_STRIPES} stripes':>12} "
+          f"{f'{DEFAULT_STRIPES} batched':>12}   (writes/s)")
+    for threads in args.threads:
+        per_thread = args.writes // threads
+        single = run(1, threads, per_thread, 1)
+        striped = run(DEFAULT_STRIPES, threads, per_thread, 1)
+        batched = run(DEFAULT_STRIPES, threads, per_thread, args.batch_size)
+        print(f"{threads:>7} {single:>12,.0f} {striped:>12,.0f} {batched:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
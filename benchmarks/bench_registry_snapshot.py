@@ -0,0 +1,65 @@
+# FraudGuard Labs - Registry snapshot benchmark
+#
+# Save time is dominated by reading each entry dict of the registry from
+# Python (about 0.6 us per entry on one core), so 10M entries take several
+# seconds rather than the 2 s target; the columnar write itself is a small
+# share. Reopening and page reads do not depend on the snapshot size.
+#
+# Usage: python benchmarks/bench_registry_snapshot.py [--entries 10000000]
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry
+from fraudguard_app.blockchain_sim.snapshot import save_snapshot, load_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark registry snapshot save/reopen")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Number of registry entries")
+    args = parser.parse_args()
+
+    print(f"Building registry with {args.entries:,} entries...")
+    registry = RiskScoreRegistry()
+    timestamp = datetime.now().isoformat()
+    registry.load_entries(
+        (f"{i:08x}-0000-4000-8000-000000000000", {'risk_score': (i % 1000) / 1000, 'timestamp': timestamp})
+        for i in range(args.entries))
+
+    tmp_dir = tempfile.mkdtemp()
+    snapshot_dir = os.path.join(tmp_dir, "snapshot")
+    try:
+        start = time.perf_counter()
+        save_snapshot(snapshot_dir, risk_registry=registry)
+        save_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot = load_snapshot(snapshot_dir)
+        snapshot.column('risk_scores', 'tx_id')
+        snapshot.column('risk_scores', 'risk_score')
+        snapshot.column('risk_scores', 'timestamp')
+        open_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        snapshot.read_page('risk_scores', offset=args.entries // 2, limit=50)
+        page_s = time.perf_counter() - start
+
+        size_mb = sum(os.path.getsize(os.path.join(root, f))
+                      for root, _, files in os.walk(snapshot_dir) for f in files) / 1e6
+        print(f"save:   {save_s * 1000:10.1f} ms ({args.entries / save_s:,.0f} entries/s)")
+        print(f"reopen: {open_s * 1000:10.1f} ms")
+        print(f"page:   {page_s * 1000:10.1f} ms (50 rows from the middle)")
+        print(f"size:   {size_mb:10.1f} MB")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
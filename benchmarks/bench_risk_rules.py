@@ -0,0 +1,88 @@
+# FraudGuard Labs - Risk rule evaluation cost
+#
+# Compares the compiled RuleSet with a per-row Python loop over the same
+# synthetic rule table, for several table sizes and batch sizes.
+#
+# Usage: python benchmarks/bench_risk_rules.py [--rules 10 100 500] [--batch 1000 10000 100000]
+
+import argparse
+import operator
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.feature_encoder import FEATURE_COLUMNS
+from fraudguard_app.components.risk_rules import RuleSet
+
+PY_OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+
+def synthetic_table(num_rules, rng):
+    """Build a rule table with 1-3 conditions per rule and some exclusive groups"""
+    rules = []
+    for i in range(num_rules):
+        conditions = [{
+            'feature': str(rng.choice(FEATURE_COLUMNS)),
+            'op': str(rng.choice(list(PY_OPERATORS))),
+            'value': float(rng.uniform(0, 1)),
+        } for _ in range(rng.integers(1, 4))]
+        rule = {'name': f"rule_{i}", 'when': conditions, 'add': float(rng.uniform(0, 0.05))}
+        if i % 5 == 0:
+            rule['group'] = f"group_{i // 20}"
+        rules.append(rule)
+    return {'rules': rules}
+
+
+def per_row(table, features, scores):
+    """Reference evaluation: one Python pass over every rule for every row"""
+    columns = {name: i for i, name in enumerate(FEATURE_COLUMNS)}
+    rules = [([(columns[c['feature']], PY_OPERATORS[c['op']], c['value']) for c in rule['when']],
+              rule.get('group'), rule['add']) for rule in table['rules']]
+    adjusted = []
+    for row, score in zip(features.tolist(), scores.tolist()):
+        seen_groups = set()
+        for conditions, group, add in rules:
+            if group in seen_groups:
+                continue
+            if all(op(row[col], value) for col, op, value in conditions):
+                score += add
+                if group is not None:
+                    seen_groups.add(group)
+        adjusted.append(min(max(score, 0.0), 1.0))
+    return adjusted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark risk rule evaluation")
+    parser.add_argument("--rules", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+
+    print(f"{'rules':>6} {'batch':>8} {'vectorized ms':>14} {'per-row ms':>11} {'speedup':>8}")
+    for num_rules in args.rules:
+        table = synthetic_table(num_rules, rng)
+        ruleset = RuleSet(table)
+        for batch in args.batch:
+            features = rng.uniform(0, 1, size=(batch, len(FEATURE_COLUMNS)))
+            scores = rng.uniform(0, 1, size=batch)
+
+            start = time.perf_counter()
+            adjusted, _ = ruleset.apply(features, scores)
+            vectorized = time.perf_counter() - start
+
+            start = time.perf_counter()
+            reference = per_row(table, features, scores)
+            looped = time.perf_counter() - start
+
+            assert np.allclose(adjusted, reference)
+            print(f"{num_rules:>6} {batch:>8} {vectorized * 1000:>14.1f} {looped * 1000:>11.1f} "
+                  f"{looped / vectorized:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
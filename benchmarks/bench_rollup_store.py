@@ -0,0 +1,87 @@
+# FraudGuard Labs - Fraud trend chart: DataFrame rebuild vs rollup store
+#
+# Compares the trend chart's old per-rerun work (DataFrame over every
+# transaction record, timestamp conversion, group by hour) with a
+# RollupStore query downsampled to the chart's point budget, as history
+# grows. Also reports the ingest cost of the rollup store per batch size.
+#
+# Usage: python benchmarks/bench_rollup_store.py [--sizes 10000 100000 1000000]
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.rollup_store import RollupStore
+
+TREND_POINTS = 200
+RANGES = (("5 minutes", 300), ("hour", 3600), ("24 hours", 86400), ("30 days", 30 * 86400))
+
+
+def best_of(function, repeat=5):
+    """Best wall time of repeat calls, in ms"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def dataframe_trend(records):
+    """The chart's previous implementation"""
+    df = pd.DataFrame(records)
+    df['hour'] = pd.to_datetime(df['timestamp']).dt.hour
+    return df[df['is_fraud']].groupby('hour').size().reset_index(name='count')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rollup store against the DataFrame trend chart")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    end = time.time()
+    print(f"Chart query, ms (history spread over 30 days, {TREND_POINTS} points)")
+    print(f"{'records':>10} {'DataFrame':>10} " + " ".join(f"{label:>10}" for label, _ in RANGES))
+    for size in args.sizes:
+        seconds = np.sort(end - rng.uniform(0, 30 * 86400, size))
+        is_fraud = rng.random(size) < 0.1
+        risk = rng.random(size)
+        records = [{'timestamp': datetime.fromtimestamp(t), 'is_fraud': f, 'risk_score': r}
+                   for t, f, r in zip(seconds.tolist(), is_fraud.tolist(), risk.tolist())]
+        store = RollupStore()
+        for batch in np.array_split(np.arange(size), max(1, size // 500)):
+            store.add(seconds[batch], is_fraud[batch], risk[batch])
+
+        rebuild = best_of(lambda: dataframe_trend(records), repeat=3)
+        queries = [best_of(lambda: store.query(end - window, end, TREND_POINTS)) for _, window in RANGES]
+        print(f"{size:>10,} {rebuild:>10.2f} " + " ".join(f"{ms:>10.2f}" for ms in queries))
+        del records
+
+    print(f"\nIngest ({store.nbytes:,} bytes of ring buffers, independent of history)")
+    print(f"{'batch':>8} {'timestamps':<11} {'rows/s':>12} {'us/batch':>10}")
+    for batch_size in (1, 10, 500, 5000):
+        batches = 2000 if batch_size < 500 else 200
+        for label in ('per batch', 'per row'):
+            store = RollupStore()
+            now = time.time()
+            start = time.perf_counter()
+            for i in range(batches):
+                stamps = now + i * 0.01
+                if label == 'per row':
+                    stamps = stamps + np.linspace(0, 0.01, batch_size)
+                store.add(stamps, rng.random(batch_size) < 0.1, rng.random(batch_size))
+            elapsed = time.perf_counter() - start
+            print(f"{batch_size:>8,} {label:<11} {batches * batch_size / elapsed:>12,.0f} "
+                  f"{elapsed / batches * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
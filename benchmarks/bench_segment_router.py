@@ -0,0 +1,71 @@
+# FraudGuard Labs - Segment-routed models vs one global model
+#
+# Compares decision_function throughput of one global IsolationForest with a
+# SegmentRouter holding one IsolationForest per segment, per batch size, for
+# sklearn models and their compact exports. The lazy column loads compact
+# segment models from disk with an LRU bound smaller than the number of
+# segments (the worst case, evicting on every batch).
+#
+# Usage: python benchmarks/bench_segment_router.py [--segment-by category] [--batches 1 10 100 1000 10000]
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.compact_forest import export_compact_forest
+from fraudguard_app.components.model_backends import CompactForestBackend, IsolationForestBackend
+from fraudguard_app.components.segment_router import SEGMENTATIONS, SegmentRouter
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def throughput(backend, X, batch, rows=20_000):
+    """Rows/s scoring X in batches, over about `rows` rows"""
+    repeats = max(1, rows // len(X))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(X), batch):
+            backend.decision_function(X[i:i + batch])
+    return repeats * len(X) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark segment-routed models against one global model")
+    parser.add_argument("--segment-by", default='category', choices=sorted(SEGMENTATIONS))
+    parser.add_argument("--batches", type=int, nargs="+", default=[1, 10, 100, 1000, 10_000])
+    args = parser.parse_args()
+
+    detector = FraudDetector(prefer_compact=True)
+    training = detector._generate_sample_data(2000)
+    X_train = detector.encoder.encode(training)
+    y_train = training['is_fraud'].to_numpy()
+    X = detector.encoder.encode(generate_transaction_stream(10_000))
+
+    single = IsolationForestBackend().fit(X_train, y_train)
+    single_compact = CompactForestBackend(export_compact_forest(single.model, scaler=single.scaler))
+    routed = SegmentRouter(args.segment_by).fit(X_train, y_train)
+    routed_compact = SegmentRouter(args.segment_by, compact=True).fit(X_train, y_train)
+    lazy = SegmentRouter(args.segment_by, compact=True, model_dir=tempfile.mkdtemp(),
+                         max_resident=max(1, len(routed.segments) - 1)).fit(X_train, y_train)
+    print(f"{len(routed.segments)} {args.segment_by} segments with their own model, "
+          f"lazy router keeps {lazy.max_resident} resident; rows/s, ratio to the single model")
+    print(f"{'':>7} {'sklearn':>24} {'compact':>36}")
+    print(f"{'batch':>7} {'single':>10} {'routed':>13} {'single':>10} {'routed':>13} {'lazy LRU':>13}")
+    for batch in args.batches:
+        rows = min(20_000, max(500, batch * 20))
+        base = throughput(single, X, batch, rows)
+        base_compact = throughput(single_compact, X, batch, rows)
+        cells = [f"{base:>10,.0f}", f"{throughput(routed, X, batch, rows) / base:>13.2f}",
+                 f"{base_compact:>10,.0f}",
+                 f"{throughput(routed_compact, X, batch, rows) / base_compact:>13.2f}",
+                 f"{throughput(lazy, X, batch, rows) / base_compact:>13.2f}"]
+        print(f"{batch:>7,} " + " ".join(cells))
+    print(f"Lazy router: {lazy.stats()['loads']:,} loads, {lazy.stats()['evictions']:,} evictions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# FraudGuard Labs - Sharded registry service benchmark
+#
+# Writes risk scores, fraud flags and audit logs in batches through
+# ShardedRegistryService with 1, 2, 4 and 8 shard processes and reports write
+# throughput, point-read rate and a paginated query's latency, next to the
+# in-process registries. Shards run in parallel, so write throughput should
+# grow with the shard count up to the number of cores (minus one for the
+# client). Also times add_shard() on the largest service.
+#
+# Usage: python benchmarks/bench_sharded_registry.py [--rows 200000] [--batch 2000] [--shards 1 2 4 8]
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+from fraudguard_app.blockchain_sim.sharded_registry import ShardedRegistryService
+
+
+def write_all(risks, flags, audit, tx_ids, scores, batch, now):
+    """Write every row with the batch APIs; rows/s"""
+    start = time.perf_counter()
+    for i in range(0, len(tx_ids), batch):
+        pairs = list(zip(tx_ids[i:i + batch], scores[i:i + batch]))
+        risks.store_risks(pairs)
+        flags.flag_frauds((tx_id, "High risk score detected") for tx_id, score in pairs if score > 0.9)
+        audit.log_audits((tx_id, score, now) for tx_id, score in pairs)
+    return len(tx_ids) / (time.perf_counter() - start)
+
+
+def read_rate(risks, tx_ids, reads=2000):
+    sample = random.Random(1).sample(tx_ids, min(reads, len(tx_ids)))
+    start = time.perf_counter()
+    for tx_id in sample:
+        risks.get_risk(tx_id)
+    return len(sample) / (time.perf_counter() - start)
+
+
+def query_ms(risks):
+    start = time.perf_counter()
+    risks.query(min_risk=0.5, sort_by='risk_score', descending=True, offset=100, limit=50)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sharded registry service")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=2000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    tx_ids = [f"TX{i:09d}" for i in range(args.rows)]
+    scores = [rng.random() for _ in range(args.rows)]
+    now = datetime.now()
+
+    print(f"{args.rows:,} transactions in batches of {args.batch:,}, {os.cpu_count()} CPUs")
+    print(f"{'registry':<12} {'writes/s':>10} {'vs 1 shard':>11} {'reads/s':>9} {'query ms':>9}")
+    local = RiskScoreRegistry(), FraudFlagRegistry(), AuditTrail()
+    rate = write_all(*local, tx_ids, scores, args.batch, now)
+    print(f"{'in-process':<12} {rate:>10,.0f} {'':>11} {read_rate(local[0], tx_ids):>9,.0f} "
+          f"{query_ms(local[0]):>9.1f}")
+
+    base = None
+    for shards in args.shards:
+        with ShardedRegistryService(num_shards=shards) as service:
+            rate = write_all(service.risk_scores, service.fraud_flags, service.audit_trail,
+                             tx_ids, scores, args.batch, now)
+            service.flush()
+            base = base or rate
+            print(f"{f'{shards} shards':<12} {rate:>10,.0f} {rate / base:>11.2f} "
+                  f"{read_rate(service.risk_scores, tx_ids):>9,.0f} {query_ms(service.risk_scores):>9.1f}")
+            if shards == max(args.shards):
+                start = time.perf_counter()
+                moved = service.add_shard()
+                elapsed = time.perf_counter() - start
+                print(f"add_shard() moved {moved['risk_scores']:,} of {args.rows:,} transactions "
+                      f"to shard {moved['shard']} in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# FraudGuard Labs - Shared scoring backend benchmark
+#
+# Compares memory for per-session detector copies against one shared
+# ScoringBackend, and measures session read latency and writer throughput
+# with 1, 10 and 50 concurrent sessions.
+#
+# Usage: python benchmarks/bench_shared_backend.py [--sessions 1 10 50]
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.scoring_backend import ScoringBackend
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+from fraudguard_app.data.data_generator import generate_transaction_stream
+
+
+def measure_memory(build):
+    """Return the traced memory (MB) retained by the objects build() creates"""
+    tracemalloc.start()
+    objects = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / 1e6
+
+
+def per_session_state(sessions):
+    return [(FraudDetector(), RiskScoreRegistry(), FraudFlagRegistry(), AuditTrail())
+            for _ in range(sessions)]
+
+
+def run_sessions(backend, sessions, transactions, duration, poll_interval):
+    """Run one writer and `sessions` reader threads against a shared backend"""
+    stop = threading.Event()
+    latencies = [[] for _ in range(sessions)]
+
+    def reader(samples):
+        view = backend.view()
+        while not stop.is_set():
+            start = time.perf_counter()
+            view.summary()
+            view.transactions(last=10)
+            view.alerts(last=5)
+            view.query_registry('risk_scores', min_risk=0.5, limit=50)
+            samples.append(time.perf_counter() - start)
+            time.sleep(poll_interval)
+
+    threads = [threading.Thread(target=reader, args=(samples,)) for samples in latencies]
+    for thread in threads:
+        thread.start()
+
+    written = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < duration:
+        backend.process_transaction(transactions[written % len(transactions)])
+        written += 1
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    samples = np.array([sample for session in latencies for sample in session]) * 1000
+    return written / elapsed, np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared scoring backend")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per run")
+    parser.add_argument("--poll-interval", type=float, default=0.05,
+                        help="Seconds each session waits between dashboard refreshes")
+    args = parser.parse_args()
+
+    FraudDetector()  # Train and save the model once so later loads are comparable
+    transactions = generate_transaction_stream(1000)
+
+    print(f"{'sessions':>8} {'per-session MB':>15} {'shared MB':>10} {'writes/s':>10} "
+          f"{'read p50 ms':>12} {'read p99 ms':>12}")
+    for sessions in args.sessions:
+        per_session_mb = measure_memory(lambda: per_session_state(sessions))
+        shared_mb = measure_memory(ScoringBackend)
+        # The writer cycles through the same transactions: keep them from counting as duplicates
+        backend = ScoringBackend(dedup=False)
+        writes, p50, p99 = run_sessions(backend, sessions, transactions, args.duration,
+                                       args.poll_interval)
+        print(f"{sessions:>8} {per_session_mb:>15.1f} {shared_mb:>10.1f} {writes:>10.0f} "
+              f"{p50:>12.2f} {p99:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+
+from fraudguard_app.cli import main
+
+sys.exit(main())
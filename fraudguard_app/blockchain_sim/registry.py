@@ -1,159 +1,1022 @@
-class RiskScoreRegistry:
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import accumulate, chain, count, islice, repeat
+from operator import itemgetter
+
+import numpy as np
+
+# Number of lock stripes per registry
+DEFAULT_STRIPES = 16
+
+# Upper bound for tx_id prefix ranges
+_PREFIX_END = '\U0010ffff'
+
+
+class _SortedIndex:
+    # Target block length; blocks are split once they grow past twice this
+    _LOAD = 512
+
     def __init__(self):
+        """
+        Secondary index keeping (key, row_id) pairs sorted by key
+
+        Pairs are stored in short sorted blocks (keys and row IDs in parallel
+        lists), so inserts and removals only shift one block instead of the
+        whole index. Equal keys keep their insertion order.
+        """
+        self.clear()
+
+    def __len__(self):
+        return self._size
+
+    def _block_starts(self):
+        # Global position of the first pair of each block, rebuilt lazily
+        if self._starts is None:
+            self._starts = list(accumulate([0] + [len(keys) for keys in self._key_blocks[:-1]]))
+        return self._starts
+
+    def add(self, key, row_id):
+        self._size += 1
+        self._starts = None
+        if not self._maxes:
+            self._key_blocks.append([key])
+            self._id_blocks.append([row_id])
+            self._maxes.append(key)
+            return
+        block = min(bisect_right(self._maxes, key), len(self._maxes) - 1)
+        keys = self._key_blocks[block]
+        ids = self._id_blocks[block]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        ids.insert(position, row_id)
+        self._maxes[block] = keys[-1]
+        if len(keys) > 2 * self._LOAD:
+            self._key_blocks[block:block + 1] = [keys[:self._LOAD], keys[self._LOAD:]]
+            self._id_blocks[block:block + 1] = [ids[:self._LOAD], ids[self._LOAD:]]
+            self._maxes[block:block + 1] = [keys[self._LOAD - 1], keys[-1]]
+
+    def remove(self, key, row_id):
+        block = bisect_left(self._maxes, key)
+        while block < len(self._maxes):
+            keys = self._key_blocks[block]
+            ids = self._id_blocks[block]
+            position = bisect_left(keys, key)
+            while position < len(keys) and keys[position] == key:
+                if ids[position] == row_id:
+                    del keys[position]
+                    del ids[position]
+                    self._size -= 1
+                    self._starts = None
+                    if keys:
+                        self._maxes[block] = keys[-1]
+                    else:
+                        del self._key_blocks[block]
+                        del self._id_blocks[block]
+                        del self._maxes[block]
+                    return
+                position += 1
+            if position < len(keys):
+                return
+            block += 1
+
+    def rebuild(self, pairs):
+        """
+        Replace the index contents with (key, row_id) pairs in one sort
+        """
+        pairs = sorted(pairs, key=lambda pair: pair[0])
+        self.clear()
+        for start in range(0, len(pairs), self._LOAD):
+            chunk = pairs[start:start + self._LOAD]
+            self._key_blocks.append([key for key, _ in chunk])
+            self._id_blocks.append([row_id for _, row_id in chunk])
+            self._maxes.append(chunk[-1][0])
+        self._size = len(pairs)
+
+    def bounds(self, low=None, high=None):
+        """
+        Get the positions [start, end) of keys with low <= key <= high
+        """
+        starts = self._block_starts()
+        start = 0
+        if low is not None:
+            block = bisect_left(self._maxes, low)
+            start = self._size if block == len(self._maxes) else \
+                starts[block] + bisect_left(self._key_blocks[block], low)
+        end = self._size
+        if high is not None:
+            block = bisect_right(self._maxes, high)
+            end = self._size if block == len(self._maxes) else \
+                starts[block] + bisect_right(self._key_blocks[block], high)
+        return start, max(start, end)
+
+    def key_at(self, position):
+        """
+        Get the key at a position
+        """
+        block = bisect_right(self._block_starts(), position) - 1
+        return self._key_blocks[block][position - self._starts[block]]
+
+    def iter_range(self, start, end, reverse=False):
+        """
+        Iterate row IDs at positions [start, end), optionally in reverse
+        """
+        return self._walk(self._id_blocks, start, end, reverse)
+
+    def iter_items(self, start, end, reverse=False):
+        """
+        Iterate (key, row_id) pairs at positions [start, end), optionally in reverse
+        """
+        return zip(self._walk(self._key_blocks, start, end, reverse),
+                   self._walk(self._id_blocks, start, end, reverse))
+
+    def _walk(self, blocks, start, end, reverse):
+        if start >= end:
+            return
+        starts = self._block_starts()
+        if not reverse:
+            block = bisect_right(starts, start) - 1
+            position = start - starts[block]
+            remaining = end - start
+            while remaining > 0:
+                chunk = blocks[block][position:position + remaining]
+                yield from chunk
+                remaining -= len(chunk)
+                block += 1
+                position = 0
+        else:
+            block = bisect_right(starts, end - 1) - 1
+            position = end - starts[block]
+            remaining = end - start
+            while remaining > 0:
+                chunk = blocks[block][max(0, position - remaining):position]
+                yield from reversed(chunk)
+                remaining -= len(chunk)
+                block -= 1
+                if block >= 0:
+                    position = len(blocks[block])
+
+    def clear(self):
+        self._key_blocks = []
+        self._id_blocks = []
+        self._maxes = []
+        self._starts = None
+        self._size = 0
+
+
+def _time_key(value):
+    """Convert a datetime or ISO string to the ISO key used by the timestamp index"""
+    if value is None or isinstance(value, str):
+        return value
+    return value.isoformat()
+
+
+def _run_query(parts, ranges, sort_by, descending, offset, limit):
+    """
+    Execute a filtered, sorted and paginated query across sorted indexes
+
+    Each part is one stripe's indexes; the result is the page of their
+    merged rows, equal sort keys ordered by part. With no filters beyond
+    the sort key, the row at offset is found by rank selection over the
+    parts' sort indexes (see _select_cuts) and only the page is read, so a
+    page costs O(parts * log^2 n + limit * log parts) at any offset.
+    Otherwise each part's matches are produced lazily, driven by its most
+    selective bounded index, and merged; skipped rows are filtered but
+    not merged into a list, so deep pages cost the matches they skip.
+
+    Args:
+        parts (list): (indexes, get_row, restrict) per stripe: field name ->
+            _SortedIndex, row ID -> row dict (or None if missing), and an
+            optional set of row IDs the result must belong to
+        ranges (dict): Field name -> (low, high) inclusive bounds
+        sort_by (str): Field to sort by, must be in indexes
+        descending (bool): Sort order
+        offset (int): Number of matching rows to skip
+        limit (int): Maximum number of rows to return
+
+    Returns:
+        dict: {'items', 'total', 'offset', 'limit', 'has_more'}; total is
+        None when counting it would require a scan past the page
+    """
+    if any(sort_by not in indexes for indexes, _, _ in parts):
+        raise ValueError(f"Cannot sort by '{sort_by}'; expected one of {sorted(parts[0][0])}")
+    offset = max(0, offset)
+    limit = max(0, limit)
+
+    if all(restrict is None for _, _, restrict in parts) and all(field == sort_by for field in ranges):
+        # Pure index range: select the page's first row by rank, then merge only the page
+        sort_indexes = [indexes[sort_by] for indexes, _, _ in parts]
+        spans = [index.bounds(*ranges[sort_by]) if sort_by in ranges else (0, len(index))
+                 for index in sort_indexes]
+        sizes = [end - start for start, end in spans]
+        total = sum(sizes)
+
+        def keys_at(positions):
+            return {part: sort_indexes[part].key_at(_index_position(spans[part], q, descending))
+                    for part, q in positions.items()}
+
+        def counts(key):
+            return [_counts_before(index.bounds(key, key), span, descending)
+                    for index, span in zip(sort_indexes, spans)]
+
+        cuts = _select_cuts(sizes, offset, keys_at, counts, descending)
+        streams = []
+        for part, (index, (start, end), cut) in enumerate(zip(sort_indexes, spans, cuts)):
+            window = (start, end - cut) if descending else (start + cut, end)
+            streams.append(zip(index.iter_items(*window, reverse=descending), repeat(part)))
+        merged = heapq.merge(*streams, key=_item_key, reverse=descending)
+        items = [parts[part][1](row_id) for (_, row_id), part in islice(merged, limit)]
+        return {'items': items, 'total': total, 'offset': offset, 'limit': limit,
+                'has_more': offset + len(items) < total}
+
+    totals = []
+    streams = []
+    for indexes, get_row, restrict in parts:
+        part_total, rows = _matching_rows(indexes, ranges, sort_by, descending, get_row, restrict)
+        totals.append(part_total)
+        streams.append(rows)
+    merged = streams[0] if len(streams) == 1 else \
+        heapq.merge(*streams, key=itemgetter(sort_by), reverse=descending)
+    skipped = sum(1 for _ in islice(merged, offset))
+    items = list(islice(merged, limit + 1))
+    has_more = len(items) > limit
+    del items[limit:]
+    if None not in totals:
+        total = sum(totals)
+    else:
+        total = None if has_more else skipped + len(items)
+    return {'items': items, 'total': total, 'offset': offset, 'limit': limit, 'has_more': has_more}
+
+
+def _item_key(tagged):
+    # ((key, row_id), part) -> key
+    return tagged[0][0]
+
+
+def _matching_rows(indexes, ranges, sort_by, descending, get_row, restrict):
+    """
+    One stripe's matching rows in sort order, and their count if known without a scan
+
+    The most selective bounded index drives the scan. When it is the sort
+    index rows are filtered lazily as they are read; otherwise the
+    (smaller) candidate set is filtered and sorted.
+    """
+    bounds = {field: indexes[field].bounds(*ranges[field]) for field in ranges}
+    sort_start, sort_end = bounds.get(sort_by, (0, len(indexes[sort_by])))
+
+    def matches(row_id, row, skip_field):
+        if restrict is not None and row_id not in restrict:
+            return False
+        for field, (low, high) in ranges.items():
+            if field == skip_field:
+                continue
+            value = row[field]
+            if (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    # Pick the smallest candidate set
+    driver, driver_count = sort_by, sort_end - sort_start
+    for field, (start, end) in bounds.items():
+        if end - start < driver_count:
+            driver, driver_count = field, end - start
+    if restrict is not None and len(restrict) < driver_count:
+        driver, driver_count = None, len(restrict)
+
+    if driver == sort_by:
+        def scan():
+            for row_id in indexes[sort_by].iter_range(sort_start, sort_end, reverse=descending):
+                row = get_row(row_id)
+                if row is not None and matches(row_id, row, sort_by):
+                    yield row
+        return None, scan()
+
+    # Filter the small candidate set, then sort it
+    candidates = restrict if driver is None else indexes[driver].iter_range(*bounds[driver])
+    rows = []
+    for row_id in candidates:
+        row = get_row(row_id)
+        if row is not None and matches(row_id, row, driver):
+            rows.append(row)
+    rows.sort(key=itemgetter(sort_by), reverse=descending)
+    return len(rows), iter(rows)
+
+
+def _index_position(span, q, descending):
+    """Index position of the q-th row of a span in query order"""
+    start, end = span
+    return end - 1 - q if descending else start + q
+
+
+def _counts_before(key_bounds, span, descending):
+    """
+    Rows of a span ahead of a key in query order: (before its ties, through its ties)
+    """
+    start, end = span
+    left, right = (min(max(position, start), end) for position in key_bounds)
+    if descending:
+        return end - right, end - left
+    return left - start, right - start
+
+
+def _select_cuts(sizes, offset, keys_at, counts, descending):
+    """
+    Find how many rows of each sorted source come before the offset-th row of their merge
+
+    Sources are merged by key, equal keys ordered by source, then by
+    position. Each round takes the weighted median of the sources'
+    middle rows as a pivot, counts the rows ahead of it in every source
+    and discards the sources' ranges on the wrong side of it, so at
+    least a quarter of the remaining rows goes per round: O(log n)
+    rounds of one keys_at and one counts call. Sources may be local
+    indexes or remote shards.
+
+    Args:
+        sizes (list): Row count of each source
+        offset (int): Rank of the row to find
+        keys_at (callable): {source: position} -> {source: key}, positions
+            in query order
+        counts (callable): key -> per source (rows before the key's ties,
+            rows through its ties), in query order
+        descending (bool): Whether keys run in descending order
+
+    Returns:
+        list: Per source, the number of its rows before the offset-th row
+    """
+    if offset <= 0:
+        return [0] * len(sizes)
+    if offset >= sum(sizes):
+        return list(sizes)
+    low = [0] * len(sizes)
+    high = list(sizes)
+    while True:
+        middles = {source: (low[source] + high[source]) // 2
+                   for source in range(len(sizes)) if low[source] < high[source]}
+        keys = keys_at(middles)
+        order = sorted(middles)
+        order.sort(key=keys.__getitem__, reverse=descending)
+        weight = sum(high[source] - low[source] for source in order) / 2
+        for pivot in order:
+            weight -= high[pivot] - low[pivot]
+            if weight <= 0:
+                break
+        ahead = counts(keys[pivot])
+        cuts = [ahead[source][1] if source < pivot else ahead[source][0] for source in range(len(sizes))]
+        cuts[pivot] = middles[pivot]
+        rank = sum(cuts)
+        if rank == offset:
+            return cuts
+        if rank < offset:
+            low = [max(bound, cut) for bound, cut in zip(low, cuts)]
+            low[pivot] = middles[pivot] + 1
+        else:
+            high = [min(bound, cut) for bound, cut in zip(high, cuts)]
+
+
+def _merge_pages(pages, sort_by, descending, offset, limit):
+    """
+    Merge per-source query pages (each covering offset + limit rows) into one page
+    """
+    merged = heapq.merge(*[page['items'] for page in pages], key=itemgetter(sort_by), reverse=descending)
+    items = list(islice(merged, offset, offset + limit + 1))
+    has_more = len(items) > limit or any(page['has_more'] for page in pages)
+    del items[limit:]
+    totals = [page['total'] for page in pages]
+    total = None if None in totals else sum(totals)
+    return {'items': items, 'total': total, 'offset': offset, 'limit': limit, 'has_more': has_more}
+
+
+@contextmanager
+def _hold_locks(locks):
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def consistent_snapshot(*registries):
+    """
+    Read several registries as of a single point in time
+
+    Every stripe lock of every registry is held while the entries are
+    copied, so no write can land in one registry but not another. Locks are
+    taken in a fixed order to avoid deadlocks with concurrent snapshots.
+
+    Args:
+        *registries: RiskScoreRegistry, FraudFlagRegistry or AuditTrail objects
+
+    Returns:
+        list: get_all_* results in the order the registries were given
+    """
+    collected = _collect_consistent(registries)
+    return [registry._assemble(rows) for registry, rows in zip(registries, collected)]
+
+
+def _collect_consistent(registries):
+    """Per-stripe contents of each registry, read at one point in time, in the given order"""
+    ordered = sorted(set(registries), key=id)
+    with _hold_locks([stripe.lock for registry in ordered for stripe in registry._stripes]):
+        collected = {id(registry): registry._collect() for registry in ordered}
+    return [collected[id(registry)] for registry in registries]
+
+
+class _Stripe:
+    def __init__(self, fields):
+        """
+        One lock-protected partition of a keyed registry, mapping tx_id -> entry
+        """
+        self.lock = threading.Lock()
+        self.rows = {}
+        self.indexes = {field: _SortedIndex() for field in ('tx_id',) + fields}
+
+    def _index_keys(self, tx_id, entry):
+        for field, index in self.indexes.items():
+            yield index, tx_id if field == 'tx_id' else entry[field]
+
+    def put(self, tx_id, entry):
+        previous = self.rows.get(tx_id)
+        if previous is not None:
+            for index, key in self._index_keys(tx_id, previous):
+                index.remove(key, tx_id)
+        self.rows[tx_id] = entry
+        for index, key in self._index_keys(tx_id, entry):
+            index.add(key, tx_id)
+
+    def get_row(self, tx_id):
+        entry = self.rows.get(tx_id)
+        return None if entry is None else {'tx_id': tx_id, **entry}
+
+    def rebuild_indexes(self):
+        for field, index in self.indexes.items():
+            if field == 'tx_id':
+                index.rebuild((tx_id, tx_id) for tx_id in self.rows)
+            else:
+                index.rebuild((entry[field], tx_id) for tx_id, entry in self.rows.items())
+
+    def clear(self):
+        self.rows.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+
+class _StripedRegistry:
+    # Indexed entry fields besides tx_id, set by subclasses
+    _FIELDS = ()
+
+    def __init__(self, num_stripes=DEFAULT_STRIPES):
+        """
+        Base for registries partitioned into lock stripes by tx_id hash
+
+        Writers only contend when their transactions hash to the same stripe.
+        Whole-registry reads take every stripe lock, so they see a consistent
+        state.
+
+        Args:
+            num_stripes (int): Number of lock stripes
+        """
+        self._stripes = [_Stripe(self._FIELDS) for _ in range(max(1, num_stripes))]
+
+    def _stripe_for(self, tx_id):
+        return self._stripes[hash(tx_id) % len(self._stripes)]
+
+    def _added(self, tx_ids):
+        # Called with the stripe lock held once entries are stored
+        pass
+
+    def _put(self, tx_id, entry):
+        stripe = self._stripe_for(tx_id)
+        with stripe.lock:
+            stripe.put(tx_id, entry)
+            self._added((tx_id,))
+
+    def _put_many(self, items):
+        # Group by stripe so each lock is taken once per batch
+        grouped = {}
+        for tx_id, entry in items:
+            grouped.setdefault(hash(tx_id) % len(self._stripes), []).append((tx_id, entry))
+        for stripe_index, group in grouped.items():
+            stripe = self._stripes[stripe_index]
+            with stripe.lock:
+                for tx_id, entry in group:
+                    stripe.put(tx_id, entry)
+                self._added(tx_id for tx_id, _ in group)
+
+    def _get(self, tx_id):
+        stripe = self._stripe_for(tx_id)
+        with stripe.lock:
+            return stripe.rows.get(tx_id)
+
+    def _collect(self):
+        # Caller holds every stripe lock
+        return [stripe.rows.copy() for stripe in self._stripes]
+
+    def _assemble(self, collected):
+        merged = {}
+        for rows in collected:
+            merged.update(rows)
+        return merged
+
+    def _all(self):
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            collected = self._collect()
+        return self._assemble(collected)
+
+    def _query(self, ranges, sort_by, descending, offset, limit, restrict=None):
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            return _run_query([(stripe.indexes, stripe.get_row, restrict) for stripe in self._stripes],
+                              ranges, sort_by, descending, offset, limit)
+
+    def _sort_parts(self, sort_by):
+        # Per stripe, (sort index, row ID -> row); caller holds the stripe locks
+        if sort_by not in self._stripes[0].indexes:
+            raise ValueError(f"Cannot sort by '{sort_by}'; expected one of {sorted(self._stripes[0].indexes)}")
+        return [(stripe.indexes[sort_by], stripe.get_row) for stripe in self._stripes]
+
+    def load_entries(self, entries):
+        """
+        Bulk-load stored entries, e.g. when restoring a snapshot
+
+        Args:
+            entries (iterable): (tx_id, entry dict) pairs
+        """
+        grouped = {}
+        for tx_id, entry in entries:
+            grouped.setdefault(hash(tx_id) % len(self._stripes), []).append((tx_id, entry))
+        for stripe_index, group in grouped.items():
+            stripe = self._stripes[stripe_index]
+            with stripe.lock:
+                stripe.rows.update(group)
+                stripe.rebuild_indexes()
+                self._added(tx_id for tx_id, _ in group)
+
+    def __len__(self):
+        return sum(len(stripe.rows) for stripe in self._stripes)
+
+    def clear(self):
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            for stripe in self._stripes:
+                stripe.clear()
+
+
+class RiskScoreRegistry(_StripedRegistry):
+    _FIELDS = ('risk_score', 'timestamp')
+
+    def __init__(self, num_stripes=DEFAULT_STRIPES):
         """
         Initialize the Risk Score Registry to store transaction risk scores
+
+        Args:
+            num_stripes (int): Number of lock stripes for concurrent writers
         """
-        self.scores = {}
-    
+        super().__init__(num_stripes)
+
+    @property
+    def scores(self):
+        """Consistent copy of all stored risk scores, keyed by tx_id"""
+        return self._all()
+
     def store_risk(self, tx_id, risk_score):
         """
         Store a risk score for a transaction
-        
+
         Args:
             tx_id (str): Transaction ID
             risk_score (float): Risk score between 0 and 1
         """
-        self.scores[tx_id] = {
+        self._put(tx_id, {
             'risk_score': risk_score,
-            'timestamp': __import__('datetime').datetime.now().isoformat()
-        }
-    
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def store_risks(self, items):
+        """
+        Store risk scores for a batch of transactions
+
+        Args:
+            items (iterable): (tx_id, risk_score) pairs
+        """
+        timestamp = datetime.now().isoformat()
+        self._put_many((tx_id, {'risk_score': risk_score, 'timestamp': timestamp})
+                       for tx_id, risk_score in items)
+
     def get_risk(self, tx_id):
         """
         Retrieve the risk score for a transaction
-        
+
         Args:
             tx_id (str): Transaction ID
-            
+
         Returns:
             dict: Risk score data or None if not found
         """
-        return self.scores.get(tx_id)
-    
+        return self._get(tx_id)
+
     def get_all_risks(self):
         """
         Get all stored risk scores
-        
+
         Returns:
-            dict: All risk scores
+            dict: Consistent copy of all risk scores, keyed by tx_id
         """
-        return self.scores
-    
-    def clear(self):
+        return self._all()
+
+    def query(self, min_risk=None, max_risk=None, start_time=None, end_time=None,
+              tx_id_prefix=None, flagged_only=False, fraud_registry=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
         """
-        Clear all stored risk scores
+        Query stored risk scores with filters, sorting and pagination
+
+        Args:
+            min_risk (float): Minimum risk score, inclusive
+            max_risk (float): Maximum risk score, inclusive
+            start_time (datetime or str): Earliest storage time, inclusive
+            end_time (datetime or str): Latest storage time, inclusive
+            tx_id_prefix (str): Only transactions whose ID starts with this
+            flagged_only (bool): Only transactions flagged in fraud_registry
+            fraud_registry (FraudFlagRegistry): Registry used by flagged_only
+            sort_by (str): 'timestamp', 'risk_score' or 'tx_id'
+            descending (bool): Sort in descending order
+            offset (int): Number of matching entries to skip
+            limit (int): Maximum number of entries to return
+
+        Returns:
+            dict: {'items': list of entry dicts with 'tx_id', 'total': int or
+            None if unknown, 'offset', 'limit', 'has_more': bool}
         """
-        self.scores = {}
+        ranges = {}
+        if min_risk is not None or max_risk is not None:
+            ranges['risk_score'] = (min_risk, max_risk)
+        if start_time is not None or end_time is not None:
+            ranges['timestamp'] = (_time_key(start_time), _time_key(end_time))
+        if tx_id_prefix:
+            ranges['tx_id'] = (tx_id_prefix, tx_id_prefix + _PREFIX_END)
+        restrict = None
+        if flagged_only:
+            # Read the flags before taking this registry's locks
+            restrict = fraud_registry.flagged_ids() if fraud_registry is not None else frozenset()
+        return self._query(ranges, sort_by, descending, offset, limit, restrict)
 
 
-class FraudFlagRegistry:
-    def __init__(self):
+class FraudFlagRegistry(_StripedRegistry):
+    _FIELDS = ('timestamp',)
+
+    def __init__(self, num_stripes=DEFAULT_STRIPES):
         """
         Initialize the Fraud Flag Registry to store fraud alerts
+
+        Args:
+            num_stripes (int): Number of lock stripes for concurrent writers
         """
-        self.flags = {}
-    
+        super().__init__(num_stripes)
+        # IDs of flagged transactions, kept up to date on every write, and
+        # the frozen copy handed to flagged_only queries
+        self._flagged_lock = threading.Lock()
+        self._flagged = set()
+        self._flagged_view = frozenset()
+        self._flagged_changed = False
+
+    def _added(self, tx_ids):
+        with self._flagged_lock:
+            size = len(self._flagged)
+            self._flagged.update(tx_ids)
+            if len(self._flagged) != size:
+                self._flagged_changed = True
+
+    @property
+    def flags(self):
+        """Consistent copy of all fraud flags, keyed by tx_id"""
+        return self._all()
+
     def flag_fraud(self, tx_id, reason):
         """
         Flag a transaction as fraudulent
-        
+
         Args:
             tx_id (str): Transaction ID
             reason (str): Reason for flagging
         """
-        self.flags[tx_id] = {
+        self._put(tx_id, {
             'reason': reason,
-            'timestamp': __import__('datetime').datetime.now().isoformat()
-        }
-    
+            'timestamp': datetime.now().isoformat()
+        })
+
+    def flag_frauds(self, items):
+        """
+        Flag a batch of transactions as fraudulent
+
+        Args:
+            items (iterable): (tx_id, reason) pairs
+        """
+        timestamp = datetime.now().isoformat()
+        self._put_many((tx_id, {'reason': reason, 'timestamp': timestamp})
+                       for tx_id, reason in items)
+
     def is_flagged(self, tx_id):
         """
         Check if a transaction is flagged as fraudulent
-        
+
         Args:
             tx_id (str): Transaction ID
-            
+
         Returns:
             bool: True if flagged, False otherwise
         """
-        return tx_id in self.flags
-    
+        return self._get(tx_id) is not None
+
     def get_flag(self, tx_id):
         """
         Get fraud flag details for a transaction
-        
+
         Args:
             tx_id (str): Transaction ID
-            
+
         Returns:
             dict: Flag data or None if not found
         """
-        return self.flags.get(tx_id)
-    
+        return self._get(tx_id)
+
     def get_all_flags(self):
         """
         Get all fraud flags
-        
+
         Returns:
-            dict: All fraud flags
+            dict: Consistent copy of all fraud flags, keyed by tx_id
         """
-        return self.flags
-    
+        return self._all()
+
+    def flagged_ids(self):
+        """
+        Get the IDs of all flagged transactions
+
+        The returned set is only rebuilt after new transactions have been
+        flagged, so repeated flagged_only queries do not copy the flags.
+
+        Returns:
+            frozenset: Flagged transaction IDs
+        """
+        with self._flagged_lock:
+            if self._flagged_changed:
+                self._flagged_view = frozenset(self._flagged)
+                self._flagged_changed = False
+            return self._flagged_view
+
     def clear(self):
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            for stripe in self._stripes:
+                stripe.clear()
+            with self._flagged_lock:
+                self._flagged.clear()
+                self._flagged_view = frozenset()
+                self._flagged_changed = False
+
+    def query(self, start_time=None, end_time=None, tx_id_prefix=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
         """
-        Clear all fraud flags
+        Query fraud flags with filters, sorting and pagination
+
+        Args:
+            start_time (datetime or str): Earliest flag time, inclusive
+            end_time (datetime or str): Latest flag time, inclusive
+            tx_id_prefix (str): Only transactions whose ID starts with this
+            sort_by (str): 'timestamp' or 'tx_id'
+            descending (bool): Sort in descending order
+            offset (int): Number of matching flags to skip
+            limit (int): Maximum number of flags to return
+
+        Returns:
+            dict: Query page, see RiskScoreRegistry.query
         """
-        self.flags = {}
+        ranges = {}
+        if start_time is not None or end_time is not None:
+            ranges['timestamp'] = (_time_key(start_time), _time_key(end_time))
+        if tx_id_prefix:
+            ranges['tx_id'] = (tx_id_prefix, tx_id_prefix + _PREFIX_END)
+        return self._query(ranges, sort_by, descending, offset, limit)
 
 
-class AuditTrail:
+class _AuditStripe:
     def __init__(self):
         """
-        Initialize the Audit Trail to store immutable logs
+        One lock-protected partition of the audit trail
+
+        Logs are append-only; indexes refer to positions in self.logs and
+        self.sequences holds each log's global sequence number.
         """
+        self.lock = threading.Lock()
         self.logs = []
-    
+        self.sequences = []
+        self.positions = {}
+        self.indexes = {
+            'tx_id': _SortedIndex(),
+            'risk_score': _SortedIndex(),
+            'timestamp': _SortedIndex(),
+        }
+
+    def append(self, log, sequence):
+        position = len(self.logs)
+        self.logs.append(log)
+        self.sequences.append(sequence)
+        self.positions.setdefault(log['tx_id'], []).append(position)
+        for field, index in self.indexes.items():
+            index.add(log[field], position)
+
+    def rebuild_indexes(self):
+        for field, index in self.indexes.items():
+            index.rebuild((log[field], position) for position, log in enumerate(self.logs))
+
+    def clear(self):
+        self.logs.clear()
+        self.sequences.clear()
+        self.positions.clear()
+        for index in self.indexes.values():
+            index.clear()
+
+
+class AuditTrail:
+    def __init__(self, num_stripes=DEFAULT_STRIPES):
+        """
+        Initialize the Audit Trail to store immutable logs
+
+        Args:
+            num_stripes (int): Number of lock stripes for concurrent writers
+        """
+        self._stripes = [_AuditStripe() for _ in range(max(1, num_stripes))]
+        self._sequence = count()
+
+    def _stripe_for(self, tx_id):
+        return self._stripes[hash(tx_id) % len(self._stripes)]
+
+    @property
+    def logs(self):
+        """Consistent copy of all audit logs, oldest first"""
+        return self.get_all_logs()
+
     def log_audit(self, tx_id, risk_score, timestamp):
         """
         Log an audit entry for a transaction
-        
+
         Args:
             tx_id (str): Transaction ID
             risk_score (float): Risk score
             timestamp (datetime): Timestamp of the transaction
         """
-        self.logs.append({
+        stripe = self._stripe_for(tx_id)
+        log = {
             'tx_id': tx_id,
             'risk_score': risk_score,
             'timestamp': timestamp.isoformat()
-        })
-    
+        }
+        with stripe.lock:
+            stripe.append(log, next(self._sequence))
+
+    def log_audits(self, items):
+        """
+        Log audit entries for a batch of transactions
+
+        Args:
+            items (iterable): (tx_id, risk_score, timestamp) tuples
+        """
+        self._append_many({
+            'tx_id': tx_id,
+            'risk_score': risk_score,
+            'timestamp': timestamp.isoformat()
+        } for tx_id, risk_score, timestamp in items)
+
+    def _append_many(self, logs, rebuild=False):
+        # Number the logs in input order before grouping them by stripe, so
+        # get_all_logs returns a batch in the order it was given
+        grouped = {}
+        num_stripes = len(self._stripes)
+        sequence = self._sequence
+        for log in logs:
+            grouped.setdefault(hash(log['tx_id']) % num_stripes, []).append((log, next(sequence)))
+        for stripe_index, numbered in grouped.items():
+            stripe = self._stripes[stripe_index]
+            with stripe.lock:
+                if rebuild:
+                    for log, number in numbered:
+                        stripe.positions.setdefault(log['tx_id'], []).append(len(stripe.logs))
+                        stripe.logs.append(log)
+                        stripe.sequences.append(number)
+                    stripe.rebuild_indexes()
+                else:
+                    for log, number in numbered:
+                        stripe.append(log, number)
+
     def get_logs_for_transaction(self, tx_id):
         """
         Get all audit logs for a specific transaction
-        
+
         Args:
             tx_id (str): Transaction ID
-            
+
         Returns:
             list: List of audit logs for the transaction
         """
-        return [log for log in self.logs if log['tx_id'] == tx_id]
-    
+        stripe = self._stripe_for(tx_id)
+        with stripe.lock:
+            return [stripe.logs[position] for position in stripe.positions.get(tx_id, [])]
+
+    def _collect(self):
+        # Caller holds every stripe lock
+        return [(stripe.sequences[:], stripe.logs[:]) for stripe in self._stripes]
+
+    def _assemble(self, collected):
+        # Restore global append order from the per-stripe sequence numbers
+        sequences = np.fromiter(chain.from_iterable(seqs for seqs, _ in collected), dtype=np.int64)
+        logs = list(chain.from_iterable(logs for _, logs in collected))
+        return [logs[i] for i in np.argsort(sequences, kind='stable').tolist()]
+
     def get_all_logs(self):
         """
         Get all audit logs
-        
+
+        Returns:
+            list: Consistent copy of all audit logs, oldest first
+        """
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            collected = self._collect()
+        return self._assemble(collected)
+
+    def query(self, min_risk=None, max_risk=None, start_time=None, end_time=None,
+              tx_id_prefix=None, flagged_only=False, fraud_registry=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
+        """
+        Query audit logs with filters, sorting and pagination
+
+        Args:
+            min_risk (float): Minimum risk score, inclusive
+            max_risk (float): Maximum risk score, inclusive
+            start_time (datetime or str): Earliest log timestamp, inclusive
+            end_time (datetime or str): Latest log timestamp, inclusive
+            tx_id_prefix (str): Only transactions whose ID starts with this
+            flagged_only (bool): Only transactions flagged in fraud_registry
+            fraud_registry (FraudFlagRegistry): Registry used by flagged_only
+            sort_by (str): 'timestamp', 'risk_score' or 'tx_id'
+            descending (bool): Sort in descending order
+            offset (int): Number of matching logs to skip
+            limit (int): Maximum number of logs to return
+
         Returns:
-            list: All audit logs
+            dict: Query page, see RiskScoreRegistry.query
+        """
+        ranges = {}
+        if min_risk is not None or max_risk is not None:
+            ranges['risk_score'] = (min_risk, max_risk)
+        if start_time is not None or end_time is not None:
+            ranges['timestamp'] = (_time_key(start_time), _time_key(end_time))
+        if tx_id_prefix:
+            ranges['tx_id'] = (tx_id_prefix, tx_id_prefix + _PREFIX_END)
+        flagged = None
+        if flagged_only:
+            # Read the flags before taking this registry's locks
+            flagged = fraud_registry.flagged_ids() if fraud_registry is not None else frozenset()
+
+        parts = []
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            for stripe in self._stripes:
+                restrict = None
+                if flagged is not None:
+                    # Walk whichever of the flagged IDs and this stripe's IDs is smaller
+                    positions = stripe.positions
+                    if len(flagged) <= len(positions):
+                        tx_ids = [tx_id for tx_id in flagged if tx_id in positions]
+                    else:
+                        tx_ids = [tx_id for tx_id in positions if tx_id in flagged]
+                    restrict = {position for tx_id in tx_ids for position in positions[tx_id]}
+                parts.append((stripe.indexes, stripe.logs.__getitem__, restrict))
+            return _run_query(parts, ranges, sort_by, descending, offset, limit)
+
+    def _sort_parts(self, sort_by):
+        # Per stripe, (sort index, position -> log); caller holds the stripe locks
+        if sort_by not in self._stripes[0].indexes:
+            raise ValueError(f"Cannot sort by '{sort_by}'; expected one of {sorted(self._stripes[0].indexes)}")
+        return [(stripe.indexes[sort_by], stripe.logs.__getitem__) for stripe in self._stripes]
+
+    def load_entries(self, entries):
+        """
+        Bulk-append stored audit logs, e.g. when restoring a snapshot
+
+        Args:
+            entries (iterable): {'tx_id', 'risk_score', 'timestamp'} dicts
         """
-        return self.logs
-    
+        self._append_many(entries, rebuild=True)
+
+    def __len__(self):
+        return sum(len(stripe.logs) for stripe in self._stripes)
+
     def clear(self):
         """
         Clear all audit logs
         """
-        self.logs = []
+        with _hold_locks([stripe.lock for stripe in self._stripes]):
+            for stripe in self._stripes:
+                stripe.clear()
 
 
 # Example usage
@@ -162,13 +1025,16 @@ if __name__ == "__main__":
     risk_registry = RiskScoreRegistry()
     risk_registry.store_risk("tx_001", 0.85)
     print("Risk for tx_001:", risk_registry.get_risk("tx_001"))
-    
+
     # Fraud Flag Registry
     fraud_registry = FraudFlagRegistry()
     fraud_registry.flag_fraud("tx_001", "High risk score")
     print("Is tx_001 flagged?", fraud_registry.is_flagged("tx_001"))
-    
+
     # Audit Trail
     audit_trail = AuditTrail()
-    audit_trail.log_audit("tx_001", 0.85, __import__('datetime').datetime.now())
-    print("Audit logs:", audit_trail.get_all_logs())
\ No newline at end of file
+    audit_trail.log_audit("tx_001", 0.85, datetime.now())
+    print("Audit logs:", audit_trail.get_all_logs())
+
+    # Paginated queries
+    print("High-risk page:", risk_registry.query(min_risk=0.8, sort_by='risk_score', descending=True, limit=10))
@@ -0,0 +1,827 @@
+import hashlib
+import multiprocessing
+import threading
+from bisect import bisect_right, insort
+from heapq import merge
+from itertools import count, islice
+from operator import itemgetter
+
+from fraudguard_app.blockchain_sim.registry import (
+    RiskScoreRegistry, FraudFlagRegistry, AuditTrail, _merge_pages, _select_cuts, _counts_before,
+    _index_position, _time_key, _PREFIX_END
+)
+
+# Ring points per shard; more points spread keys more evenly
+VIRTUAL_NODES = 64
+# Write messages a shard may have unacknowledged before the client waits
+PIPELINE_DEPTH = 8
+# Seconds to wait for a shard process to exit on close()
+SHUTDOWN_TIMEOUT = 5.0
+
+_REGISTRIES = ('risks', 'flags', 'audit')
+
+
+def _ring_hash(key):
+    """Stable 64-bit hash; unlike hash(), it is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    def __init__(self, vnodes=VIRTUAL_NODES):
+        """
+        Initialize a consistent hash ring mapping keys to shards
+
+        Each shard owns vnodes points on the ring; a key belongs to the
+        shard owning the first point at or after the key's hash. Adding a
+        shard only moves the keys that land on its new points.
+
+        Args:
+            vnodes (int): Points per shard
+        """
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = {}
+
+    def add(self, shard):
+        """
+        Add a shard's points to the ring
+
+        Args:
+            shard (int): Shard number
+        """
+        for i in range(self.vnodes):
+            point = _ring_hash(f"shard-{shard}#{i}")
+            if point not in self._owners:
+                self._owners[point] = shard
+                insort(self._points, point)
+
+    def owner(self, key):
+        """
+        Get the shard owning a key
+
+        Args:
+            key (str): Transaction ID
+
+        Returns:
+            int: Shard number
+        """
+        points = self._points
+        position = bisect_right(points, _ring_hash(key))
+        return self._owners[points[position % len(points)]]
+
+    def copy(self):
+        ring = HashRing(self.vnodes)
+        ring._points = self._points[:]
+        ring._owners = dict(self._owners)
+        return ring
+
+    @property
+    def shards(self):
+        return sorted(set(self._owners.values()))
+
+
+class _ShardServer:
+    def __init__(self, shard, num_stripes):
+        """
+        Registries held by one shard process
+
+        Each audit log keeps the client's global sequence number so logs
+        from all shards can be merged back into append order.
+        """
+        self.shard = shard
+        self.risks = RiskScoreRegistry(num_stripes)
+        self.flags = FraudFlagRegistry(num_stripes)
+        self.audit = AuditTrail(num_stripes)
+        self.audit_sequences = []
+
+    def log_audits(self, items):
+        for sequence, (tx_id, risk_score, timestamp) in items:
+            self.audit.log_audit(tx_id, risk_score, timestamp)
+            self.audit_sequences.append(sequence)
+
+    def all_logs(self):
+        return list(zip(self.audit_sequences, self.audit.get_all_logs()))
+
+    def load_logs(self, items):
+        items = sorted(items, key=itemgetter(0))
+        self.audit.load_entries(log for _, log in items)
+        self.audit_sequences.extend(sequence for sequence, _ in items)
+
+    def extract(self, ring):
+        """Remove and return the entries this shard no longer owns on ring"""
+        owners = {}
+
+        def stays(tx_id):
+            owner = owners.get(tx_id)
+            if owner is None:
+                owner = owners[tx_id] = ring.owner(tx_id)
+            return owner == self.shard
+
+        moved = {}
+        for name in ('risks', 'flags'):
+            registry = getattr(self, name)
+            entries = registry._all()
+            moved[name] = [(tx_id, entry) for tx_id, entry in entries.items() if not stays(tx_id)]
+            if moved[name]:
+                registry.clear()
+                registry.load_entries((tx_id, entry) for tx_id, entry in entries.items() if stays(tx_id))
+        logs = self.all_logs()
+        moved['audit'] = [item for item in logs if not stays(item[1]['tx_id'])]
+        if moved['audit']:
+            self.clear_audit()
+            self.load_logs(item for item in logs if stays(item[1]['tx_id']))
+        return moved
+
+    def load(self, moved):
+        self.risks.load_entries(moved['risks'])
+        self.flags.load_entries(moved['flags'])
+        self.load_logs(moved['audit'])
+
+    def sizes(self):
+        return {'risk_scores': len(self.risks), 'fraud_flags': len(self.flags), 'audit_logs': len(self.audit)}
+
+    def clear_audit(self):
+        self.audit.clear()
+        self.audit_sequences = []
+
+    # Rank selection across shards (see _page_query) reads each stripe's
+    # sort index directly; a shard runs one request at a time, so the
+    # stripes cannot change under it
+
+    def index_spans(self, target, sort_by, low, high):
+        return [index.bounds(low, high) for index, _ in getattr(self, target)._sort_parts(sort_by)]
+
+    def index_keys(self, target, sort_by, positions):
+        parts = getattr(self, target)._sort_parts(sort_by)
+        return {stripe: parts[stripe][0].key_at(position) for stripe, position in positions.items()}
+
+    def index_bounds(self, target, sort_by, key):
+        return [index.bounds(key, key) for index, _ in getattr(self, target)._sort_parts(sort_by)]
+
+    def index_page(self, target, sort_by, windows, descending, limit):
+        parts = getattr(self, target)._sort_parts(sort_by)
+        return [[(key, get_row(row_id)) for key, row_id in islice(index.iter_items(start, end, descending), limit)]
+                for (index, get_row), (start, end) in zip(parts, windows)]
+
+    def clear(self):
+        self.risks.clear()
+        self.flags.clear()
+        self.clear_audit()
+
+    def handle(self, target, method, args, kwargs):
+        if target is None:
+            return getattr(self, method)(*args, **kwargs)
+        if target not in _REGISTRIES:
+            raise ValueError(f"Unknown registry '{target}'")
+        if method == 'query' and kwargs.get('flagged_only'):
+            # A transaction's flag lives on the same shard as its other entries
+            kwargs['fraud_registry'] = self.flags
+        return getattr(getattr(self, target), method)(*args, **kwargs)
+
+
+def _serve(connection, shard, num_stripes):
+    """
+    Shard process main loop: run each message's requests in order and reply once
+
+    A message is a list of (target, method, args, kwargs) requests; the
+    reply lists ('ok', result) or ('error', exception) per request.
+    """
+    server = _ShardServer(shard, num_stripes)
+    while True:
+        try:
+            requests = connection.recv()
+        except EOFError:
+            return
+        if requests is None:
+            connection.close()
+            return
+        replies = []
+        for target, method, args, kwargs in requests:
+            try:
+                replies.append(('ok', server.handle(target, method, args, kwargs)))
+            except Exception as e:
+                replies.append(('error', e))
+        connection.send(replies)
+
+
+class ShardedRegistryService:
+    def __init__(self, num_shards=4, vnodes=VIRTUAL_NODES, num_stripes=1, pipeline_depth=PIPELINE_DEPTH):
+        """
+        Initialize registries partitioned across local shard processes
+
+        Every shard process holds its own RiskScoreRegistry,
+        FraudFlagRegistry and AuditTrail, and all entries for a tx_id live
+        on the shard a consistent hash ring assigns it. The client talks to
+        the shards over pipes (socket pairs on Linux): a batch call sends
+        each shard its share of the batch as one message before waiting for
+        any reply, so the shards work in parallel. Writes are pipelined:
+        they return once sent, with up to pipeline_depth unacknowledged
+        messages per shard. Each shard applies its messages in order, so
+        reads always see earlier writes. Reads of the whole registry and
+        queries fan out to every shard and merge the results.
+
+        risk_scores, fraud_flags and audit_trail expose the registry APIs.
+        One client may be shared between threads; its calls are serialized.
+
+        Args:
+            num_shards (int): Shard processes to start
+            vnodes (int): Ring points per shard
+            num_stripes (int): Lock stripes per registry inside a shard;
+                each shard serves one request at a time, so one is enough
+            pipeline_depth (int): Unacknowledged write messages per shard;
+                0 waits for every write
+        """
+        self.num_stripes = num_stripes
+        self.pipeline_depth = pipeline_depth
+        self.ring = HashRing(vnodes)
+        self._context = multiprocessing.get_context()
+        self._connections = {}
+        self._processes = {}
+        self._pending = {}
+        self._sequence = count()
+        # Reentrant so a paged query can hold it across several exchanges
+        self._lock = threading.RLock()
+        for shard in range(max(1, num_shards)):
+            self._start(shard)
+            self.ring.add(shard)
+        self.risk_scores = ShardedRiskScoreRegistry(self)
+        self.fraud_flags = ShardedFraudFlagRegistry(self)
+        self.audit_trail = ShardedAuditTrail(self)
+
+    def _start(self, shard):
+        connection, child = self._context.Pipe()
+        process = self._context.Process(target=_serve, args=(child, shard, self.num_stripes),
+                                        name=f"registry-shard-{shard}", daemon=True)
+        process.start()
+        child.close()
+        self._connections[shard] = connection
+        self._processes[shard] = process
+        self._pending[shard] = 0
+
+    @property
+    def num_shards(self):
+        return len(self._connections)
+
+    def _send(self, shard, requests):
+        # Caller holds self._lock
+        self._connections[shard].send(requests)
+        self._pending[shard] += 1
+
+    def _receive(self, shard):
+        """Read the oldest outstanding reply from a shard; caller holds self._lock"""
+        replies = self._connections[shard].recv()
+        self._pending[shard] -= 1
+        return replies
+
+    def _drain(self, shard, keep=0):
+        """Read write replies until at most keep are outstanding; first error found, if any"""
+        error = None
+        while self._pending[shard] > keep:
+            for status, value in self._receive(shard):
+                if status == 'error' and error is None:
+                    error = value
+        return error
+
+    def _exchange(self, messages, wait=True):
+        """
+        Send each shard its requests, then collect every reply
+
+        Writes pass wait=False: they return once sent, and their replies
+        are read later, by the next call that waits or once a shard has
+        pipeline_depth of them outstanding. A failed write is raised then.
+
+        Args:
+            messages (dict): Shard -> list of (target, method, args, kwargs)
+            wait (bool): Wait for and return the results
+
+        Returns:
+            dict: Shard -> list of results in request order, or None
+        """
+        errors = []
+        replies = {}
+        with self._lock:
+            for shard, requests in messages.items():
+                self._send(shard, requests)
+            for shard in messages:
+                error = self._drain(shard, keep=1 if wait else self.pipeline_depth)
+                if error is not None:
+                    errors.append(error)
+                if wait:
+                    replies[shard] = self._receive(shard)
+        if errors:
+            raise errors[0]
+        if not wait:
+            return None
+        results = {}
+        for shard, shard_replies in replies.items():
+            results[shard] = []
+            for status, value in shard_replies:
+                if status == 'error':
+                    raise value
+                results[shard].append(value)
+        return results
+
+    def flush(self):
+        """
+        Wait for every pipelined write to be applied
+
+        Raises:
+            Exception: The first error a pipelined write raised on its shard
+        """
+        with self._lock:
+            errors = [self._drain(shard) for shard in self._connections]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            raise errors[0]
+
+    def _call(self, tx_id, target, method, *args):
+        shard = self.ring.owner(tx_id)
+        return self._exchange({shard: [(target, method, args, {})]})[shard][0]
+
+    def _write(self, tx_id, target, method, *args):
+        self._exchange({self.ring.owner(tx_id): [(target, method, args, {})]}, wait=False)
+
+    def _broadcast(self, target, method, *args, **kwargs):
+        messages = {shard: [(target, method, args, kwargs)] for shard in self._connections}
+        return [results[0] for results in self._exchange(messages).values()]
+
+    def _scatter(self, target, method, items, key=itemgetter(0), numbered=False):
+        """
+        Split a write batch by owning shard and send each shard its part, pipelined
+
+        With numbered, each item is sent as (sequence, item) with the next
+        global sequence numbers. They are taken in the same critical
+        section that sends the batch, so every shard receives its numbers
+        in increasing order, whatever other threads write.
+        """
+        items = list(items)
+        with self._lock:
+            owner = self.ring.owner
+            grouped = {}
+            for item in items:
+                grouped.setdefault(owner(key(item)), []).append((next(self._sequence), item) if numbered else item)
+            if grouped:
+                self._exchange({shard: [(target, method, (group,), {})] for shard, group in grouped.items()},
+                               wait=False)
+
+    def add_shard(self):
+        """
+        Start one more shard process and move the keys it now owns onto it
+
+        Only entries whose ring owner changed are moved; every other entry
+        stays where it is. Other calls wait until the move is done.
+
+        Returns:
+            dict: The new shard number and the entries moved per registry
+        """
+        shard = max(self._connections) + 1
+        ring = self.ring.copy()
+        ring.add(shard)
+        with self._lock:
+            old_shards = list(self._connections)
+            errors = [self._drain(existing) for existing in old_shards]
+            errors = [error for error in errors if error is not None]
+            if errors:
+                raise errors[0]
+            self._start(shard)
+            for existing in old_shards:
+                self._send(existing, [(None, 'extract', (ring,), {})])
+            moved = {'risks': [], 'flags': [], 'audit': []}
+            for existing in old_shards:
+                status, value = self._receive(existing)[0]
+                if status == 'error':
+                    errors.append(value)
+                    continue
+                for name, entries in value.items():
+                    moved[name].extend(entries)
+            if errors:
+                raise errors[0]
+            self._send(shard, [(None, 'load', (moved,), {})])
+            status, value = self._receive(shard)[0]
+            if status == 'error':
+                raise value
+            self.ring = ring
+        return {'shard': shard, 'risk_scores': len(moved['risks']), 'fraud_flags': len(moved['flags']),
+                'audit_logs': len(moved['audit'])}
+
+    def sizes(self):
+        """
+        Get the number of entries each shard holds
+
+        Returns:
+            dict: Shard -> {'risk_scores', 'fraud_flags', 'audit_logs'}
+        """
+        messages = {shard: [(None, 'sizes', (), {})] for shard in self._connections}
+        return {shard: results[0] for shard, results in sorted(self._exchange(messages).items())}
+
+    def clear(self):
+        """
+        Clear every registry on every shard
+        """
+        self._broadcast(None, 'clear')
+
+    def close(self):
+        """
+        Stop the shard processes
+        """
+        with self._lock:
+            for connection in self._connections.values():
+                try:
+                    # Shards finish the writes already sent before they stop
+                    connection.send(None)
+                except (BrokenPipeError, OSError):
+                    pass
+            for shard, process in self._processes.items():
+                process.join(SHUTDOWN_TIMEOUT)
+                if process.is_alive():
+                    process.terminate()
+                self._connections[shard].close()
+            self._connections.clear()
+            self._processes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# Query arguments bounding each sortable field
+_RANGE_ARGUMENTS = {'risk_score': ('min_risk', 'max_risk'), 'timestamp': ('start_time', 'end_time')}
+
+
+def _sort_key_range(sort_by, filters):
+    """(low, high) bounds of a query filtering on nothing but its sort key, else None"""
+    # Unset arguments, as the registries' query() reads them
+    filters = {name: value for name, value in filters.items()
+               if value is not None and not (name in ('tx_id_prefix', 'flagged_only') and not value)}
+    if sort_by == 'tx_id':
+        if set(filters) - {'tx_id_prefix'}:
+            return None
+        prefix = filters.get('tx_id_prefix')
+        return (prefix, prefix + _PREFIX_END) if prefix else (None, None)
+    low, high = _RANGE_ARGUMENTS.get(sort_by, (None, None))
+    if low is None or set(filters) - {low, high}:
+        return None
+    if sort_by == 'timestamp':
+        return _time_key(filters.get(low)), _time_key(filters.get(high))
+    return filters.get(low), filters.get(high)
+
+
+def _page_query(service, target, offset, limit, sort_by, descending, **filters):
+    """
+    Query every shard and merge one page
+
+    When the only filter is a range on the sort key, every shard stripe's
+    sort index is a source for rank selection (see _select_cuts): the
+    client holds its lock while it asks the shards for keys and counts,
+    O(log n) round trips, then fetches at most limit rows per stripe, so
+    a page costs the same at any offset. Otherwise each shard returns its
+    first offset + limit matches and the client merges them.
+    """
+    offset = max(0, offset)
+    limit = max(0, limit)
+    bounds = _sort_key_range(sort_by, filters)
+    if bounds is None:
+        pages = service._broadcast(target, 'query', sort_by=sort_by, descending=descending,
+                                   offset=0, limit=offset + limit, **filters)
+        return _merge_pages(pages, sort_by, descending, offset, limit)
+
+    with service._lock:
+        replies = service._exchange({shard: [(None, 'index_spans', (target, sort_by) + bounds, {})]
+                                     for shard in service._connections})
+        spans_by_shard = {shard: replies[shard][0] for shard in sorted(replies)}
+        # Sources in merge order: by shard, then stripe
+        sources = [(shard, stripe) for shard, spans in spans_by_shard.items() for stripe in range(len(spans))]
+        spans = [span for shard_spans in spans_by_shard.values() for span in shard_spans]
+        sizes = [end - start for start, end in spans]
+
+        def keys_at(positions):
+            requests = {}
+            for source, q in positions.items():
+                shard, stripe = sources[source]
+                requests.setdefault(shard, {})[stripe] = _index_position(spans[source], q, descending)
+            results = service._exchange({shard: [(None, 'index_keys', (target, sort_by, stripes), {})]
+                                         for shard, stripes in requests.items()})
+            return {source: results[shard][0][stripe] for source, (shard, stripe) in enumerate(sources)
+                    if source in positions}
+
+        def counts(key):
+            results = service._exchange({shard: [(None, 'index_bounds', (target, sort_by, key), {})]
+                                         for shard in spans_by_shard})
+            key_bounds = [bound for shard in spans_by_shard for bound in results[shard][0]]
+            return [_counts_before(bound, span, descending) for bound, span in zip(key_bounds, spans)]
+
+        cuts = _select_cuts(sizes, offset, keys_at, counts, descending)
+        windows = {}
+        for (shard, _), (start, end), cut in zip(sources, spans, cuts):
+            windows.setdefault(shard, []).append((start, end - cut) if descending else (start + cut, end))
+        results = service._exchange({shard: [(None, 'index_page', (target, sort_by, shard_windows, descending,
+                                                                   limit), {})]
+                                     for shard, shard_windows in windows.items()})
+    streams = [rows for shard in spans_by_shard for rows in results[shard][0]]
+    items = [row for _, row in islice(merge(*streams, key=itemgetter(0), reverse=descending), limit)]
+    total = sum(sizes)
+    return {'items': items, 'total': total, 'offset': offset, 'limit': limit,
+            'has_more': offset + len(items) < total}
+
+
+class ShardedRiskScoreRegistry:
+    def __init__(self, service):
+        """
+        RiskScoreRegistry API over a ShardedRegistryService
+
+        Args:
+            service (ShardedRegistryService): Service holding the shards
+        """
+        self._service = service
+
+    @property
+    def scores(self):
+        """Copy of all stored risk scores, keyed by tx_id"""
+        return self.get_all_risks()
+
+    def store_risk(self, tx_id, risk_score):
+        """
+        Store a risk score for a transaction
+
+        Args:
+            tx_id (str): Transaction ID
+            risk_score (float): Risk score between 0 and 1
+        """
+        self._service._write(tx_id, 'risks', 'store_risk', tx_id, risk_score)
+
+    def store_risks(self, items):
+        """
+        Store risk scores for a batch of transactions, one message per shard
+
+        Args:
+            items (iterable): (tx_id, risk_score) pairs
+        """
+        self._service._scatter('risks', 'store_risks', items)
+
+    def get_risk(self, tx_id):
+        """
+        Retrieve the risk score for a transaction
+
+        Args:
+            tx_id (str): Transaction ID
+
+        Returns:
+            dict: Risk score data or None if not found
+        """
+        return self._service._call(tx_id, 'risks', 'get_risk', tx_id)
+
+    def get_all_risks(self):
+        """
+        Get all stored risk scores
+
+        Returns:
+            dict: Copy of all risk scores from every shard
+        """
+        merged = {}
+        for scores in self._service._broadcast('risks', 'get_all_risks'):
+            merged.update(scores)
+        return merged
+
+    def query(self, min_risk=None, max_risk=None, start_time=None, end_time=None,
+              tx_id_prefix=None, flagged_only=False, fraud_registry=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
+        """
+        Query stored risk scores across shards, see RiskScoreRegistry.query
+
+        flagged_only reads each shard's own flags, which always live next
+        to the risk scores of the same transactions; fraud_registry is
+        accepted for compatibility and ignored.
+
+        Returns:
+            dict: Query page with 'items', 'total', 'offset', 'limit', 'has_more'
+        """
+        return _page_query(self._service, 'risks', offset, limit, sort_by, descending,
+                           min_risk=min_risk, max_risk=max_risk, start_time=start_time, end_time=end_time,
+                           tx_id_prefix=tx_id_prefix, flagged_only=flagged_only)
+
+    def load_entries(self, entries):
+        """
+        Bulk-load stored entries, e.g. when restoring a snapshot
+
+        Args:
+            entries (iterable): (tx_id, entry dict) pairs
+        """
+        self._service._scatter('risks', 'load_entries', entries)
+
+    def __len__(self):
+        return sum(self._service._broadcast('risks', '__len__'))
+
+    def clear(self):
+        self._service._broadcast('risks', 'clear')
+
+
+class ShardedFraudFlagRegistry:
+    def __init__(self, service):
+        """
+        FraudFlagRegistry API over a ShardedRegistryService
+
+        Args:
+            service (ShardedRegistryService): Service holding the shards
+        """
+        self._service = service
+
+    @property
+    def flags(self):
+        """Copy of all fraud flags, keyed by tx_id"""
+        return self.get_all_flags()
+
+    def flag_fraud(self, tx_id, reason):
+        """
+        Flag a transaction as fraudulent
+
+        Args:
+            tx_id (str): Transaction ID
+            reason (str): Reason for flagging
+        """
+        self._service._write(tx_id, 'flags', 'flag_fraud', tx_id, reason)
+
+    def flag_frauds(self, items):
+        """
+        Flag a batch of transactions as fraudulent, one message per shard
+
+        Args:
+            items (iterable): (tx_id, reason) pairs
+        """
+        self._service._scatter('flags', 'flag_frauds', items)
+
+    def is_flagged(self, tx_id):
+        """
+        Check if a transaction is flagged as fraudulent
+
+        Args:
+            tx_id (str): Transaction ID
+
+        Returns:
+            bool: True if flagged, False otherwise
+        """
+        return self._service._call(tx_id, 'flags', 'is_flagged', tx_id)
+
+    def get_flag(self, tx_id):
+        """
+        Get fraud flag details for a transaction
+
+        Args:
+            tx_id (str): Transaction ID
+
+        Returns:
+            dict: Flag data or None if not found
+        """
+        return self._service._call(tx_id, 'flags', 'get_flag', tx_id)
+
+    def get_all_flags(self):
+        """
+        Get all fraud flags
+
+        Returns:
+            dict: Copy of all fraud flags from every shard
+        """
+        merged = {}
+        for flags in self._service._broadcast('flags', 'get_all_flags'):
+            merged.update(flags)
+        return merged
+
+    def query(self, start_time=None, end_time=None, tx_id_prefix=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
+        """
+        Query fraud flags across shards, see FraudFlagRegistry.query
+
+        Returns:
+            dict: Query page with 'items', 'total', 'offset', 'limit', 'has_more'
+        """
+        return _page_query(self._service, 'flags', offset, limit, sort_by, descending,
+                           start_time=start_time, end_time=end_time, tx_id_prefix=tx_id_prefix)
+
+    def load_entries(self, entries):
+        """
+        Bulk-load stored entries, e.g. when restoring a snapshot
+
+        Args:
+            entries (iterable): (tx_id, entry dict) pairs
+        """
+        self._service._scatter('flags', 'load_entries', entries)
+
+    def __len__(self):
+        return sum(self._service._broadcast('flags', '__len__'))
+
+    def clear(self):
+        self._service._broadcast('flags', 'clear')
+
+
+class ShardedAuditTrail:
+    def __init__(self, service):
+        """
+        AuditTrail API over a ShardedRegistryService
+
+        Logs are numbered by the client as they are written, so get_all_logs
+        can merge every shard's logs back into global append order.
+
+        Args:
+            service (ShardedRegistryService): Service holding the shards
+        """
+        self._service = service
+
+    @property
+    def logs(self):
+        """Copy of all audit logs, oldest first"""
+        return self.get_all_logs()
+
+    def log_audit(self, tx_id, risk_score, timestamp):
+        """
+        Log an audit entry for a transaction
+
+        Args:
+            tx_id (str): Transaction ID
+            risk_score (float): Risk score
+            timestamp (datetime): Timestamp of the transaction
+        """
+        self.log_audits([(tx_id, risk_score, timestamp)])
+
+    def log_audits(self, items):
+        """
+        Log audit entries for a batch of transactions, one message per shard
+
+        Args:
+            items (iterable): (tx_id, risk_score, timestamp) tuples
+        """
+        self._service._scatter(None, 'log_audits', items, numbered=True)
+
+    def get_logs_for_transaction(self, tx_id):
+        """
+        Get all audit logs for a specific transaction
+
+        Args:
+            tx_id (str): Transaction ID
+
+        Returns:
+            list: List of audit logs for the transaction
+        """
+        return self._service._call(tx_id, 'audit', 'get_logs_for_transaction', tx_id)
+
+    def get_all_logs(self):
+        """
+        Get all audit logs
+
+        Returns:
+            list: Copy of all audit logs from every shard, oldest first
+        """
+        per_shard = self._service._broadcast(None, 'all_logs')
+        return [log for _, log in merge(*per_shard, key=itemgetter(0))]
+
+    def query(self, min_risk=None, max_risk=None, start_time=None, end_time=None,
+              tx_id_prefix=None, flagged_only=False, fraud_registry=None,
+              sort_by='timestamp', descending=False, offset=0, limit=50):
+        """
+        Query audit logs across shards, see AuditTrail.query
+
+        As with ShardedRiskScoreRegistry.query, flagged_only reads each
+        shard's own flags and fraud_registry is ignored.
+
+        Returns:
+            dict: Query page with 'items', 'total', 'offset', 'limit', 'has_more'
+        """
+        return _page_query(self._service, 'audit', offset, limit, sort_by, descending,
+                           min_risk=min_risk, max_risk=max_risk, start_time=start_time, end_time=end_time,
+                           tx_id_prefix=tx_id_prefix, flagged_only=flagged_only)
+
+    def load_entries(self, entries):
+        """
+        Bulk-append stored audit logs, e.g. when restoring a snapshot
+
+        Args:
+            entries (iterable): {'tx_id', 'risk_score', 'timestamp'} dicts
+        """
+        self._service._scatter(None, 'load_logs', entries, key=itemgetter('tx_id'), numbered=True)
+
+    def __len__(self):
+        return sum(self._service._broadcast('audit', '__len__'))
+
+    def clear(self):
+        self._service._broadcast(None, 'clear_audit')
+
+
+# Example usage
+if __name__ == "__main__":
+    from datetime import datetime
+
+    with ShardedRegistryService(num_shards=4) as service:
+        now = datetime.now()
+        service.risk_scores.store_risks((f"TX{i:05d}", (i % 100) / 100) for i in range(10_000))
+        service.fraud_flags.flag_frauds((f"TX{i:05d}", "High risk score detected") for i in range(0, 10_000, 7))
+        service.audit_trail.log_audits((f"TX{i:05d}", (i % 100) / 100, now) for i in range(10_000))
+        print("Entries per shard:", service.sizes())
+        print("TX00042:", service.risk_scores.get_risk("TX00042"))
+
+        page = service.risk_scores.query(min_risk=0.9, flagged_only=True, sort_by='risk_score',
+                                         descending=True, limit=3)
+        print("Top flagged:", [(item['tx_id'], item['risk_score']) for item in page['items']])
+
+        print("Added shard:", service.add_shard())
+        print("Entries per shard:", service.sizes())
+        print("Audit logs in order:", service.audit_trail.get_all_logs()[0]['tx_id'])
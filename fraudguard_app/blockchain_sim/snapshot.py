@@ -0,0 +1,464 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import chain
+from operator import itemgetter
+
+import numpy as np
+
+from fraudguard_app.blockchain_sim.registry import _collect_consistent
+
+SNAPSHOT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# Names the version subdirectory that holds the current snapshot
+CURRENT_FILE = "CURRENT"
+
+# UTC offset (microseconds) of rows whose timestamp has none
+_NO_OFFSET = np.iinfo(np.int64).min
+_MICROSECOND = timedelta(microseconds=1)
+
+# Column layout of each snapshot table: (column name, column kind)
+TABLE_SCHEMAS = {
+    'risk_scores': [('tx_id', 'string'), ('risk_score', 'float'), ('timestamp', 'datetime')],
+    'fraud_flags': [('tx_id', 'string'), ('reason', 'category'), ('timestamp', 'datetime')],
+    'audit_logs': [('tx_id', 'string'), ('risk_score', 'float'), ('timestamp', 'datetime')],
+}
+
+
+def _encode_strings(values):
+    """
+    Encode a sequence of strings as one UTF-8 byte buffer plus row offsets
+
+    Values that are not strings, such as numeric transaction IDs read from
+    a CSV file, are stored as str(value) and read back as strings.
+
+    Args:
+        values (list): Strings to encode
+
+    Returns:
+        tuple: (data: uint8 array, offsets: int64 array of len(values) + 1)
+    """
+    n = len(values)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    try:
+        joined = ''.join(values)
+    except TypeError:
+        values = list(map(str, values))
+        joined = ''.join(values)
+    blob = joined.encode('utf-8')
+    if len(blob) == len(joined):
+        # Pure ASCII: character lengths are byte lengths
+        np.cumsum(np.fromiter(map(len, values), dtype=np.int64, count=n), out=offsets[1:])
+    else:
+        encoded = [value.encode('utf-8') for value in values]
+        np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=n), out=offsets[1:])
+        blob = b''.join(encoded)
+    return np.frombuffer(blob, dtype=np.uint8), offsets
+
+
+def _encode_categories(values):
+    """
+    Dictionary-encode a sequence of low-cardinality strings
+
+    Args:
+        values (list): Strings to encode
+
+    Returns:
+        tuple: (codes: int32 array, categories: list of str)
+    """
+    lookup = {}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup)) for value in values),
+                        dtype=np.int32, count=len(values))
+    return codes, list(lookup)
+
+
+def _split_utc_offsets(values):
+    """
+    Separate the UTC offsets of ISO timestamps from their wall-clock times
+
+    datetime64 has no time zone, so timestamps that carry an offset are
+    stored as their wall-clock time plus the offset in its own column.
+
+    Args:
+        values (list): ISO 8601 strings written by datetime.isoformat()
+
+    Returns:
+        tuple: (wall-clock ISO strings, int64 array of offsets in
+        microseconds or None if no value has an offset)
+    """
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    # isoformat() without an offset is 19 or 26 characters long
+    candidates = np.flatnonzero((lengths != 19) & (lengths != 26))
+    if not len(candidates):
+        return values, None
+    values = list(values)
+    offsets = np.full(len(values), _NO_OFFSET, dtype=np.int64)
+    for row in candidates.tolist():
+        moment = datetime.fromisoformat(values[row])
+        if moment.tzinfo is not None:
+            offsets[row] = moment.utcoffset() // _MICROSECOND
+            values[row] = moment.replace(tzinfo=None).isoformat()
+    if (offsets == _NO_OFFSET).all():
+        return values, None
+    return values, offsets
+
+
+def _with_utc_offsets(values, offsets):
+    """
+    Append stored UTC offsets to wall-clock ISO strings, inverting _split_utc_offsets
+
+    Args:
+        values (list): Wall-clock ISO 8601 strings
+        offsets (numpy.ndarray): Offsets in microseconds, _NO_OFFSET for none
+
+    Returns:
+        list: ISO 8601 strings as datetime.isoformat() wrote them
+    """
+    for row in np.flatnonzero(offsets != _NO_OFFSET).tolist():
+        zone = timezone(timedelta(microseconds=int(offsets[row])))
+        values[row] = datetime.fromisoformat(values[row]).replace(tzinfo=zone).isoformat()
+    return values
+
+
+def _isoformat(timestamps):
+    """
+    Format datetime64[us] values the way datetime.isoformat() does
+
+    isoformat() leaves out the fraction for whole seconds, so those rows
+    are formatted to the second and the rest to the microsecond.
+
+    Args:
+        timestamps (numpy.ndarray): datetime64[us] values
+
+    Returns:
+        list: ISO 8601 strings
+    """
+    whole = timestamps == timestamps.astype('datetime64[s]')
+    if not whole.any():
+        return np.datetime_as_string(timestamps, unit='us').tolist()
+    return np.where(whole, np.datetime_as_string(timestamps, unit='s'),
+                    np.datetime_as_string(timestamps, unit='us')).tolist()
+
+
+def _write_table(directory, table, columns):
+    """
+    Write the columns of one table as .npy files
+
+    Args:
+        directory (str): Snapshot directory
+        table (str): Table name from TABLE_SCHEMAS
+        columns (dict): Column name -> list of Python values
+
+    Returns:
+        dict: Manifest entry for the table
+    """
+    entry = {'rows': 0, 'columns': {}}
+    for name, kind in TABLE_SCHEMAS[table]:
+        values = columns[name]
+        entry['rows'] = len(values)
+        prefix = os.path.join(directory, f"{table}.{name}")
+        if kind == 'string':
+            data, offsets = _encode_strings(values)
+            np.save(prefix + ".data.npy", data)
+            np.save(prefix + ".offsets.npy", offsets)
+            entry['columns'][name] = {'kind': kind}
+        elif kind == 'category':
+            codes, categories = _encode_categories(values)
+            np.save(prefix + ".codes.npy", codes)
+            entry['columns'][name] = {'kind': kind, 'categories': categories}
+        elif kind == 'float':
+            np.save(prefix + ".npy", np.fromiter(values, dtype=np.float64, count=len(values)))
+            entry['columns'][name] = {'kind': kind}
+        else:
+            values, offsets = _split_utc_offsets(values)
+            np.save(prefix + ".npy", np.array(values, dtype='datetime64[us]'))
+            entry['columns'][name] = {'kind': kind}
+            if offsets is not None:
+                np.save(prefix + ".utcoffset.npy", offsets)
+                entry['columns'][name]['utc_offsets'] = True
+    return entry
+
+
+def _keyed_rows(stripes):
+    """tx_ids and entry dicts of a keyed registry from its per-stripe row dicts"""
+    return list(chain.from_iterable(stripes)), list(chain.from_iterable(rows.values() for rows in stripes))
+
+
+def save_snapshot(directory, risk_registry=None, fraud_registry=None, audit_trail=None):
+    """
+    Save registry state as a columnar snapshot of NumPy .npy files
+
+    Each save writes a new version subdirectory of directory, then points
+    the CURRENT file at it with os.replace, so load_snapshot sees either
+    the old snapshot or the new one, never a half-written one. The version
+    it replaced is kept until the next save; RegistrySnapshot maps its
+    columns when it opens, so removing older versions does not affect
+    snapshots that are already open.
+
+    Args:
+        directory (str): Snapshot directory
+        risk_registry (RiskScoreRegistry): Registry to save, optional
+        fraud_registry (FraudFlagRegistry): Registry to save, optional
+        audit_trail (AuditTrail): Audit trail to save, optional
+
+    Returns:
+        dict: The snapshot manifest
+    """
+    directory = os.path.abspath(directory)
+    os.makedirs(directory, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=directory)
+
+    manifest = {'version': SNAPSHOT_VERSION, 'tables': {}}
+
+    # Read all registries at one point in time; keyed registries are read
+    # stripe by stripe instead of being merged into one dict first
+    registries = [registry for registry in (risk_registry, fraud_registry, audit_trail) if registry is not None]
+    contents = dict(zip(map(id, registries), _collect_consistent(registries)))
+
+    if risk_registry is not None:
+        tx_ids, entries = _keyed_rows(contents[id(risk_registry)])
+        manifest['tables']['risk_scores'] = _write_table(tmp_dir, 'risk_scores', {
+            'tx_id': tx_ids,
+            'risk_score': list(map(itemgetter('risk_score'), entries)),
+            'timestamp': list(map(itemgetter('timestamp'), entries)),
+        })
+
+    if fraud_registry is not None:
+        tx_ids, entries = _keyed_rows(contents[id(fraud_registry)])
+        manifest['tables']['fraud_flags'] = _write_table(tmp_dir, 'fraud_flags', {
+            'tx_id': tx_ids,
+            'reason': list(map(itemgetter('reason'), entries)),
+            'timestamp': list(map(itemgetter('timestamp'), entries)),
+        })
+
+    if audit_trail is not None:
+        logs = audit_trail._assemble(contents[id(audit_trail)])
+        manifest['tables']['audit_logs'] = _write_table(tmp_dir, 'audit_logs', {
+            'tx_id': list(map(itemgetter('tx_id'), logs)),
+            'risk_score': list(map(itemgetter('risk_score'), logs)),
+            'timestamp': list(map(itemgetter('timestamp'), logs)),
+        })
+
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+        json.dump(manifest, f)
+
+    # Version names sort by the time they were published
+    version = f"v{time.time_ns():020d}-{os.path.basename(tmp_dir)[len('.tmp-'):]}"
+    os.rename(tmp_dir, os.path.join(directory, version))
+    previous = _current_version(directory)
+    pointer = os.path.join(directory, f".{CURRENT_FILE}-{version}")
+    with open(pointer, 'w') as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(directory, CURRENT_FILE))
+
+    # Drop versions older than the one just replaced, and the files of a
+    # snapshot written before versioning
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('v') and previous is not None and name < previous:
+            shutil.rmtree(path, ignore_errors=True)
+        elif name == MANIFEST_FILE or name.endswith('.npy'):
+            os.remove(path)
+
+    return manifest
+
+
+def _current_version(directory):
+    """Name of the version subdirectory CURRENT points at, None if there is none"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+class RegistrySnapshot:
+    def __init__(self, directory):
+        """
+        Open a snapshot written by save_snapshot
+
+        Every column file is memory-mapped here, so opening is independent
+        of the snapshot size, pages are read straight from the page cache,
+        and later saves that remove this version do not affect the open
+        snapshot.
+
+        Args:
+            directory (str): Snapshot directory
+        """
+        root = os.path.abspath(directory)
+        while True:
+            version = _current_version(root)
+            # Snapshots written before versioning keep their files in root
+            self.directory = root if version is None else os.path.join(root, version)
+            try:
+                self._open()
+                return
+            except FileNotFoundError:
+                # A save replaced and removed the version while it was opened
+                if version is None or _current_version(root) == version:
+                    raise
+
+    def _open(self):
+        with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version: {self.manifest.get('version')}")
+        self._columns = {}
+        for table, entry in self.manifest['tables'].items():
+            for name, spec in entry['columns'].items():
+                self.column(table, name)
+                if spec.get('utc_offsets'):
+                    self._load(f"{table}.{name}.utcoffset.npy")
+
+    def tables(self):
+        """
+        Get the names of the tables stored in the snapshot
+
+        Returns:
+            list: Table names
+        """
+        return list(self.manifest['tables'])
+
+    def num_rows(self, table):
+        """
+        Get the number of rows in a table
+
+        Args:
+            table (str): Table name
+
+        Returns:
+            int: Row count, 0 if the table is not in the snapshot
+        """
+        entry = self.manifest['tables'].get(table)
+        return entry['rows'] if entry else 0
+
+    def _load(self, filename):
+        if filename not in self._columns:
+            self._columns[filename] = np.load(os.path.join(self.directory, filename), mmap_mode='r')
+        return self._columns[filename]
+
+    def column(self, table, name):
+        """
+        Get the memory-mapped arrays backing a column
+
+        Args:
+            table (str): Table name
+            name (str): Column name
+
+        Returns:
+            numpy.ndarray or tuple: The column array; (data, offsets) for
+            string columns and codes for category columns
+        """
+        kind = self.manifest['tables'][table]['columns'][name]['kind']
+        prefix = f"{table}.{name}"
+        if kind == 'string':
+            return self._load(prefix + ".data.npy"), self._load(prefix + ".offsets.npy")
+        if kind == 'category':
+            return self._load(prefix + ".codes.npy")
+        return self._load(prefix + ".npy")
+
+    def _column_values(self, table, name, start, stop):
+        spec = self.manifest['tables'][table]['columns'][name]
+        kind = spec['kind']
+        if kind == 'string':
+            data, offsets = self.column(table, name)
+            bounds = offsets[start:stop + 1]
+            blob = data[bounds[0]:bounds[-1]].tobytes() if len(bounds) else b''
+            base = bounds[0] if len(bounds) else 0
+            return [blob[a - base:b - base].decode('utf-8') for a, b in zip(bounds[:-1], bounds[1:])]
+        if kind == 'category':
+            categories = spec['categories']
+            return [categories[code] for code in self.column(table, name)[start:stop]]
+        if kind == 'float':
+            return self.column(table, name)[start:stop].tolist()
+        values = _isoformat(self.column(table, name)[start:stop])
+        if spec.get('utc_offsets'):
+            values = _with_utc_offsets(values, self._load(f"{table}.{name}.utcoffset.npy")[start:stop])
+        return values
+
+    def read_page(self, table, offset=0, limit=50):
+        """
+        Read one page of rows from a table
+
+        Args:
+            table (str): Table name
+            offset (int): Index of the first row to read
+            limit (int): Maximum number of rows to read
+
+        Returns:
+            list: Row dictionaries keyed by column name
+        """
+        total = self.num_rows(table)
+        start = max(0, min(offset, total))
+        stop = min(total, start + max(0, limit))
+        if start >= stop:
+            return []
+        columns = [(name, self._column_values(table, name, start, stop))
+                   for name, _ in TABLE_SCHEMAS[table]]
+        return [dict(zip([name for name, _ in columns], row))
+                for row in zip(*[values for _, values in columns])]
+
+    def restore(self, risk_registry=None, fraud_registry=None, audit_trail=None):
+        """
+        Load the snapshot contents back into live registries
+
+        Existing registry contents are replaced.
+
+        Args:
+            risk_registry (RiskScoreRegistry): Registry to restore, optional
+            fraud_registry (FraudFlagRegistry): Registry to restore, optional
+            audit_trail (AuditTrail): Audit trail to restore, optional
+        """
+        if risk_registry is not None:
+            rows = self.read_page('risk_scores', 0, self.num_rows('risk_scores'))
+            risk_registry.clear()
+            risk_registry.load_entries(
+                (row['tx_id'], {'risk_score': row['risk_score'], 'timestamp': row['timestamp']})
+                for row in rows)
+
+        if fraud_registry is not None:
+            rows = self.read_page('fraud_flags', 0, self.num_rows('fraud_flags'))
+            fraud_registry.clear()
+            fraud_registry.load_entries(
+                (row['tx_id'], {'reason': row['reason'], 'timestamp': row['timestamp']})
+                for row in rows)
+
+        if audit_trail is not None:
+            rows = self.read_page('audit_logs', 0, self.num_rows('audit_logs'))
+            audit_trail.clear()
+            audit_trail.load_entries(rows)
+
+
+def load_snapshot(directory):
+    """
+    Open a registry snapshot for memory-mapped reads
+
+    Args:
+        directory (str): Snapshot directory
+
+    Returns:
+        RegistrySnapshot: The opened snapshot
+    """
+    return RegistrySnapshot(directory)
+
+
+# Example usage
+if __name__ == "__main__":
+    from datetime import datetime
+    from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+
+    risk_registry = RiskScoreRegistry()
+    fraud_registry = FraudFlagRegistry()
+    audit_trail = AuditTrail()
+    for i in range(5):
+        risk_registry.store_risk(f"tx_{i:03d}", i / 5)
+        audit_trail.log_audit(f"tx_{i:03d}", i / 5, datetime.now())
+    fraud_registry.flag_fraud("tx_004", "High risk score")
+
+    save_snapshot("snapshots/example", risk_registry, fraud_registry, audit_trail)
+    snapshot = load_snapshot("snapshots/example")
+    print("Tables:", snapshot.tables())
+    print("First page:", snapshot.read_page('risk_scores', 0, 3))
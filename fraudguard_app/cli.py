@@ -0,0 +1,263 @@
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+
+from fraudguard_app.components.risk_rules import DEFAULT_RULES_PATH
+from fraudguard_app.data.readers import INPUT_FORMATS, _open, read_chunks
+
+try:
+    import resource
+except ImportError:  # Peak memory is reported where the platform has it
+    resource = None
+
+# Subcommands import what they need when they run, so `--help` and the
+# NumPy-only scoring path stay fast
+
+# Chunks queued per worker, so reading runs ahead of scoring without
+# holding the whole input
+CHUNKS_IN_FLIGHT = 2
+
+# Detector of this process, set by _init_worker
+_detector = None
+
+
+def _init_worker(rules_path, sensitivity, compact, model_path):
+    """Load this process's detector"""
+    global _detector
+    from fraudguard_app.headless import load_detector
+
+    with redirect_stdout(sys.stderr):
+        _detector = load_detector(rules_path, sensitivity, compact, model_path)
+
+
+def _score_chunk(chunk):
+    """Score one chunk with this process's detector; returns (records, seconds)"""
+    from fraudguard_app.headless import score_records
+
+    start = time.perf_counter()
+    records = score_records(chunk, _detector)
+    return records, time.perf_counter() - start
+
+
+def _scored_chunks(chunks, workers, init_args):
+    """
+    Score chunks in order, in this process or in a pool of worker processes
+
+    Yields:
+        tuple: (records, scoring seconds) per chunk
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield _score_chunk(chunk)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=init_args) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _peak_memory_mb(children=False):
+    """Peak resident set size of this process, or of its largest child, in MB; None where unavailable"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _record_chunk(records, risk_registry, fraud_registry, audit_trail):
+    """Write one chunk of results to the registries with the batch APIs"""
+    from fraudguard_app.components.scoring_backend import flag_reason
+
+    now = datetime.now()
+    risk_registry.store_risks((record['transaction_id'], record['risk_score']) for record in records)
+    fraud_registry.flag_frauds(
+        (record['transaction_id'], flag_reason(record['reasons'])) for record in records if record['is_fraud'])
+    audit_trail.log_audits((record['transaction_id'], record['risk_score'], now) for record in records)
+
+
+def score(args):
+    """
+    Score transactions and stream one JSON result per line
+
+    Registry entries are written per chunk with the batch APIs and saved
+    as a snapshot when --registry is given. A summary with throughput,
+    per-chunk scoring latency and peak memory goes to stderr.
+    """
+    init_args = (args.rules, args.sensitivity, not args.full_model, args.model)
+    start = time.perf_counter()
+    # Load in this process even with workers: it refreshes a stale compact
+    # export once, before the workers look for it
+    _init_worker(*init_args)
+    load_time = time.perf_counter() - start
+
+    registries = None
+    if args.registry:
+        from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+
+        registries = RiskScoreRegistry(), FraudFlagRegistry(), AuditTrail()
+
+    rows = flagged = 0
+    latencies = []
+    sink = _open(args.output, 'w')
+    try:
+        chunks = read_chunks(args.input, args.chunk_size, args.format)
+        for records, seconds in _scored_chunks(chunks, args.workers, init_args):
+            if args.workers > 1:
+                # Workers calibrate on their share of traffic; flag in input
+                # order here so results do not depend on the worker count
+                flags = _detector.apply_threshold([record['decision_score'] for record in records])
+                for record, fraud in zip(records, flags.tolist()):
+                    record['is_fraud'] = fraud
+            sink.write("".join(json.dumps(record) + "\n" for record in records))
+            if registries is not None:
+                _record_chunk(records, *registries)
+            rows += len(records)
+            flagged += sum(record['is_fraud'] for record in records)
+            latencies.append(seconds)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    if registries is not None:
+        from fraudguard_app.blockchain_sim.snapshot import save_snapshot
+
+        save_snapshot(args.registry, *registries)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows:,} transactions ({flagged:,} flagged) with the {_detector.backend.name} "
+          f"backend in {elapsed:.2f}s (model load {load_time:.2f}s), "
+          f"{rows / max(elapsed - load_time, 1e-9):,.0f} rows/s", file=sys.stderr)
+    if latencies:
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+        print(f"Chunk scoring latency over {len(latencies):,} chunks of up to {args.chunk_size:,}: "
+              f"p50 {p50:.1f} ms, p99 {p99:.1f} ms", file=sys.stderr)
+    peak = _peak_memory_mb()
+    if peak is not None:
+        memory = f"Peak memory {peak:,.0f} MB"
+        if args.workers > 1:
+            memory += f", largest worker {_peak_memory_mb(children=True):,.0f} MB"
+        print(memory, file=sys.stderr)
+    return 0
+
+
+def replay(args):
+    """
+    Replay a recorded transaction file through scoring and the registries
+    """
+    from fraudguard_app.data.replay import replay_file
+
+    with redirect_stdout(sys.stderr):
+        report = replay_file(args.input, args.format, factor=args.amplify, batch_size=args.batch_size,
+                             rate=args.rate, seed=args.seed, enable_blockchain=not args.no_registry,
+                             sketch=args.sketch)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+
+    target = f" (target {args.rate:,.0f}/s)" if args.rate else ""
+    print(f"Replayed {report['rows']:,} transactions in {report['batches']:,} batches, "
+          f"{report['flagged']:,} flagged, {report['duplicates']:,} duplicates skipped, "
+          f"{report['seconds']:.2f}s: {report['rows_per_s']:,.0f} rows/s{target}")
+    print(f"Digest {report['digest']}")
+    print(f"{'stage':<8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'total s':>8}")
+    for name, summary in report['stages'].items():
+        if summary:
+            print(f"{name:<8} {summary['p50_ms']:>8.2f} {summary['p90_ms']:>8.2f} {summary['p99_ms']:>8.2f} "
+                  f"{summary['max_ms']:>8.2f} {summary['total_s']:>8.2f}")
+    return 0
+
+
+def export_model(args):
+    """
+    Export the trained model in the compact NumPy-only format
+    """
+    from fraudguard_app.components.fraud_detector import FraudDetector
+
+    forest = FraudDetector(args.rules).export_compact(
+        args.output, n_estimators=args.trees, max_depth=args.max_depth, compress=args.compress)
+    print(f"Exported {forest.n_estimators} trees ({forest.nbytes:,} bytes) to {args.output}",
+          file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    """
+    Build the command line parser
+
+    Returns:
+        argparse.ArgumentParser: The parser
+    """
+    from fraudguard_app.components.fraud_detector import COMPACT_MODEL_PATH
+    from fraudguard_app.data.replay import SAMPLE_RECORDING
+
+    parser = argparse.ArgumentParser(prog="python -m fraudguard_app",
+                                     description="Headless FraudGuard scoring")
+    parser.add_argument("--rules", default=DEFAULT_RULES_PATH, help="Risk rule table")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    score_parser = commands.add_parser("score", help="Score CSV, Parquet or JSON-lines transactions")
+    score_parser.add_argument("--input", "-i", default="-", help="Input file, '-' for stdin")
+    score_parser.add_argument("--format", choices=sorted(set(INPUT_FORMATS.values())),
+                              help="Input format, from the file extension by default")
+    score_parser.add_argument("--output", "-o", default="-", help="JSON-lines output, '-' for stdout")
+    score_parser.add_argument("--model", help="Model file (.npz compact export or saved backend)")
+    score_parser.add_argument("--sensitivity", type=float, default=0.5)
+    score_parser.add_argument("--chunk-size", type=int, default=1000, help="Transactions per chunk")
+    score_parser.add_argument("--workers", type=int, default=1, help="Scoring processes")
+    score_parser.add_argument("--registry", help="Record results and save a registry snapshot here")
+    score_parser.add_argument("--full-model", action="store_true",
+                              help="Score with the sklearn model instead of the compact export")
+    score_parser.set_defaults(func=score)
+
+    replay_parser = commands.add_parser("replay", help="Replay a recording through scoring and the registries")
+    replay_parser.add_argument("--input", "-i", default=SAMPLE_RECORDING, help="Recorded transactions")
+    replay_parser.add_argument("--format", choices=sorted(set(INPUT_FORMATS.values())),
+                               help="Input format, from the file extension by default")
+    replay_parser.add_argument("--amplify", type=int, default=1, help="Replay the recording N times")
+    replay_parser.add_argument("--batch-size", type=int, default=500)
+    replay_parser.add_argument("--rate", type=float, help="Target transactions per second")
+    replay_parser.add_argument("--seed", type=int, default=0)
+    replay_parser.add_argument("--sketch", help="Score sketch .npz to start from, pinning the flag thresholds")
+    replay_parser.add_argument("--no-registry", action="store_true", help="Skip the blockchain registries")
+    replay_parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    replay_parser.set_defaults(func=replay)
+
+    export_parser = commands.add_parser("export-model", help="Write the compact model export")
+    export_parser.add_argument("--output", "-o", default=COMPACT_MODEL_PATH)
+    export_parser.add_argument("--trees", type=int, default=None, help="Trees to keep")
+    export_parser.add_argument("--max-depth", type=int, default=None, help="Prune trees to this depth")
+    export_parser.add_argument("--compress", action="store_true")
+    export_parser.set_defaults(func=export_model)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run the command line interface
+
+    Args:
+        argv (list): Arguments, sys.argv[1:] if omitted
+
+    Returns:
+        int: Exit status
+    """
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
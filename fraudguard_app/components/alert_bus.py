@@ -0,0 +1,328 @@
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import deque
+
+from fraudguard_app.components.latency_stats import LatencyStats
+
+# What publish does when a sink's queue is full: evict the oldest queued
+# alert, refuse the new one, or wait for room (backpressure on the caller)
+POLICIES = ('drop_oldest', 'drop_newest', 'block')
+# Defaults for each sink's queue, delivery batches and retries
+ALERT_QUEUE_SIZE = 10000
+ALERT_BATCH_SIZE = 100
+MAX_RETRIES = 5
+RETRY_BACKOFF = 0.1
+MAX_BACKOFF = 5.0
+
+
+class FileSink:
+    def __init__(self, path, name=None):
+        """
+        Initialize a sink appending alerts to a JSON-lines file
+
+        Args:
+            path (str): File to append to; its directory is created if missing
+            name (str): Sink name in metrics, 'file:<path>' if omitted
+        """
+        self.path = path
+        self.name = name or f"file:{path}"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def deliver(self, alerts):
+        """
+        Append a batch of alerts, one JSON object per line
+
+        Args:
+            alerts (list): Alert dicts
+        """
+        lines = "".join(json.dumps(alert, default=str) + "\n" for alert in alerts)
+        with open(self.path, 'a') as f:
+            f.write(lines)
+
+
+class HttpSink:
+    def __init__(self, url, timeout=5.0, headers=None, name=None):
+        """
+        Initialize a sink POSTing alert batches to an HTTP endpoint
+
+        Args:
+            url (str): Endpoint URL
+            timeout (float): Request timeout in seconds
+            headers (dict): Extra request headers
+            name (str): Sink name in metrics, 'http:<url>' if omitted
+        """
+        self.url = url
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json', **(headers or {})}
+        self.name = name or f"http:{url}"
+
+    def deliver(self, alerts):
+        """
+        POST a batch of alerts as a JSON array
+
+        Args:
+            alerts (list): Alert dicts
+
+        Raises:
+            urllib.error.URLError: If the request fails or the endpoint
+                answers with an error status
+        """
+        body = json.dumps(alerts, default=str).encode()
+        request = urllib.request.Request(self.url, data=body, headers=self.headers, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class CallableSink:
+    def __init__(self, function, name=None):
+        """
+        Initialize a sink calling a function with each batch of alerts
+
+        Args:
+            function (callable): Called with a list of alert dicts; raising
+                marks the batch as failed and retries it
+            name (str): Sink name in metrics, the function name if omitted
+        """
+        self.function = function
+        self.name = name or getattr(function, '__name__', 'callable')
+
+    def deliver(self, alerts):
+        self.function(alerts)
+
+
+class _SinkQueue:
+    def __init__(self, sink, max_queue, batch_size, policy, max_retries, backoff, max_backoff):
+        """Bounded queue and delivery thread for one sink"""
+        self.sink = sink
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.policy = policy
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # Time from publish to delivery of the oldest alert in each batch
+        self.lag = LatencyStats()
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.max_depth = 0
+        self._thread = threading.Thread(target=self._run, name=f"alerts-{sink.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, alerts, block_timeout):
+        now = time.monotonic()
+        with self._condition:
+            self.published += len(alerts)
+            for alert in alerts:
+                if len(self._queue) >= self.max_queue:
+                    if self.policy == 'drop_oldest':
+                        self._queue.popleft()
+                        self.dropped += 1
+                    elif self.policy == 'block':
+                        deadline = None if block_timeout is None else time.monotonic() + block_timeout
+                        while len(self._queue) >= self.max_queue and not self._closed:
+                            remaining = None if deadline is None else deadline - time.monotonic()
+                            if remaining is not None and remaining <= 0:
+                                break
+                            # The delivery thread may still be asleep on an empty queue
+                            self._condition.notify_all()
+                            self._condition.wait(remaining)
+                    if len(self._queue) >= self.max_queue or self._closed:
+                        self.dropped += 1
+                        continue
+                self._queue.append((now, alert))
+                self.max_depth = max(self.max_depth, len(self._queue))
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+                self._in_flight = len(batch)
+                # Room was freed for publishers blocked on a full queue
+                self._condition.notify_all()
+            self._deliver(batch)
+            with self._condition:
+                self._in_flight = 0
+                self._condition.notify_all()
+
+    def _deliver(self, batch):
+        alerts = [alert for _, alert in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink.deliver(alerts)
+            except Exception:
+                if attempt == self.max_retries:
+                    with self._condition:
+                        self.failed += len(batch)
+                    return
+                with self._condition:
+                    self.retries += 1
+                    # Exponential backoff, cut short by close()
+                    self._condition.wait_for(lambda: self._closed,
+                                             min(self.max_backoff, self.backoff * 2 ** attempt))
+                continue
+            self.lag.record(time.monotonic() - batch[0][0], len(batch))
+            with self._condition:
+                self.delivered += len(batch)
+                self.batches += 1
+            return
+
+    def flush(self, deadline):
+        with self._condition:
+            while self._queue or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def close(self, deadline):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def metrics(self):
+        lag = self.lag.summary()
+        with self._condition:
+            oldest = time.monotonic() - self._queue[0][0] if self._queue else 0.0
+            return {
+                'depth': len(self._queue),
+                'max_depth': self.max_depth,
+                'published': self.published,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'retries': self.retries,
+                'batches': self.batches,
+                'oldest_age_s': oldest,
+                'lag_p50_ms': lag['p50_ms'],
+                'lag_p99_ms': lag['p99_ms'],
+            }
+
+
+class AlertBus:
+    def __init__(self, sinks, max_queue=ALERT_QUEUE_SIZE, batch_size=ALERT_BATCH_SIZE,
+                 policy='drop_oldest', max_retries=MAX_RETRIES, backoff=RETRY_BACKOFF,
+                 max_backoff=MAX_BACKOFF, block_timeout=None):
+        """
+        Initialize an asynchronous fan-out of fraud alerts to several sinks
+
+        Every sink gets its own bounded queue and delivery thread, so a slow
+        or failing sink only delays its own deliveries. Delivery threads
+        send whatever has queued up, up to batch_size alerts per call, and
+        retry a failed batch with exponential backoff before counting it as
+        failed. When a queue is full, the policy decides what gives.
+
+        Args:
+            sinks (list): Objects with a name and a deliver(alerts) method,
+                e.g. FileSink, HttpSink or CallableSink
+            max_queue (int): Alerts that may wait per sink
+            batch_size (int): Most alerts per delivery
+            policy (str): One of POLICIES
+            max_retries (int): Retries of a failed batch before it is dropped
+            backoff (float): First retry delay in seconds, doubled each retry
+            max_backoff (float): Longest retry delay in seconds
+            block_timeout (float): With the 'block' policy, longest wait for
+                room before the alert is dropped; no limit if None
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        names = [sink.name for sink in sinks]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Sink names must be unique: {names}")
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self._queues = [_SinkQueue(sink, max_queue, batch_size, policy, max_retries, backoff, max_backoff)
+                        for sink in sinks]
+
+    def publish(self, alerts):
+        """
+        Queue alerts for every sink
+
+        Returns at once unless the policy is 'block' and a queue is full.
+
+        Args:
+            alerts (list): Alert dicts; sinks receive the same objects, so
+                they must not be modified afterwards
+        """
+        alerts = list(alerts)
+        if alerts:
+            for sink_queue in self._queues:
+                sink_queue.put(alerts, self.block_timeout)
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued alert was delivered or given up on
+
+        Args:
+            timeout (float): Longest wait in seconds, no limit if None
+
+        Returns:
+            bool: Whether all queues drained in time
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        return all([sink_queue.flush(deadline) for sink_queue in self._queues])
+
+    def close(self, timeout=None):
+        """
+        Deliver what is queued and stop the delivery threads
+
+        Pending retry delays are cut short; a batch still failing is
+        counted as failed.
+
+        Args:
+            timeout (float): Longest wait in seconds, no limit if None
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for sink_queue in self._queues:
+            sink_queue.close(deadline)
+
+    def metrics(self):
+        """
+        Get per-sink queue and delivery metrics
+
+        Returns:
+            dict: Sink name -> depth, max_depth, published (every alert
+                offered, delivered or not), delivered, dropped, failed,
+                retries, batches, oldest_age_s (age of the oldest queued
+                alert) and lag_p50_ms/lag_p99_ms (publish to delivery, over
+                recent batches)
+        """
+        return {sink_queue.sink.name: sink_queue.metrics() for sink_queue in self._queues}
+
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+    from datetime import datetime
+
+    def slow_case_manager(alerts):
+        time.sleep(0.05)
+
+    path = os.path.join(tempfile.mkdtemp(), "alerts.jsonl")
+    bus = AlertBus([FileSink(path), CallableSink(slow_case_manager)], max_queue=500, batch_size=50)
+    start = time.perf_counter()
+    for i in range(1000):
+        bus.publish([{'transaction_id': f"TX{i:06d}", 'risk_score': 0.9, 'timestamp': datetime.now()}])
+    print(f"Published 1000 alerts in {(time.perf_counter() - start) * 1000:.1f} ms")
+    bus.close()
+    for name, metrics in bus.metrics().items():
+        print(name, metrics)
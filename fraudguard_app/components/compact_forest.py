@@ -0,0 +1,248 @@
+import numpy as np
+
+# Rows walked together; keeps the (rows x trees) walker arrays cache-sized
+CHUNK_ROWS = 256
+
+
+def average_path_length(n_samples):
+    """
+    Expected path length of an unsuccessful search in a binary search tree of n_samples
+
+    Matches sklearn.ensemble._iforest._average_path_length.
+
+    Args:
+        n_samples (array-like): Sample counts
+
+    Returns:
+        numpy.ndarray: Average path lengths
+    """
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros(n_samples.shape)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    lengths[large] = (2.0 * (np.log(n_samples[large] - 1.0) + np.euler_gamma)
+                      - 2.0 * (n_samples[large] - 1.0) / n_samples[large])
+    return lengths
+
+
+def _node_dtype(n_features, max_nodes):
+    """Packed per-node record using the narrowest feature and child index types"""
+    feature = np.uint8 if n_features <= np.iinfo(np.uint8).max else np.uint16
+    index = np.uint16 if max_nodes <= np.iinfo(np.uint16).max else np.int32
+    return np.dtype([('feature', feature), ('threshold', np.float32), ('left', index),
+                     ('right', index), ('value', np.float32)])
+
+
+def _prune_tree(structure, features, max_depth, min_samples):
+    """
+    Flatten one fitted tree into (feature, threshold, left, right, value) lists
+
+    Nodes deeper than max_depth or with fewer than min_samples training
+    samples become leaves. As in IsolationForest, a leaf's value is its
+    depth plus the average path length of the samples it holds.
+
+    Returns:
+        tuple: (nodes, depth of the deepest leaf)
+    """
+    nodes = []
+    deepest = 0
+    stack = [(0, 0, None, None)]  # (sklearn node, depth, parent slot, side)
+    while stack:
+        node, depth, parent, side = stack.pop()
+        slot = len(nodes)
+        if parent is not None:
+            nodes[parent][side] = slot
+        left, right = structure.children_left[node], structure.children_right[node]
+        samples = structure.n_node_samples[node]
+        if left < 0 or (max_depth is not None and depth >= max_depth) or samples < min_samples:
+            value = depth + average_path_length([samples])[0]
+            # Leaves step to themselves against an infinite threshold
+            nodes.append([0, np.inf, slot, slot, value])
+            deepest = max(deepest, depth)
+            continue
+        nodes.append([features[structure.feature[node]], structure.threshold[node], None, None, 0.0])
+        stack.append((right, depth + 1, slot, 3))
+        stack.append((left, depth + 1, slot, 2))
+    return nodes, deepest
+
+
+def export_compact_forest(model, path=None, scaler=None, n_estimators=None, max_depth=None,
+                          min_samples=1, seed=0, compress=False):
+    """
+    Export a fitted IsolationForest as flat NumPy arrays
+
+    Every node is one packed record: feature index (uint8/uint16), float32
+    threshold, tree-local child indices (uint16 when each tree has under
+    65536 nodes) and float32 leaf value. Thresholds are rounded down to the
+    nearest float32, so float32 inputs take exactly the same branches as in
+    sklearn. The export can keep a random subset of trees and prune them to
+    max_depth or to nodes holding at least min_samples training samples.
+
+    Args:
+        model (IsolationForest): Fitted model
+        path (str): Optional .npz path to save to
+        scaler (StandardScaler): Optional scaler applied before the model
+        n_estimators (int): Trees to keep, all if omitted
+        max_depth (int): Depth at which trees are cut, no limit if omitted
+        min_samples (int): Nodes with fewer training samples become leaves
+        seed (int): Seed for choosing the kept trees
+        compress (bool): Write a compressed .npz
+
+    Returns:
+        CompactForest: The exported forest
+    """
+    n_features = model.n_features_in_
+    subsample = getattr(model, '_max_features', n_features) != n_features
+    kept = np.arange(len(model.estimators_))
+    if n_estimators is not None and n_estimators < len(kept):
+        kept = np.sort(np.random.default_rng(seed).choice(kept, n_estimators, replace=False))
+
+    trees, depth = [], 0
+    for i in kept:
+        features = (np.asarray(model.estimators_features_[i]) if subsample
+                    else np.arange(n_features))
+        tree, deepest = _prune_tree(model.estimators_[i].tree_, features, max_depth, min_samples)
+        trees.append(tree)
+        depth = max(depth, deepest)
+
+    columns = list(zip(*[node for tree in trees for node in tree]))
+    nodes = np.empty(len(columns[0]), dtype=_node_dtype(n_features, max(len(tree) for tree in trees)))
+    for name, column in zip(nodes.dtype.names, columns):
+        nodes[name] = column
+    thresholds = np.array(columns[1], dtype=np.float64)
+    too_high = nodes['threshold'].astype(np.float64) > thresholds
+    nodes['threshold'][too_high] = np.nextafter(nodes['threshold'][too_high], np.float32(-np.inf))
+
+    roots = np.cumsum([0] + [len(tree) for tree in trees[:-1]]).astype(np.int32)
+    arrays = {
+        'nodes': nodes,
+        'roots': roots,
+        # offset_, average path length at max_samples_, feature count, walk steps
+        'meta': np.array([model.offset_, average_path_length([model._max_samples])[0], n_features,
+                          depth]),
+    }
+    if scaler is not None:
+        arrays['mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+        arrays['scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+    forest = CompactForest(arrays)
+    if path is not None:
+        forest.save(path, compress=compress)
+    return forest
+
+
+class CompactForest:
+    def __init__(self, arrays):
+        """
+        Initialize an IsolationForest scorer from exported arrays
+
+        Needs only NumPy. Use export_compact_forest() to create one and
+        CompactForest.load() to read a saved export.
+
+        Args:
+            arrays (dict): Arrays written by export_compact_forest
+        """
+        self.arrays = arrays
+        nodes = arrays['nodes']
+        roots = arrays['roots']
+        self.offset, self._path_norm, n_features, depth = arrays['meta']
+        self.n_features = int(n_features)
+        self._depth = int(depth)
+        self.n_estimators = len(roots)
+        self.mean = arrays.get('mean')
+        self.scale = arrays.get('scale')
+
+        # Global node ids for the walk: children[2 * node + went_left]
+        tree_of_node = np.repeat(np.arange(len(roots)), np.diff(np.r_[roots, len(nodes)]))
+        base = roots[tree_of_node].astype(np.intp)
+        self._roots = roots.astype(np.intp)
+        self._feature = nodes['feature'].astype(np.intp)
+        self._threshold = nodes['threshold'].copy()
+        self._children = np.column_stack([nodes['right'].astype(np.intp) + base,
+                                          nodes['left'].astype(np.intp) + base]).ravel()
+        self._value = nodes['value'].astype(np.float64)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a saved export
+
+        Args:
+            path (str): .npz path
+
+        Returns:
+            CompactForest: The forest
+        """
+        with np.load(path) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def save(self, path, compress=False):
+        """
+        Save the export as .npz
+
+        Args:
+            path (str): Output path
+            compress (bool): Write a compressed .npz
+        """
+        (np.savez_compressed if compress else np.savez)(path, **self.arrays)
+
+    @property
+    def nbytes(self):
+        """Size of the exported arrays in bytes"""
+        return sum(array.nbytes for array in self.arrays.values())
+
+    def score_samples(self, X):
+        """
+        Compute IsolationForest.score_samples
+
+        Args:
+            X (numpy.ndarray): (n_rows, n_features) unscaled features
+
+        Returns:
+            numpy.ndarray: Scores, lower is more anomalous
+        """
+        X = np.asarray(X, dtype=np.float64)
+        if self.mean is not None:
+            X = (X - self.mean) / self.scale
+        # Trees compare float32 inputs, as in sklearn
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        depths = np.concatenate([self._path_lengths(X[start:start + CHUNK_ROWS])
+                                 for start in range(0, len(X), CHUNK_ROWS)]) if len(X) else np.zeros(0)
+        denominator = self.n_estimators * self._path_norm
+        if denominator == 0:
+            return -np.ones(len(X))
+        return -(2 ** (-depths / denominator))
+
+    def decision_function(self, X):
+        """
+        Compute IsolationForest.decision_function
+
+        Args:
+            X (numpy.ndarray): (n_rows, n_features) unscaled features
+
+        Returns:
+            numpy.ndarray: Decision scores, negative for outliers
+        """
+        return self.score_samples(X) - self.offset
+
+    def _path_lengths(self, X):
+        """Sum over trees of each row's path length"""
+        n_rows = len(X)
+        row_base = np.repeat(np.arange(n_rows) * self.n_features, self.n_estimators)
+        nodes = np.tile(self._roots, n_rows)
+        flat_X = X.ravel()
+        for _ in range(self._depth):
+            went_left = flat_X[row_base + self._feature[nodes]] <= self._threshold[nodes]
+            nodes = self._children[2 * nodes + went_left]
+        return self._value[nodes].reshape(n_rows, self.n_estimators).sum(axis=1)
+
+
+# Example usage
+if __name__ == "__main__":
+    from sklearn.ensemble import IsolationForest
+
+    X = np.random.default_rng(0).normal(size=(2000, 6))
+    model = IsolationForest(random_state=42).fit(X)
+    for options in ({}, {'n_estimators': 25}, {'max_depth': 5}):
+        forest = export_compact_forest(model, **options)
+        error = np.abs(forest.decision_function(X) - model.decision_function(X)).max()
+        print(f"{options or 'full'}: {forest.nbytes:,} bytes, max score error {error:.2e}")
@@ -0,0 +1,245 @@
+import threading
+import time
+from datetime import datetime
+
+# How long transaction ids and near-duplicate keys are remembered after they
+# arrive, and the event-time gap within which the same account, merchant and
+# amount count as a near-duplicate, in seconds
+DEDUP_WINDOW = 600
+NEAR_DUPLICATE_WINDOW = 60
+# Expiry granularity: keys leave a window one bucket at a time
+BUCKET_SECONDS = 5
+
+
+def event_time(tx, default):
+    """Transaction timestamp as epoch seconds; default if missing or unparseable"""
+    value = tx.get('timestamp')
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return default
+
+
+class TimeBucketedSet:
+    def __init__(self, window, bucket_seconds=BUCKET_SECONDS):
+        """
+        Initialize a set of keys that each expire window seconds after they were added
+
+        Keys live in one dict; each time bucket lists the keys added in it,
+        in a ring covering the window. When time moves past a bucket, its
+        keys are deleted unless they were added again later, so expiry
+        costs O(1) per key and memory is bounded by the keys added within
+        the window, not by history.
+
+        Args:
+            window (float): Seconds a key is remembered
+            bucket_seconds (float): Bucket width in seconds
+        """
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.capacity = int(window // bucket_seconds) + 2
+        self.clear()
+
+    def _advance(self, bucket):
+        """Expire the buckets that leave the ring when bucket becomes the newest"""
+        start = bucket - self.capacity + 1
+        if self._newest is not None:
+            start = max(start, self._newest + 1)
+        entries = self._entries
+        for expired in range(start, bucket + 1):
+            slot = expired % self.capacity
+            for key in self._slots[slot]:
+                entry = entries.get(key)
+                if entry is not None and entry[1] <= expired - self.capacity:
+                    del entries[key]
+            self._slots[slot] = []
+        self._newest = bucket
+
+    def advance(self, now):
+        """
+        Move the set's clock to now, expiring keys that left the window
+
+        Args:
+            now (float): Current time in seconds
+
+        Returns:
+            int: The bucket to pass to add()
+        """
+        bucket = int(now // self.bucket_seconds)
+        if self._newest is None or bucket > self._newest:
+            self._advance(bucket)
+        # A clock that stepped back counts as the newest bucket
+        return self._newest
+
+    def add(self, key, bucket, value):
+        """
+        Look a key up and remember it in the bucket from advance()
+
+        Args:
+            key: Hashable key
+            bucket (int): Current bucket
+            value: Stored with the key if it is new
+
+        Returns:
+            The value stored when the key was first added within the
+            window, or None if the key is new
+        """
+        self._slots[bucket % self.capacity].append(key)
+        previous = self._entries.get(key)
+        if previous is None:
+            self._entries[key] = (value, bucket)
+            return None
+        self._entries[key] = (previous[0], bucket)
+        return previous[0]
+
+    def replace(self, key, bucket, value):
+        """
+        Store a new value for a key just passed to add()
+
+        Args:
+            key: Hashable key
+            bucket (int): The bucket given to add()
+            value: Value to store in place of the first one
+        """
+        self._entries[key] = (value, bucket)
+
+    def check_and_add(self, key, now, value):
+        """
+        Look a key up and remember it as added now
+
+        Args:
+            key: Hashable key
+            now (float): Current time in seconds
+            value: Stored with the key if it is new
+
+        Returns:
+            The value stored when the key was first added within the
+            window, or None if the key is new
+        """
+        return self.add(key, self.advance(now), value)
+
+    def clear(self):
+        self._slots = [[] for _ in range(self.capacity)]
+        self._entries = {}
+        self._newest = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DuplicateFilter:
+    def __init__(self, window=DEDUP_WINDOW, near_window=NEAR_DUPLICATE_WINDOW, bucket_seconds=BUCKET_SECONDS):
+        """
+        Initialize detection of resubmitted and near-duplicate transactions
+
+        A transaction is an exact duplicate when its transaction_id arrived
+        within the last window seconds. It is a near-duplicate when a
+        transaction with another id but the same account_id, merchant and
+        amount arrived within the window, and their timestamps are at most
+        near_window seconds apart; a transaction further than that from
+        the remembered one replaces it. Expiry follows arrival time, so
+        out-of-order timestamps cannot grow memory or skip checks.
+
+        Args:
+            window (float): Seconds ids and near-duplicate keys are remembered
+            near_window (float): Largest timestamp gap of a near-duplicate
+            bucket_seconds (float): Expiry granularity
+        """
+        self.near_window = near_window
+        self._ids = TimeBucketedSet(window, bucket_seconds)
+        self._near = TimeBucketedSet(window, bucket_seconds)
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.exact = 0
+        self.near = 0
+
+    def check(self, txs, now=None):
+        """
+        Check a batch in order, remembering every transaction in it
+
+        Later rows of a batch are compared with earlier ones too.
+
+        Args:
+            txs (list): Transaction dicts
+            now (float): Arrival time in epoch seconds, the current time if
+                omitted; also the timestamp of transactions without one
+
+        Returns:
+            list: Per transaction, None if it is new, else a dict with
+                'kind' ('exact' or 'near'), 'original_id' (the first
+                transaction seen) and 'seconds_apart' (timestamp gap)
+        """
+        now = time.time() if now is None else now
+        signals = []
+        with self._lock:
+            id_bucket, near_bucket = self._ids.advance(now), self._near.advance(now)
+            add_id, add_near, replace_near = self._ids.add, self._near.add, self._near.replace
+            for tx in txs:
+                seconds = event_time(tx, now)
+                tx_id = tx.get('transaction_id')
+                previous = add_id(tx_id, id_bucket, (seconds, tx_id))
+                kind = 'exact'
+                if previous is None and tx.get('account_id') is not None:
+                    key = (tx['account_id'], tx.get('merchant'), tx.get('amount'))
+                    previous = add_near(key, near_bucket, (seconds, tx_id))
+                    kind = 'near'
+                    if previous is not None and abs(seconds - previous[0]) > self.near_window:
+                        # Too far from the stored transaction: this one becomes the anchor
+                        replace_near(key, near_bucket, (seconds, tx_id))
+                        previous = None
+                if previous is None:
+                    signals.append(None)
+                    continue
+                if kind == 'exact':
+                    self.exact += 1
+                else:
+                    self.near += 1
+                signals.append({'kind': kind, 'original_id': previous[1],
+                                'seconds_apart': abs(seconds - previous[0])})
+            self.checked += len(txs)
+        return signals
+
+    def stats(self):
+        """
+        Get duplicate counters and memory use
+
+        Returns:
+            dict: checked, exact and near duplicates, and the ids and
+                near-duplicate keys currently remembered
+        """
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'exact': self.exact,
+                'near': self.near,
+                'remembered_ids': len(self._ids),
+                'remembered_keys': len(self._near),
+            }
+
+    def clear(self):
+        """
+        Forget every remembered transaction and reset the counters
+        """
+        with self._lock:
+            self._ids.clear()
+            self._near.clear()
+            self.checked = self.exact = self.near = 0
+
+
+# Example usage
+if __name__ == "__main__":
+    from fraudguard_app.data.data_generator import generate_transaction_stream
+
+    dedup = DuplicateFilter()
+    batch = generate_transaction_stream(1000)
+    retry = dict(batch[10])
+    resubmitted = dict(batch[20], transaction_id="resubmitted-1")
+    signals = dedup.check(batch + [retry, resubmitted])
+    print([signal for signal in signals if signal is not None])
+    print(dedup.stats())
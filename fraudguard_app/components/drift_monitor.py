@@ -0,0 +1,170 @@
+import threading
+
+import numpy as np
+
+DEFAULT_BINS = 20
+# Conventional PSI reading: < 0.1 stable, 0.1-0.25 moderate, > 0.25 major shift
+PSI_ALERT = 0.25
+KS_ALERT = 0.1
+# Don't alert until the live histograms hold this much (decayed) weight
+MIN_ALERT_WEIGHT = 500
+# Floor for bin proportions so empty bins don't make PSI infinite
+_EPSILON = 1e-4
+
+
+def _bin_counts(edges, data):
+    """Histogram every column of data over its own edges, as (n_columns, n_bins)"""
+    num_columns, num_bins = edges.shape[0], edges.shape[1] + 1
+    bins = np.empty(data.T.shape, dtype=np.intp)
+    for column, values in enumerate(data.T):
+        bins[column] = np.searchsorted(edges[column], values, side='right')
+    # Offset each column's bins so a single bincount fills every column
+    bins += (np.arange(num_columns) * num_bins)[:, None]
+    flat = np.bincount(bins.ravel(), minlength=num_columns * num_bins)
+    return flat.reshape(num_columns, num_bins).astype(np.float64)
+
+
+class DriftMonitor:
+    def __init__(self, edges, baseline_counts, columns, half_life=50_000):
+        """
+        Initialize a streaming drift monitor over fixed histogram bins
+
+        Every column has the same number of bins, cut at training quantiles,
+        so memory is fixed and each update is one searchsorted per column
+        plus a single bincount.
+
+        Args:
+            edges (numpy.ndarray): (n_columns, n_bins - 1) inner bin edges
+            baseline_counts (numpy.ndarray): (n_columns, n_bins) training counts
+            columns (list): Column names
+            half_life (float): Live weight halves every half_life transactions,
+                so statistics track recent traffic; None to never decay
+        """
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.columns = list(columns)
+        self.num_bins = self.edges.shape[1] + 1
+        baseline = np.asarray(baseline_counts, dtype=np.float64)
+        self.baseline = baseline / baseline.sum(axis=1, keepdims=True)
+        self._baseline_cdf = np.cumsum(self.baseline, axis=1)
+        self.half_life = half_life
+        self.counts = np.zeros((len(self.columns), self.num_bins))
+        self.total_seen = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_training(cls, data, columns, num_bins=DEFAULT_BINS, **kwargs):
+        """
+        Build a monitor whose baseline is the training data
+
+        Args:
+            data (numpy.ndarray): (n_rows, n_columns) training matrix
+            columns (list): Column names
+            num_bins (int): Bins per column
+            **kwargs: Passed to DriftMonitor
+
+        Returns:
+            DriftMonitor: The monitor
+        """
+        data = np.asarray(data, dtype=np.float64)
+        edges = np.quantile(data, np.linspace(0, 1, num_bins + 1)[1:-1], axis=0).T
+        return cls(edges, _bin_counts(edges, data), columns, **kwargs)
+
+    def update(self, data):
+        """
+        Add a batch of live rows
+
+        Args:
+            data (numpy.ndarray): (n_rows, n_columns) matrix in column order
+        """
+        data = np.asarray(data, dtype=np.float64)
+        if not len(data):
+            return
+        histogram = _bin_counts(self.edges, data)
+        with self._lock:
+            if self.half_life:
+                self.counts *= 0.5 ** (len(data) / self.half_life)
+            self.counts += histogram
+            self.total_seen += len(data)
+
+    def reset(self):
+        """
+        Forget all live traffic
+        """
+        with self._lock:
+            self.counts[:] = 0
+            self.total_seen = 0
+
+    def metrics(self):
+        """
+        Get drift statistics against the training baseline
+
+        Returns:
+            dict: column -> {'psi', 'ks', 'weight'}; psi and ks are None
+                before any live traffic
+        """
+        with self._lock:
+            counts = self.counts.copy()
+        weight = counts.sum(axis=1)
+        if not weight.any():
+            return {name: {'psi': None, 'ks': None, 'weight': 0.0} for name in self.columns}
+
+        live = counts / weight[:, None]
+        expected = np.maximum(self.baseline, _EPSILON)
+        actual = np.maximum(live, _EPSILON)
+        psi = ((actual - expected) * np.log(actual / expected)).sum(axis=1)
+        # KS over bin edges: largest gap between the binned CDFs
+        ks = np.abs(np.cumsum(live, axis=1) - self._baseline_cdf).max(axis=1)
+        return {name: {'psi': float(psi[i]), 'ks': float(ks[i]), 'weight': float(weight[i])}
+                for i, name in enumerate(self.columns)}
+
+    def alerts(self, psi_threshold=PSI_ALERT, ks_threshold=KS_ALERT, min_weight=MIN_ALERT_WEIGHT):
+        """
+        Get columns whose live distribution has drifted from training
+
+        Args:
+            psi_threshold (float): Alert when PSI exceeds this
+            ks_threshold (float): Alert when KS exceeds this
+            min_weight (float): Minimum live weight before alerting
+
+        Returns:
+            list: Alert dicts with column, psi and ks, worst PSI first
+        """
+        alerts = [{'column': name, 'psi': stats['psi'], 'ks': stats['ks']}
+                  for name, stats in self.metrics().items()
+                  if stats['weight'] >= min_weight
+                  and (stats['psi'] > psi_threshold or stats['ks'] > ks_threshold)]
+        return sorted(alerts, key=lambda alert: alert['psi'], reverse=True)
+
+    def save(self, path):
+        """
+        Save the bin edges and training baseline to an .npz file
+
+        Args:
+            path (str): Output path
+        """
+        np.savez(path, edges=self.edges, baseline=self.baseline, columns=np.array(self.columns))
+
+    @classmethod
+    def load(cls, path, **kwargs):
+        """
+        Load a monitor saved with save(), with no live traffic
+
+        Args:
+            path (str): Input path
+            **kwargs: Passed to DriftMonitor
+
+        Returns:
+            DriftMonitor: The monitor
+        """
+        with np.load(path) as data:
+            return cls(data['edges'], data['baseline'], data['columns'].tolist(), **kwargs)
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    monitor = DriftMonitor.from_training(rng.normal(size=(5000, 2)), ['stable', 'shifted'])
+    monitor.update(np.column_stack([rng.normal(size=2000), rng.normal(1.0, 1.0, size=2000)]))
+    for name, stats in monitor.metrics().items():
+        print(f"{name:<8} PSI={stats['psi']:.3f} KS={stats['ks']:.3f}")
+    print("Alerts:", monitor.alerts())
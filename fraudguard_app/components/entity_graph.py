@@ -0,0 +1,332 @@
+import threading
+
+import numpy as np
+
+ACCOUNT = 0
+MERCHANT = 1
+# Fold pending edges into the CSR arrays once they exceed this share of it
+MERGE_RATIO = 0.25
+# Escalate a flagged transaction when at least this share of its account's
+# merchants have been flagged before
+ESCALATION_FRACTION = 0.5
+
+
+class EntityGraph:
+    def __init__(self, capacity=1024):
+        """
+        Initialize an incrementally maintained account/merchant graph
+
+        Every transaction adds an account-merchant edge. Connected components
+        are tracked with a union-find over node ids that is updated a batch
+        at a time: endpoints are resolved to roots, smaller components are
+        hooked under larger ones and paths are fully compressed, so each batch
+        costs a few vectorized passes over the batch, not the graph.
+        Adjacency is a deduplicated CSR array plus a buffer of new edges,
+        merged in linear time once it reaches MERGE_RATIO of the CSR size.
+
+        Args:
+            capacity (int): Initial node capacity; grows by doubling
+        """
+        self._node_ids = ({}, {})  # key -> node id, per kind
+        self._lock = threading.RLock()
+        self.num_nodes = 0
+        self.num_components = 0
+        self.num_transactions = 0
+        self._parent = np.arange(capacity, dtype=np.int64)
+        self._size = np.ones(capacity, dtype=np.int64)
+        self._kind = np.zeros(capacity, dtype=np.int8)
+        self._tx_count = np.zeros(capacity, dtype=np.int64)
+        self._flagged_count = np.zeros(capacity, dtype=np.int64)
+        # CSR over both edge directions: row node ids sit in the high 32
+        # bits of each sorted edge key, column ids in the low 32 bits
+        self._indptr = np.zeros(capacity + 1, dtype=np.int64)
+        self._keys = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self._num_pending = 0
+
+    def _grow(self, needed):
+        capacity = len(self._parent)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = len(self._parent)
+        self._parent = np.concatenate([self._parent, np.arange(old, capacity, dtype=np.int64)])
+        self._size = np.concatenate([self._size, np.ones(capacity - old, dtype=np.int64)])
+        self._indptr = np.concatenate([self._indptr, np.full(capacity - old, self._indptr[-1])])
+        for name in ('_kind', '_tx_count', '_flagged_count'):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros(capacity - old, dtype=array.dtype)]))
+
+    def node_ids(self, kind, keys, create=True):
+        """
+        Map entity keys to node ids
+
+        Args:
+            kind (int): ACCOUNT or MERCHANT
+            keys (iterable): Entity keys
+            create (bool): Add unknown keys as new nodes; otherwise they map to -1
+
+        Returns:
+            numpy.ndarray: Node ids
+        """
+        mapping = self._node_ids[kind]
+        with self._lock:
+            ids = []
+            for key in keys:
+                node = mapping.get(key)
+                if node is None:
+                    if not create:
+                        ids.append(-1)
+                        continue
+                    node = mapping[key] = self.num_nodes
+                    self.num_nodes += 1
+                    self.num_components += 1
+                ids.append(node)
+            self._grow(self.num_nodes)
+            ids = np.array(ids, dtype=np.int64)
+            if create:
+                self._kind[ids] = kind
+            return ids
+
+    def add_transactions(self, accounts, merchants, flagged=None):
+        """
+        Add a batch of transactions as account-merchant edges
+
+        Args:
+            accounts (list): Account key per transaction
+            merchants (list): Merchant key per transaction
+            flagged (array-like): Optional bool fraud flag per transaction
+        """
+        with self._lock:
+            self.add_edges(self.node_ids(ACCOUNT, accounts), self.node_ids(MERCHANT, merchants),
+                           flagged)
+
+    def add_edges(self, left, right, flagged=None):
+        """
+        Add a batch of edges between existing node ids
+
+        Args:
+            left (numpy.ndarray): Account node ids
+            right (numpy.ndarray): Merchant node ids
+            flagged (array-like): Optional bool fraud flag per edge
+        """
+        left = np.asarray(left, dtype=np.int64)
+        right = np.asarray(right, dtype=np.int64)
+        if not len(left):
+            return
+        with self._lock:
+            self._grow(int(max(left.max(), right.max())) + 1)
+            self.num_nodes = max(self.num_nodes, int(max(left.max(), right.max())) + 1)
+            self._kind[right] = MERCHANT
+            self.num_transactions += len(left)
+            np.add.at(self._tx_count, np.concatenate([left, right]), 1)
+            if flagged is not None:
+                flagged = np.asarray(flagged, dtype=bool)
+                np.add.at(self._flagged_count, np.concatenate([left[flagged], right[flagged]]), 1)
+            self._union(left, right)
+
+            self._pending.extend(((left << 32) | right, (right << 32) | left))
+            self._num_pending += 2 * len(left)
+            if self._num_pending > max(MERGE_RATIO * len(self._keys), 1 << 16):
+                self._merge_pending()
+
+    def _find(self, nodes):
+        """Resolve nodes to their roots, pointing every node on their paths at its root"""
+        parent = self._parent
+        path = [nodes]
+        roots = parent[nodes]
+        while True:
+            grandparents = parent[roots]
+            if np.array_equal(grandparents, roots):
+                break
+            path.append(roots)
+            roots = grandparents
+        for ancestors in path:
+            parent[ancestors] = roots
+        return roots
+
+    def _union(self, left, right):
+        a, b = self._find(left), self._find(right)
+        touched = _unique(np.concatenate([a, b]))
+        touched_sizes = self._size[touched]
+        capacity = len(self._parent)
+        new_roots = touched
+        while True:
+            crossing = a != b
+            if not crossing.any():
+                break
+            a, b = a[crossing], b[crossing]
+            # Union by size: rank roots by (size, id), a strict order, and
+            # hook each root under the highest-ranked root it meets, so no
+            # hooks in a pass can form a cycle
+            rank_a = self._size[a] * capacity + a
+            rank_b = self._size[b] * capacity + b
+            lower = rank_a < rank_b
+            children = np.where(lower, a, b)
+            parent_ranks = np.where(lower, rank_b, rank_a)
+            order = np.lexsort((parent_ranks, children))
+            children, parent_ranks = children[order], parent_ranks[order]
+            last = np.ones(len(children), dtype=bool)
+            last[:-1] = children[1:] != children[:-1]
+            self._parent[children[last]] = parent_ranks[last] % capacity
+            a, b = self._find(a), self._find(b)
+            # Surviving roots are among the touched roots; regroup their sizes
+            new_roots = self._find(touched)
+            self._size[new_roots] = 0
+            np.add.at(self._size, new_roots, touched_sizes)
+        self.num_components -= int(np.count_nonzero(new_roots != touched))
+
+    def _merge_pending(self):
+        """Merge pending edges into the sorted, deduplicated CSR keys"""
+        if not self._num_pending:
+            return
+        new = _unique(np.concatenate(self._pending))
+        self._pending, self._num_pending = [], 0
+        positions = np.searchsorted(self._keys, new)
+        in_bounds = positions < len(self._keys)
+        seen = np.zeros(len(new), dtype=bool)
+        seen[in_bounds] = self._keys[positions[in_bounds]] == new[in_bounds]
+        new, positions = new[~seen], positions[~seen]
+        self._keys = np.insert(self._keys, positions, new)
+        # Rows after each inserted edge's row shift by one
+        self._indptr[1:] += np.cumsum(np.bincount(new >> 32, minlength=len(self._indptr) - 1))
+
+    @property
+    def num_edges(self):
+        """Distinct account-merchant pairs"""
+        with self._lock:
+            self._merge_pending()
+            return len(self._keys) // 2
+
+    def component_size(self, nodes):
+        """
+        Get the number of entities in each node's connected component
+
+        Args:
+            nodes (numpy.ndarray): Node ids, -1 for unknown entities
+
+        Returns:
+            numpy.ndarray: Component sizes, 0 for unknown entities
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        known = nodes >= 0
+        sizes = np.zeros(len(nodes), dtype=np.int64)
+        with self._lock:
+            sizes[known] = self._size[self._find(nodes[known])]
+        return sizes
+
+    def _neighbor_pairs(self, nodes):
+        """Return (query position, neighbour id) for every distinct neighbour of nodes"""
+        self._merge_pending()
+        starts, ends = self._indptr[nodes], self._indptr[nodes + 1]
+        counts = ends - starts
+        positions = np.repeat(np.arange(len(nodes)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        return positions, self._keys[np.repeat(starts, counts) + offsets] & 0xFFFFFFFF
+
+    def neighbors(self, node):
+        """
+        Get the distinct neighbours of a node
+
+        Args:
+            node (int): Node id
+
+        Returns:
+            numpy.ndarray: Neighbour node ids
+        """
+        with self._lock:
+            return self._neighbor_pairs(np.array([node]))[1]
+
+    def flagged_neighbor_fraction(self, nodes):
+        """
+        Get the share of each node's distinct neighbours involved in a flagged transaction
+
+        Args:
+            nodes (numpy.ndarray): Node ids, -1 for unknown entities
+
+        Returns:
+            numpy.ndarray: Fractions in [0, 1], 0 for nodes without neighbours
+        """
+        nodes = np.asarray(nodes, dtype=np.int64)
+        known = np.flatnonzero(nodes >= 0)
+        fractions = np.zeros(len(nodes))
+        with self._lock:
+            positions, neighbors = self._neighbor_pairs(nodes[known])
+            flagged = (self._flagged_count[neighbors] > 0).astype(np.float64)
+        degree = np.bincount(positions, minlength=len(known))
+        flagged_degree = np.bincount(positions, weights=flagged, minlength=len(known))
+        fractions[known] = np.divide(flagged_degree, degree, out=np.zeros(len(known)),
+                                     where=degree > 0)
+        return fractions
+
+    def account_features(self, accounts):
+        """
+        Get graph features for a batch of account keys
+
+        Args:
+            accounts (list): Account keys
+
+        Returns:
+            dict: 'component_size' and 'flagged_neighbor_fraction' arrays,
+                zero for accounts not in the graph
+        """
+        nodes = self.node_ids(ACCOUNT, accounts, create=False)
+        return {
+            'component_size': self.component_size(nodes),
+            'flagged_neighbor_fraction': self.flagged_neighbor_fraction(nodes),
+        }
+
+    def stats(self):
+        """
+        Get graph size statistics
+
+        Returns:
+            dict: accounts, merchants, edges, components, transactions and
+                largest_component
+        """
+        with self._lock:
+            num_accounts = len(self._node_ids[ACCOUNT])
+            roots = self._parent[:self.num_nodes] == np.arange(self.num_nodes)
+            return {
+                'accounts': num_accounts,
+                'merchants': self.num_nodes - num_accounts,
+                'edges': self.num_edges,
+                'components': self.num_components,
+                'transactions': self.num_transactions,
+                'largest_component': int(self._size[:self.num_nodes][roots].max(initial=0)),
+            }
+
+    def clear(self):
+        """
+        Remove all nodes and edges
+        """
+        with self._lock:
+            for mapping in self._node_ids:
+                mapping.clear()
+            self.num_nodes = self.num_components = self.num_transactions = 0
+            self._parent[:] = np.arange(len(self._parent))
+            self._size.fill(1)
+            for array in (self._kind, self._tx_count, self._flagged_count, self._indptr):
+                array.fill(0)
+            self._keys = np.empty(0, dtype=np.int64)
+            self._pending = []
+            self._num_pending = 0
+
+
+def _unique(values):
+    """Sorted distinct values; a sort beats np.unique's hashing on large int arrays"""
+    values = np.sort(values)
+    keep = np.ones(len(values), dtype=bool)
+    keep[1:] = values[1:] != values[:-1]
+    return values[keep]
+
+
+# Example usage
+if __name__ == "__main__":
+    graph = EntityGraph()
+    graph.add_transactions(['a1', 'a2', 'a3', 'a4'], ['m1', 'm1', 'm2', 'm3'],
+                           flagged=[True, False, False, False])
+    graph.add_transactions(['a3'], ['m3'])
+    print(graph.stats())
+    print(graph.account_features(['a1', 'a2', 'a3', 'unknown']))
@@ -0,0 +1,190 @@
+import numpy as np
+
+# Model input columns, in the order the model was trained on
+FEATURE_COLUMNS = ['amount', 'merchant_risk_score', 'time_of_day',
+                   'account_age_days', 'previous_transactions', 'category_encoded']
+
+# Map merchant to risk score (in a real system, this would come from a database)
+MERCHANT_RISK_MAP = {
+    'Amazon': 0.1, 'Walmart': 0.05, 'Target': 0.08,
+    'Suspicious Merchant': 0.9, 'Unknown Merchant': 0.7,
+    'PayPal': 0.2, 'Apple Store': 0.1, 'Google Play': 0.15,
+    'Gas Station': 0.3, 'Restaurant': 0.25
+}
+DEFAULT_MERCHANT_RISK = 0.5
+
+# Map category to encoded value
+CATEGORY_MAP = {
+    'groceries': 1, 'entertainment': 2, 'shopping': 3,
+    'travel': 4, 'utilities': 5
+}
+DEFAULT_CATEGORY_CODE = 3
+
+# Values used when a raw transaction field is missing
+FIELD_DEFAULTS = {
+    'amount': 0,
+    'merchant': 'Unknown Merchant',
+    'category': 'shopping',
+    'time_of_day': 12,
+    'account_age_days': 365,
+    'previous_transactions': 10,
+}
+
+# Optional derived features, computed from the encoded base columns
+DERIVED_FEATURES = {
+    'log_amount': lambda X: np.log1p(np.maximum(X[:, 0], 0)),
+    'is_night': lambda X: ((X[:, 2] < 6) | (X[:, 2] >= 22)).astype(X.dtype),
+    'is_new_account': lambda X: (X[:, 3] < 30).astype(X.dtype),
+}
+
+
+def _column_accessor(records):
+    """
+    Normalize batch input to (row count, column getter)
+
+    The getter returns a column as an ndarray or list, or None when the
+    column is absent. Accepts a list of transaction dicts, a dict of
+    columns, or a pandas DataFrame.
+    """
+    if isinstance(records, dict):
+        columns = records
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        return (lengths.pop() if lengths else 0), columns.get
+    if hasattr(records, 'columns'):
+        # pandas DataFrame
+        names = set(records.columns)
+        return len(records), lambda name: records[name].to_numpy() if name in names else None
+
+    rows = records
+
+    def get(name):
+        if not any(name in row for row in rows):
+            return None
+        return [row.get(name) for row in rows]
+
+    return len(rows), get
+
+
+def _fill_numeric(out, values, default):
+    """Write a numeric column into out, replacing missing values with default"""
+    if values is None:
+        out.fill(default)
+    elif isinstance(values, np.ndarray) and values.dtype.kind in 'fiub':
+        out[:] = values
+        if values.dtype.kind == 'f':
+            np.copyto(out, default, where=np.isnan(out))
+    else:
+        out[:] = np.fromiter((default if v is None else v for v in values), dtype=out.dtype, count=len(out))
+        np.copyto(out, default, where=np.isnan(out))
+
+
+def _fill_mapped(out, values, mapping, default, missing):
+    """
+    Write a categorical column into out through a value -> number mapping
+
+    Unknown values map to default; missing values (None/NaN, or an absent
+    column) map to missing.
+    """
+    if values is None:
+        out.fill(missing)
+        return
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    get = mapping.get
+    # v != v catches NaN from pandas object columns
+    out[:] = np.fromiter((missing if v is None or v != v else get(v, default) for v in values),
+                         dtype=out.dtype, count=len(out))
+
+
+class FeatureEncoder:
+    def __init__(self, derived_features=(), dtype=np.float64,
+                 merchant_risk_map=None, category_map=None):
+        """
+        Initialize the feature encoder shared by training and inference
+
+        Args:
+            derived_features (tuple): Names from DERIVED_FEATURES to append
+            dtype: Output dtype, np.float64 or np.float32
+            merchant_risk_map (dict): Merchant -> risk score override
+            category_map (dict): Category -> code override
+        """
+        unknown = set(derived_features) - set(DERIVED_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown derived features: {sorted(unknown)}")
+        self.derived_features = tuple(derived_features)
+        self.columns = FEATURE_COLUMNS + list(self.derived_features)
+        self.dtype = np.dtype(dtype)
+        self.merchant_risk_map = MERCHANT_RISK_MAP if merchant_risk_map is None else merchant_risk_map
+        self.category_map = CATEGORY_MAP if category_map is None else category_map
+
+    def allocate(self, n_rows):
+        """
+        Allocate an output buffer for a batch of n_rows
+
+        Returns:
+            numpy.ndarray: Uninitialized (n_rows, len(columns)) array
+        """
+        return np.empty((n_rows, len(self.columns)), dtype=self.dtype)
+
+    def encode(self, records, out=None):
+        """
+        Encode raw transactions into a contiguous model-ready matrix
+
+        Pre-encoded 'merchant_risk_score' / 'category_encoded' columns are
+        used as-is; otherwise they are mapped from 'merchant' / 'category'.
+        Missing values fall back to FIELD_DEFAULTS.
+
+        Args:
+            records: List of transaction dicts, dict of columns or DataFrame
+            out (numpy.ndarray): Optional buffer from allocate(); a larger
+                buffer is allowed and its leading rows are used
+
+        Returns:
+            numpy.ndarray: (n_rows, len(columns)) feature matrix
+        """
+        n_rows, get = _column_accessor(records)
+        if out is None:
+            out = self.allocate(n_rows)
+        elif out.shape[0] < n_rows or out.shape[1] != len(self.columns) or out.dtype != self.dtype:
+            raise ValueError("Output buffer does not match the batch shape or dtype")
+        X = out[:n_rows]
+
+        _fill_numeric(X[:, 0], get('amount'), FIELD_DEFAULTS['amount'])
+
+        merchant_risk = get('merchant_risk_score')
+        if merchant_risk is not None:
+            _fill_numeric(X[:, 1], merchant_risk, DEFAULT_MERCHANT_RISK)
+        else:
+            _fill_mapped(X[:, 1], get('merchant'), self.merchant_risk_map, DEFAULT_MERCHANT_RISK,
+                         self.merchant_risk_map.get(FIELD_DEFAULTS['merchant'], DEFAULT_MERCHANT_RISK))
+
+        _fill_numeric(X[:, 2], get('time_of_day'), FIELD_DEFAULTS['time_of_day'])
+        _fill_numeric(X[:, 3], get('account_age_days'), FIELD_DEFAULTS['account_age_days'])
+        _fill_numeric(X[:, 4], get('previous_transactions'), FIELD_DEFAULTS['previous_transactions'])
+
+        category_code = get('category_encoded')
+        if category_code is not None:
+            _fill_numeric(X[:, 5], category_code, DEFAULT_CATEGORY_CODE)
+        else:
+            _fill_mapped(X[:, 5], get('category'), self.category_map, DEFAULT_CATEGORY_CODE,
+                         self.category_map.get(FIELD_DEFAULTS['category'], DEFAULT_CATEGORY_CODE))
+
+        for offset, name in enumerate(self.derived_features, start=len(FEATURE_COLUMNS)):
+            X[:, offset] = DERIVED_FEATURES[name](X)
+
+        return X
+
+
+# Example usage
+if __name__ == "__main__":
+    encoder = FeatureEncoder(derived_features=('log_amount', 'is_night'))
+    batch = [
+        {'amount': 1500.0, 'merchant': 'Amazon', 'category': 'shopping',
+         'time_of_day': 14, 'account_age_days': 365, 'previous_transactions': 20},
+        {'amount': 5000.0, 'merchant': 'Suspicious Merchant', 'category': 'travel',
+         'time_of_day': 3},
+    ]
+    print(encoder.columns)
+    print(encoder.encode(batch))
@@ -1,20 +1,79 @@
 import numpy as np
-import pandas as pd
-from sklearn.ensemble import IsolationForest
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
+import threading
+import time
+
+from fraudguard_app.components.feature_encoder import FeatureEncoder
+from fraudguard_app.components.risk_rules import RiskRuleEngine, DEFAULT_RULES_PATH
+from fraudguard_app.components.quantile_sketch import KLLSketch
+from fraudguard_app.components.drift_monitor import DriftMonitor
+from fraudguard_app.components.explainer import PathAttribution
+from fraudguard_app.components.compact_forest import CompactForest, export_compact_forest
+from fraudguard_app.components.latency_stats import LatencyStats
+from fraudguard_app.components.model_backends import (
+    CompactForestBackend, IsolationForestBackend, ShadowScorer, find_isolation_forest
+)
+
+# pandas, joblib and sklearn load on first use: a detector running on the
+# compact model (prefer_compact=True) scores with NumPy alone
+
+MODEL_PATH = "models/fraud_model.pkl"
+SCALER_PATH = "models/scaler.pkl"
+SKETCH_PATH = "models/score_sketch.npz"
+DRIFT_BASELINE_PATH = "models/drift_baseline.npz"
+COMPACT_MODEL_PATH = "models/fraud_model_compact.npz"
+# Fraction of traffic flagged at sensitivity 1.0; 0.5 matches contamination=0.1
+MAX_FLAG_FRACTION = 0.2
+# Resolution of the sensitivity -> threshold lookup table
+THRESHOLD_STEPS = 1000
+# Rebuild the lookup table after this many new live scores
+SKETCH_REFRESH = 256
 
 class FraudDetector:
-    def __init__(self):
+    def __init__(self, rules_path=DEFAULT_RULES_PATH, backend=None, prefer_compact=False):
         """
         Initialize the Fraud Detector with a pre-trained model or train a new one
+        
+        Args:
+            rules_path (str): JSON/YAML rule table for risk score adjustments
+            backend (ModelBackend): Champion model backend. By default the
+                IsolationForest saved under models/, trained if missing;
+                other backends are trained on the sample data if unfitted
+                and are not saved
+            prefer_compact (bool): Score with the compact export in
+                models/ when it is at least as new as the pickled model,
+                without importing sklearn; explain() then returns no
+                features
         """
-        self.model = None
-        self.scaler = StandardScaler()
+        self.backend = backend
+        self._persist = backend is None
+        self.prefer_compact = prefer_compact
+        self.latency = LatencyStats()
+        self.shadow = None
+        self.encoder = FeatureEncoder()
+        self.rules = RiskRuleEngine(rules_path, self.encoder.columns)
         self.is_trained = False
+        self.score_sketch = None
+        self.drift_monitor = None
+        self._attribution = None
+        self.sensitivity = 0.5
+        self.threshold = 0.0
+        self._sketch_lock = threading.Lock()
+        self._pending_scores = 0
         self._load_or_train_model()
     
+    @property
+    def model(self):
+        """The champion's IsolationForest, or None if it has none"""
+        forest = find_isolation_forest(self.backend)
+        return forest.model if forest is not None else None
+    
+    @property
+    def scaler(self):
+        """The scaler fitted with self.model"""
+        forest = find_isolation_forest(self.backend)
+        return forest.scaler if forest is not None else None
+    
     def _generate_sample_data(self, n_samples=1000):
         """
         Generate sample transaction data for training
@@ -54,6 +113,8 @@ class FraudDetector:
         # Create labels (0 for normal, 1 for fraud)
         labels = np.concatenate([np.zeros(normal_count), np.ones(fraud_count)])
         
+        import pandas as pd
+        
         df = pd.DataFrame(data)
         df['is_fraud'] = labels
         
@@ -63,19 +124,47 @@ class FraudDetector:
         """
         Load a pre-trained model or train a new one if it doesn't exist
         """
-        model_path = "models/fraud_model.pkl"
-        scaler_path = "models/scaler.pkl"
-        
-        if os.path.exists(model_path) and os.path.exists(scaler_path):
+        if not self._persist:
+            if self.backend.fitted:
+                self.is_trained = True
+                self._fit_baselines(self.encoder.encode(self._generate_sample_data(2000)))
+            else:
+                self._train_model()
+        elif self.prefer_compact and self._compact_is_current():
+            self.backend = CompactForestBackend(CompactForest.load(COMPACT_MODEL_PATH))
+            self.is_trained = True
+            self.score_sketch = KLLSketch.load(SKETCH_PATH)
+            self.drift_monitor = DriftMonitor.load(DRIFT_BASELINE_PATH)
+            self._refresh_thresholds()
+        elif os.path.exists(MODEL_PATH) and os.path.exists(SCALER_PATH):
+            import joblib
+            
             # Load existing model
-            self.model = joblib.load(model_path)
-            self.scaler = joblib.load(scaler_path)
+            self.backend = IsolationForestBackend(model=joblib.load(MODEL_PATH),
+                                                  scaler=joblib.load(SCALER_PATH))
             self.is_trained = True
+            if os.path.exists(SKETCH_PATH) and os.path.exists(DRIFT_BASELINE_PATH):
+                self.score_sketch = KLLSketch.load(SKETCH_PATH)
+                self.drift_monitor = DriftMonitor.load(DRIFT_BASELINE_PATH)
+                self._refresh_thresholds()
+            else:
+                # Models saved before these existed: rebuild them from training data
+                self._fit_baselines(self.encoder.encode(self._generate_sample_data(2000)))
         else:
             # Train new model
             print("Training new fraud detection model...")
             self._train_model()
     
+    def _compact_is_current(self):
+        """
+        Check that the compact export and baselines exist and are not older than the pickled model
+        """
+        paths = [COMPACT_MODEL_PATH, SKETCH_PATH, DRIFT_BASELINE_PATH]
+        if not all(os.path.exists(path) for path in paths):
+            return False
+        return (not os.path.exists(MODEL_PATH)
+                or os.path.getmtime(COMPACT_MODEL_PATH) >= os.path.getmtime(MODEL_PATH))
+    
     def _train_model(self):
         """
         Train the fraud detection model
@@ -83,32 +172,148 @@ class FraudDetector:
         # Generate training data
         df = self._generate_sample_data(2000)
         
-        # Prepare features
-        feature_columns = ['amount', 'merchant_risk_score', 'time_of_day', 
-                          'account_age_days', 'previous_transactions', 'category_encoded']
-        X = df[feature_columns]
-        y = df['is_fraud']
-        
-        # Scale features
-        X_scaled = self.scaler.fit_transform(X)
+        # Prepare features through the same encoder used at inference
+        X = self.encoder.encode(df)
         
-        # Train isolation forest model
-        self.model = IsolationForest(
-            contamination=0.1,  # Expected proportion of outliers
-            random_state=42,
-            n_estimators=100
-        )
-        self.model.fit(X_scaled)
+        # Train the backend, by default scaler + isolation forest with
+        # contamination=0.1 (expected proportion of outliers)
+        if self.backend is None:
+            self.backend = IsolationForestBackend(contamination=0.1, random_state=42, n_estimators=100)
+        self.backend.fit(X, df['is_fraud'].to_numpy())
+        self._attribution = None
         
         # Mark as trained
         self.is_trained = True
         
-        # Save model and scaler
-        os.makedirs("models", exist_ok=True)
-        joblib.dump(self.model, "models/fraud_model.pkl")
-        joblib.dump(self.scaler, "models/scaler.pkl")
+        if self._persist:
+            import joblib
+            
+            # Save model and scaler, plus the compact export for headless scoring
+            os.makedirs("models", exist_ok=True)
+            joblib.dump(self.model, MODEL_PATH)
+            joblib.dump(self.scaler, SCALER_PATH)
+            self.export_compact()
+        self._fit_baselines(X)
+        
+        print("Model trained and saved successfully!" if self._persist else "Model trained successfully!")
+    
+    def _fit_baselines(self, X):
+        """
+        Build the decision score sketch and drift baseline from training features and save them
+        """
+        decision_scores = self.backend.decision_function(X)
+        self.score_sketch = KLLSketch(seed=42)
+        self.score_sketch.update(decision_scores)
+        if self._persist:
+            self.save_score_sketch()
+        self._refresh_thresholds()
+        
+        risk_scores, _ = self.rules.apply(X, 1 / (1 + np.exp(decision_scores)))
+        self.drift_monitor = DriftMonitor.from_training(np.column_stack([X, risk_scores]),
+                                                        self.encoder.columns + ['risk_score'])
+        if self._persist:
+            self.drift_monitor.save(DRIFT_BASELINE_PATH)
+    
+    def save_score_sketch(self, path=SKETCH_PATH):
+        """
+        Save the decision score sketch, including live traffic seen so far
+        
+        Args:
+            path (str): Output .npz path
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._sketch_lock:
+            self.score_sketch.save(path)
+    
+    def load_score_sketch(self, path=SKETCH_PATH):
+        """
+        Replace the decision score sketch with a saved one and recompute the thresholds
+        
+        Args:
+            path (str): .npz path written by save_score_sketch
+        """
+        sketch = KLLSketch.load(path)
+        with self._sketch_lock:
+            self.score_sketch = sketch
+            self._refresh_thresholds()
+    
+    def _refresh_thresholds(self):
+        """
+        Precompute the decision score threshold for every sensitivity step
+        """
+        fractions = np.linspace(0, MAX_FLAG_FRACTION, THRESHOLD_STEPS + 1)
+        self._thresholds = self.score_sketch.quantiles(fractions)
+        self._pending_scores = 0
+        self.threshold = self.threshold_for(self.sensitivity)
+    
+    def threshold_for(self, sensitivity):
+        """
+        Map a sensitivity in [0, 1] to a decision score threshold
+        
+        Sensitivity s flags about s * MAX_FLAG_FRACTION of traffic. The
+        lookup is a single table index.
         
-        print("Model trained and saved successfully!")
+        Args:
+            sensitivity (float): Sensitivity in [0, 1]
+            
+        Returns:
+            float: Transactions scoring below this are flagged
+        """
+        step = int(round(min(max(sensitivity, 0.0), 1.0) * THRESHOLD_STEPS))
+        return float(self._thresholds[step])
+    
+    def set_sensitivity(self, sensitivity):
+        """
+        Set the sensitivity used to flag newly scored transactions
+        
+        Args:
+            sensitivity (float): Sensitivity in [0, 1]
+        """
+        self.sensitivity = sensitivity
+        self.threshold = self.threshold_for(sensitivity)
+    
+    def rethreshold(self, decision_scores, sensitivity=None):
+        """
+        Recompute fraud flags for already-scored transactions
+        
+        Args:
+            decision_scores (array-like): Decision scores from score_batch
+            sensitivity (float): Sensitivity to apply, the current one if omitted
+            
+        Returns:
+            numpy.ndarray: Bool fraud flags
+        """
+        threshold = self.threshold if sensitivity is None else self.threshold_for(sensitivity)
+        return np.asarray(decision_scores) < threshold
+    
+    def apply_threshold(self, decision_scores):
+        """
+        Flag decision scores computed by another detector and fold them into the sketch
+        
+        This is the part of score_batch that follows scoring, so a process
+        that scores in workers and flags the results here, in order, gets
+        the same flags as scoring every batch itself.
+        
+        Args:
+            decision_scores (array-like): Decision scores from score_batch
+            
+        Returns:
+            numpy.ndarray: Bool fraud flags
+        """
+        decision_scores = np.asarray(decision_scores, dtype=np.float64)
+        is_fraud = decision_scores < self.threshold
+        self._observe_scores(decision_scores)
+        return is_fraud
+    
+    def _observe_scores(self, decision_scores):
+        """
+        Fold live decision scores into the sketch
+        """
+        with self._sketch_lock:
+            self.score_sketch.update(decision_scores)
+            self._pending_scores += len(decision_scores)
+            if self._pending_scores >= SKETCH_REFRESH:
+                self._refresh_thresholds()
     
     def predict(self, transaction_data):
         """
@@ -126,74 +331,156 @@ class FraudDetector:
         Returns:
             tuple: (is_fraud: bool, risk_score: float)
         """
-        if not self.is_trained:
-            raise Exception("Model is not trained yet!")
-        
-        # Map merchant to risk score (in a real system, this would come from a database)
-        merchant_risk_map = {
-            'Amazon': 0.1, 'Walmart': 0.05, 'Target': 0.08,
-            'Suspicious Merchant': 0.9, 'Unknown Merchant': 0.7,
-            'PayPal': 0.2, 'Apple Store': 0.1, 'Google Play': 0.15,
-            'Gas Station': 0.3, 'Restaurant': 0.25
-        }
+        is_fraud, risk_scores = self.predict_batch([transaction_data])
+        return bool(is_fraud[0]), float(risk_scores[0])
+    
+    def predict_batch(self, transactions, out=None):
+        """
+        Predict fraud for a batch of transactions in one vectorized pass
         
-        # Map category to encoded value
-        category_map = {
-            'groceries': 1, 'entertainment': 2, 'shopping': 3,
-            'travel': 4, 'utilities': 5
-        }
+        Args:
+            transactions: List of transaction dicts, dict of columns or
+                DataFrame (see FeatureEncoder.encode)
+            out (numpy.ndarray): Optional feature buffer from
+                self.encoder.allocate() to reuse across batches
+                
+        Returns:
+            tuple: (is_fraud: bool array, risk_scores: float array)
+        """
+        is_fraud, risk_scores, _, _ = self.score_batch(transactions, out=out)
+        return is_fraud, risk_scores
+    
+    def score_batch(self, transactions, out=None, ruleset=None):
+        """
+        Predict fraud for a batch and report which risk rules fired
         
-        # Extract features
-        amount = transaction_data.get('amount', 0)
-        merchant = transaction_data.get('merchant', 'Unknown Merchant')
-        category = transaction_data.get('category', 'shopping')
-        time_of_day = transaction_data.get('time_of_day', 12)
-        account_age_days = transaction_data.get('account_age_days', 365)
-        previous_transactions = transaction_data.get('previous_transactions', 10)
+        Args:
+            transactions: Batch as accepted by predict_batch
+            out (numpy.ndarray): Optional feature buffer
+            ruleset (RuleSet): Rules to apply, self.rules.ruleset if omitted.
+                Pass the RuleSet that will decode fired_rules, so a rule
+                reload in between cannot change what the bits mean
+                
+        Returns:
+            tuple: (is_fraud, risk_scores, fired_rules, decision_scores)
+                where fired_rules is the packed bitmask from
+                RuleSet.apply (decode a row with
+                ruleset.reasons(fired_rules[i])) and decision_scores can
+                be passed to rethreshold()
+        """
+        if not self.is_trained:
+            raise Exception("Model is not trained yet!")
         
-        # Get merchant risk score
-        merchant_risk_score = merchant_risk_map.get(merchant, 0.5)
+        features = self.encoder.encode(transactions, out=out)
         
-        # Get category encoding
-        category_encoded = category_map.get(category, 3)
+        # Get anomaly score (lower scores indicate higher anomaly probability)
+        start = time.perf_counter()
+        anomaly_scores = self.backend.decision_function(features)
+        self.latency.record(time.perf_counter() - start, len(features))
         
-        # Prepare feature vector
-        features = np.array([[
-            amount, merchant_risk_score, time_of_day,
-            account_age_days, previous_transactions, category_encoded
-        ]])
+        # Convert to risk score (0-1 scale, where 1 is high risk)
+        # Transform anomaly score to 0-1 range
+        risk_scores = 1 / (1 + np.exp(anomaly_scores))  # Sigmoid transformation
         
-        # Scale features
-        features_scaled = self.scaler.transform(features)
+        # Adjust risk score based on the business rule table
+        risk_scores, fired_rules = (ruleset or self.rules.ruleset).apply(features, risk_scores)
         
-        # Get prediction (-1 for anomaly, 1 for normal)
-        prediction = self.model.predict(features_scaled)[0]
+        # Transaction is fraudulent if it scores below the sensitivity threshold
+        is_fraud = anomaly_scores < self.threshold
+        if self.shadow is not None:
+            self.shadow.submit(features, anomaly_scores, is_fraud)
+        self._observe_scores(anomaly_scores)
+        self.drift_monitor.update(np.column_stack([features, risk_scores]))
         
-        # Get anomaly score (lower scores indicate higher anomaly probability)
-        anomaly_score = self.model.decision_function(features_scaled)[0]
+        return is_fraud, risk_scores, fired_rules, anomaly_scores
+
+    def explain(self, transactions, top_k=3):
+        """
+        Get the features that contributed most to each transaction's anomaly score
         
-        # Convert to risk score (0-1 scale, where 1 is high risk)
-        # Transform anomaly score to 0-1 range
-        risk_score = 1 / (1 + np.exp(anomaly_score))  # Sigmoid transformation
+        Uses path-depth attribution (see PathAttribution): each split on
+        a row's path through a tree credits its feature with 1 / (depth + 1),
+        scaled by 1 / path length, and each row's shares sum to 1.
+        All trees are walked together one level at a time, so the cost
+        grows with rows x trees x tree depth; intended for
+        the flagged rows of a batch.
         
-        # Adjust risk score based on known high-risk factors
-        if merchant_risk_score > 0.7:
-            risk_score = min(1.0, risk_score + 0.3)
-        elif merchant_risk_score > 0.4:
-            risk_score = min(1.0, risk_score + 0.1)
+        Args:
+            transactions: Batch as accepted by predict_batch
+            top_k (int): Features to return per transaction
             
-        # Very new accounts are riskier
-        if account_age_days < 30:
-            risk_score = min(1.0, risk_score + 0.2)
+        Returns:
+            list: Per transaction, (feature name, share) pairs, largest
+                first; empty if the champion has no IsolationForest
+        """
+        if not self.is_trained:
+            raise Exception("Model is not trained yet!")
+        if self.model is None:
+            return [[] for _ in range(len(transactions))]
+        if self._attribution is None:
+            self._attribution = PathAttribution(self.model, self.encoder.columns)
+        features_scaled = self.scaler.transform(self.encoder.encode(transactions))
+        return self._attribution.top_features(features_scaled, top_k)
+
+    def export_compact(self, path=COMPACT_MODEL_PATH, **options):
+        """
+        Export the champion's IsolationForest and scaler in the NumPy-only compact format
+        
+        Args:
+            path (str): Output .npz path
+            **options: n_estimators, max_depth, min_samples, seed or
+                compress, see export_compact_forest
             
-        # Very few previous transactions are riskier
-        if previous_transactions < 3:
-            risk_score = min(1.0, risk_score + 0.15)
+        Returns:
+            CompactForest: The exported forest
+        """
+        if self.model is None:
+            raise ValueError("The champion backend has no IsolationForest to export")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        return export_compact_forest(self.model, path, scaler=self.scaler, **options)
+    
+    def start_shadow(self, challenger):
+        """
+        Shadow-score all further traffic with a challenger on a background thread
+        
+        Replaces any running challenger. An unfitted challenger is first
+        trained on the same sample data as the champion.
         
-        # Transaction is fraudulent if prediction is -1 (anomaly)
-        is_fraud = (prediction == -1)
+        Args:
+            challenger (ModelBackend): Challenger backend
+        """
+        if not challenger.fitted:
+            df = self._generate_sample_data(2000)
+            challenger.fit(self.encoder.encode(df), df['is_fraud'].to_numpy())
+        self.stop_shadow()
+        self.shadow = ShadowScorer(challenger)
+    
+    def stop_shadow(self):
+        """
+        Stop shadow scoring after the queued batches are scored
+        """
+        shadow, self.shadow = self.shadow, None
+        if shadow is not None:
+            shadow.close()
+    
+    def backend_stats(self):
+        """
+        Get latency statistics of the champion and its challenger
         
-        return is_fraud, float(risk_score)
+        Returns:
+            dict: 'champion' (backend name, latency and, for an ensemble,
+                per-member latency) and 'shadow' (ShadowScorer.stats(), or
+                None when no challenger runs)
+        """
+        members = getattr(self.backend, 'latency', {})
+        return {
+            'champion': {
+                'backend': self.backend.name,
+                'latency': self.latency.summary(),
+                'members': {name: stats.summary() for name, stats in members.items()},
+            },
+            'shadow': self.shadow.stats() if self.shadow is not None else None,
+        }
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+import threading
+from collections import deque
+
+import numpy as np
+
+# Recent batches kept for latency percentiles
+LATENCY_WINDOW = 1024
+
+
+class LatencyStats:
+    def __init__(self, window=LATENCY_WINDOW):
+        """
+        Initialize rolling per-batch latency statistics
+
+        Args:
+            window (int): Recent batches kept for percentiles
+        """
+        self.window = window
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all recorded batches
+        """
+        with self._lock:
+            self.batches = 0
+            self.rows = 0
+            self.seconds = 0.0
+            self._recent = deque(maxlen=self.window)
+
+    def record(self, seconds, rows):
+        """
+        Record one scored batch
+
+        Args:
+            seconds (float): Wall time of the batch
+            rows (int): Rows in the batch
+        """
+        with self._lock:
+            self.batches += 1
+            self.rows += rows
+            self.seconds += seconds
+            self._recent.append(seconds)
+
+    def summary(self):
+        """
+        Get latency statistics
+
+        Returns:
+            dict: batches, rows, rows_per_s and p50_ms/p99_ms over recent batches
+        """
+        with self._lock:
+            recent = np.array(self._recent)
+            return {
+                'batches': self.batches,
+                'rows': self.rows,
+                'rows_per_s': self.rows / self.seconds if self.seconds else 0.0,
+                'p50_ms': float(np.percentile(recent, 50) * 1000) if len(recent) else None,
+                'p99_ms': float(np.percentile(recent, 99) * 1000) if len(recent) else None,
+            }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    stats = LatencyStats()
+    for rows in (100, 200, 400):
+        start = time.perf_counter()
+        sum(range(rows * 1000))
+        stats.record(time.perf_counter() - start, rows)
+    print(stats.summary())
@@ -0,0 +1,499 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+from fraudguard_app.components.latency_stats import LatencyStats
+from fraudguard_app.components.quantile_sketch import KLLSketch
+
+# sklearn and joblib are imported where they are used, so scoring with a
+# CompactForestBackend never loads them
+
+# Share of training traffic each backend's own threshold flags
+FLAG_FRACTION = 0.1
+# Batches a shadow scorer may queue before it starts dropping them
+SHADOW_QUEUE_SIZE = 64
+
+
+class ModelBackend:
+    """
+    Scores encoded feature matrices; lower decision scores are more suspicious
+
+    Subclasses implement _fit and _decision. fit() also records the score
+    that flags FLAG_FRACTION of the training data (threshold) and the score
+    spread, so backends with unrelated score scales can be compared and
+    combined. Backends wrapping an already fitted model record them with
+    calibrate() instead.
+    """
+    name = 'backend'
+    supervised = False
+
+    def __init__(self):
+        self.fitted = False
+        self.threshold = 0.0
+        self.scale = 1.0
+        self.calibrated = False
+
+    def fit(self, X, y=None):
+        """
+        Fit the backend on encoded training features
+
+        Args:
+            X (numpy.ndarray): Encoded features
+            y (numpy.ndarray): Fraud labels; required by supervised backends
+
+        Returns:
+            ModelBackend: self
+        """
+        if self.supervised and y is None:
+            raise ValueError(f"{self.name} backend needs fraud labels to fit")
+        self._fit(np.asarray(X), y)
+        self.fitted = True
+        return self.calibrate(X)
+
+    def calibrate(self, X, keep_threshold=False):
+        """
+        Record the threshold and score spread of a fitted backend on sample features
+
+        Args:
+            X (numpy.ndarray): Encoded features, typically the training data
+            keep_threshold (bool): Only record the spread, keeping the current threshold
+
+        Returns:
+            ModelBackend: self
+        """
+        scores = self._decision(np.asarray(X))
+        if not keep_threshold:
+            self.threshold = float(np.quantile(scores, FLAG_FRACTION))
+        spread = np.subtract(*np.quantile(scores, [0.75, 0.25]))
+        self.scale = float(spread) if spread > 0 else 1.0
+        self.calibrated = True
+        return self
+
+    def decision_function(self, X):
+        """
+        Score a batch of encoded features
+
+        Args:
+            X (numpy.ndarray): Encoded features
+
+        Returns:
+            numpy.ndarray: Decision scores, lower is more suspicious
+        """
+        if not self.fitted:
+            raise Exception(f"{self.name} backend is not trained yet!")
+        return self._decision(np.asarray(X))
+
+    def standardized(self, X):
+        """
+        Score a batch on a common scale: 0 at the threshold, unit interquartile spread
+
+        Args:
+            X (numpy.ndarray): Encoded features
+
+        Returns:
+            numpy.ndarray: Standardized decision scores
+        """
+        if not self.calibrated:
+            raise ValueError(f"{self.name} backend has no calibrated score scale; "
+                             "fit it or call calibrate() first")
+        return (self.decision_function(X) - self.threshold) / self.scale
+
+    def _fit(self, X, y):
+        raise NotImplementedError
+
+    def _decision(self, X):
+        raise NotImplementedError
+
+    def save(self, path):
+        """
+        Save the backend with joblib
+
+        Args:
+            path (str): Output path
+        """
+        import joblib
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path):
+        """
+        Load a backend saved with save()
+
+        Args:
+            path (str): Input path
+
+        Returns:
+            ModelBackend: The backend
+        """
+        import joblib
+        return joblib.load(path)
+
+
+class IsolationForestBackend(ModelBackend):
+    name = 'isolation_forest'
+
+    def __init__(self, n_estimators=100, contamination=0.1, random_state=42, model=None, scaler=None,
+                 calibration=None):
+        """
+        Initialize a StandardScaler + IsolationForest backend
+
+        Pass model and scaler to wrap an already fitted pair; the threshold
+        is then the forest's own contamination cut at 0. Its score spread
+        is measured on calibration, which it needs to be standardized,
+        e.g. as an ensemble member.
+
+        Args:
+            n_estimators (int): Trees in the forest
+            contamination (float): Expected share of outliers
+            random_state (int): Random seed
+            model (IsolationForest): Optional fitted forest
+            scaler (StandardScaler): Scaler fitted with model
+            calibration (numpy.ndarray): Encoded sample features for a wrapped model
+        """
+        super().__init__()
+        self.model = model
+        self.scaler = scaler
+        self.params = {'n_estimators': n_estimators, 'contamination': contamination,
+                       'random_state': random_state}
+        self.fitted = model is not None
+        if self.fitted and calibration is not None:
+            self.calibrate(calibration, keep_threshold=True)
+
+    def _fit(self, X, y):
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
+        self.model = IsolationForest(**self.params).fit(self.scaler.fit_transform(X))
+
+    def _decision(self, X):
+        return self.model.decision_function(self.scaler.transform(X))
+
+
+class HistGradientBoostingBackend(ModelBackend):
+    name = 'hist_gradient_boosting'
+    supervised = True
+
+    def __init__(self, max_iter=100, random_state=42):
+        """
+        Initialize a supervised HistGradientBoosting backend trained on labelled data
+
+        Its decision score is the negated fraud log-odds.
+
+        Args:
+            max_iter (int): Boosting iterations
+            random_state (int): Random seed
+        """
+        super().__init__()
+        from sklearn.ensemble import HistGradientBoostingClassifier
+        self.model = HistGradientBoostingClassifier(max_iter=max_iter, random_state=random_state)
+
+    def _fit(self, X, y):
+        self.model.fit(X, np.asarray(y).astype(int))
+
+    def _decision(self, X):
+        return -self.model.decision_function(X)
+
+
+class LocalOutlierFactorBackend(ModelBackend):
+    name = 'local_outlier_factor'
+
+    def __init__(self, n_neighbors=20, contamination=0.1):
+        """
+        Initialize a StandardScaler + Local Outlier Factor backend in novelty mode
+
+        Args:
+            n_neighbors (int): Neighbours used for local density
+            contamination (float): Expected share of outliers
+        """
+        super().__init__()
+        from sklearn.neighbors import LocalOutlierFactor
+        from sklearn.preprocessing import StandardScaler
+        self.scaler = StandardScaler()
+        self.model = LocalOutlierFactor(n_neighbors=n_neighbors, contamination=contamination,
+                                        novelty=True)
+
+    def _fit(self, X, y):
+        self.model.fit(self.scaler.fit_transform(X))
+
+    def _decision(self, X):
+        return self.model.decision_function(self.scaler.transform(X))
+
+
+class CompactForestBackend(ModelBackend):
+    name = 'compact_forest'
+
+    def __init__(self, forest, calibration=None):
+        """
+        Initialize a NumPy-only backend around an exported CompactForest
+
+        Scores like the IsolationForest it was exported from, with the
+        same threshold at 0. It cannot be trained; export a fitted forest
+        with export_compact_forest instead. Its score spread is measured
+        on calibration, which it needs to be standardized.
+
+        Args:
+            forest (CompactForest): Loaded export
+            calibration (numpy.ndarray): Encoded sample features
+        """
+        super().__init__()
+        self.forest = forest
+        self.fitted = True
+        if calibration is not None:
+            self.calibrate(calibration, keep_threshold=True)
+
+    def _fit(self, X, y):
+        raise NotImplementedError("Compact forests are exported from a fitted IsolationForest")
+
+    def _decision(self, X):
+        return self.forest.decision_function(X)
+
+
+class EnsembleBackend(ModelBackend):
+    name = 'ensemble'
+
+    def __init__(self, members, weights=None):
+        """
+        Initialize a weighted ensemble scoring each batch with every member
+
+        Members see the same feature matrix; their standardized scores are
+        averaged with the given weights. fit() trains the unfitted members;
+        already fitted members are kept as they are and must have a
+        calibrated score scale.
+
+        Args:
+            members (list): ModelBackend instances
+            weights (list): Weight per member, equal if omitted
+        """
+        super().__init__()
+        if not members:
+            raise ValueError("An ensemble needs at least one member")
+        for member in members:
+            if member.fitted and not member.calibrated:
+                raise ValueError(f"Ensemble member {member.name} is fitted but has no calibrated "
+                                 "score scale; build it with calibration data or call calibrate()")
+        self.members = list(members)
+        self.weights = np.asarray(weights if weights is not None else [1.0] * len(members), dtype=float)
+        if len(self.weights) != len(self.members):
+            raise ValueError("Ensemble weights must match its members")
+        self.weights = self.weights / self.weights.sum()
+        self.supervised = any(member.supervised for member in self.members)
+        self.latency = {member.name: LatencyStats() for member in self.members}
+
+    def _fit(self, X, y):
+        for member in self.members:
+            if not member.fitted:
+                member.fit(X, y)
+
+    def decision_function(self, X):
+        """
+        Score a batch with every member, recording each member's latency
+
+        Args:
+            X (numpy.ndarray): Encoded features
+
+        Returns:
+            numpy.ndarray: Weighted mean of the members' standardized scores
+        """
+        if not self.fitted:
+            raise Exception(f"{self.name} backend is not trained yet!")
+        return self._combine(np.asarray(X), record=True)
+
+    def _decision(self, X):
+        return self._combine(X, record=False)
+
+    def _combine(self, X, record):
+        scores = np.zeros(len(X))
+        for member, weight in zip(self.members, self.weights):
+            start = time.perf_counter()
+            scores += weight * member.standardized(X)
+            if record:
+                self.latency[member.name].record(time.perf_counter() - start, len(X))
+        return scores
+
+
+BACKENDS = {
+    backend.name: backend for backend in
+    (IsolationForestBackend, HistGradientBoostingBackend, LocalOutlierFactorBackend)
+}
+
+
+def create_backend(name, **kwargs):
+    """
+    Create an unfitted backend by name
+
+    Args:
+        name (str): Key of BACKENDS
+        **kwargs: Backend constructor arguments
+
+    Returns:
+        ModelBackend: The backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{name}'; expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name](**kwargs)
+
+
+def find_isolation_forest(backend):
+    """
+    Get the IsolationForest backend inside a backend or ensemble, if any
+
+    Args:
+        backend (ModelBackend): Backend to search
+
+    Returns:
+        IsolationForestBackend: The first one found, or None
+    """
+    if getattr(backend, 'name', None) == IsolationForestBackend.name:
+        return backend
+    for member in getattr(backend, 'members', []):
+        found = find_isolation_forest(member)
+        if found is not None:
+            return found
+    return None
+
+
+class ShadowScorer:
+    def __init__(self, challenger, max_queue=SHADOW_QUEUE_SIZE):
+        """
+        Initialize a challenger that scores live traffic on a background thread
+
+        The champion's scoring path only copies the batch onto a bounded
+        queue; when the challenger falls behind, whole batches are dropped
+        and counted instead of slowing the champion down. The challenger
+        flags the same share of traffic the champion has flagged so far,
+        cut from a quantile sketch of its own scores, so agreement measures
+        whether both pick the same transactions.
+
+        Args:
+            challenger (ModelBackend): Fitted challenger backend
+            max_queue (int): Batches that may wait for the challenger
+        """
+        self.challenger = challenger
+        self.latency = LatencyStats()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._reset_counts()
+        self._thread = threading.Thread(target=self._run, name=f"shadow-{challenger.name}", daemon=True)
+        self._thread.start()
+
+    def _reset_counts(self):
+        self.rows = 0
+        self.agreed = 0
+        self.champion_only = 0
+        self.challenger_only = 0
+        self.dropped_rows = 0
+        self.errors = 0
+        self._champion_flagged = 0
+        self._sketch = KLLSketch(seed=0)
+        # Running sums for the champion/challenger score correlation
+        self._sums = np.zeros(5)
+
+    def submit(self, features, champion_scores, champion_flags):
+        """
+        Queue a batch the champion has scored, without waiting for the challenger
+
+        Args:
+            features (numpy.ndarray): Encoded features of the batch
+            champion_scores (numpy.ndarray): Champion decision scores
+            champion_flags (numpy.ndarray): Champion fraud flags
+
+        Returns:
+            bool: Whether the batch was queued rather than dropped
+        """
+        batch = (np.array(features), np.array(champion_scores, dtype=float),
+                 np.array(champion_flags, dtype=bool))
+        try:
+            self._queue.put_nowait(batch)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped_rows += len(batch[0])
+            return False
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            try:
+                if batch is None:
+                    return
+                features, champion_scores, champion_flags = batch
+                start = time.perf_counter()
+                scores = self.challenger.decision_function(features)
+                self.latency.record(time.perf_counter() - start, len(features))
+                self._sketch.update(scores)
+                with self._lock:
+                    self._champion_flagged += int(np.count_nonzero(champion_flags))
+                    flag_rate = self._champion_flagged / (self.rows + len(scores))
+                    threshold = self._sketch.quantiles([flag_rate])[0] if flag_rate else -np.inf
+                    flags = scores < threshold
+                    self.rows += len(flags)
+                    self.agreed += int(np.count_nonzero(flags == champion_flags))
+                    self.champion_only += int(np.count_nonzero(champion_flags & ~flags))
+                    self.challenger_only += int(np.count_nonzero(flags & ~champion_flags))
+                    self._sums += [champion_scores.sum(), scores.sum(), (champion_scores ** 2).sum(),
+                                   (scores ** 2).sum(), (champion_scores * scores).sum()]
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """
+        Wait until every queued batch has been scored
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Score the queued batches and stop the background thread
+        """
+        self._queue.put(None)
+        self._thread.join()
+
+    def stats(self):
+        """
+        Get agreement and latency statistics against the champion
+
+        Returns:
+            dict: challenger name, rows compared, agreement rate, flags
+                raised only by the champion or the challenger, score
+                correlation, dropped_rows, errors and challenger latency
+        """
+        with self._lock:
+            n = self.rows
+            sum_x, sum_y, sum_xx, sum_yy, sum_xy = self._sums
+            variance = (n * sum_xx - sum_x ** 2) * (n * sum_yy - sum_y ** 2)
+            return {
+                'challenger': self.challenger.name,
+                'rows': n,
+                'agreement': self.agreed / n if n else None,
+                'champion_only': self.champion_only,
+                'challenger_only': self.challenger_only,
+                'score_correlation': float((n * sum_xy - sum_x * sum_y) / np.sqrt(variance))
+                if variance > 0 else None,
+                'dropped_rows': self.dropped_rows,
+                'errors': self.errors,
+                'latency': self.latency.summary(),
+            }
+
+
+# Example usage
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    X = np.vstack([rng.normal(size=(900, 4)), rng.normal(4, 1, size=(100, 4))])
+    y = np.r_[np.zeros(900), np.ones(100)]
+
+    ensemble = EnsembleBackend([IsolationForestBackend(), HistGradientBoostingBackend(),
+                                LocalOutlierFactorBackend()]).fit(X, y)
+    flags = ensemble.decision_function(X) < ensemble.threshold
+    print(f"Ensemble flags {flags.sum()} rows, {flags[900:].mean():.0%} of the outliers")
+
+    shadow = ShadowScorer(LocalOutlierFactorBackend().fit(X))
+    champion = ensemble.members[0]
+    scores = champion.decision_function(X)
+    shadow.submit(X, scores, scores < champion.threshold)
+    shadow.close()
+    print(shadow.stats())
@@ -0,0 +1,172 @@
+import numpy as np
+
+
+class KLLSketch:
+    def __init__(self, k=400, seed=None):
+        """
+        Initialize a KLL quantile sketch
+
+        Values stream into a stack of compactors. When a level fills up it is
+        sorted and every other item moves up a level with double the weight,
+        so memory stays under about 3k items however many values are added.
+        Rank error is a few multiples of 1 / k, under 1% at the default k.
+
+        Args:
+            k (int): Accuracy parameter, the capacity of the top level
+            seed (int): Seed for the random compaction offsets
+        """
+        self.k = k
+        self.count = 0
+        self._levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+        self._sorted = None
+
+    def _capacity(self, level):
+        depth = len(self._levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def reseed(self, seed):
+        """
+        Restart the random compaction offsets, for reproducible runs
+
+        Args:
+            seed (int): Seed for the random compaction offsets
+        """
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        """
+        Add a batch of values to the sketch
+
+        Args:
+            values (array-like): Values to add; NaNs are ignored
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self._levels[0] = np.concatenate([self._levels[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """
+        Fold another sketch into this one
+
+        Args:
+            other (KLLSketch): Sketch to merge
+        """
+        while len(self._levels) < len(other._levels):
+            self._levels.append(np.empty(0))
+        for level, items in enumerate(other._levels):
+            self._levels[level] = np.concatenate([self._levels[level], items])
+        self.count += other.count
+        self._compress()
+
+    def _compress(self):
+        self._sorted = None
+        compacted = True
+        while compacted:
+            compacted = False
+            for level in range(len(self._levels)):
+                items = self._levels[level]
+                if len(items) < self._capacity(level):
+                    continue
+                if level + 1 == len(self._levels):
+                    self._levels.append(np.empty(0))
+                items = np.sort(items)
+                # An odd item out stays behind so total weight is preserved
+                keep = len(items) % 2
+                promoted = items[keep + self._rng.integers(2)::2]
+                self._levels[level] = items[:keep]
+                self._levels[level + 1] = np.concatenate([self._levels[level + 1], promoted])
+                compacted = True
+
+    def _weighted(self):
+        """Return (sorted items, cumulative weights), cached until the next update"""
+        if self._sorted is None:
+            items = np.concatenate(self._levels)
+            weights = np.concatenate([np.full(len(items), 2.0 ** level)
+                                      for level, items in enumerate(self._levels)])
+            order = np.argsort(items, kind='stable')
+            self._sorted = items[order], np.cumsum(weights[order])
+        return self._sorted
+
+    def __len__(self):
+        """Number of items retained, not the number of values added"""
+        return sum(len(items) for items in self._levels)
+
+    def quantiles(self, fractions):
+        """
+        Estimate quantiles of everything added so far
+
+        Args:
+            fractions (array-like): Quantile fractions in [0, 1]
+
+        Returns:
+            numpy.ndarray: Estimated values, NaN if the sketch is empty
+        """
+        fractions = np.asarray(fractions, dtype=np.float64)
+        if not self.count:
+            return np.full(fractions.shape, np.nan)
+        items, cumulative = self._weighted()
+        index = np.searchsorted(cumulative, fractions * cumulative[-1], side='left')
+        return items[np.minimum(index, len(items) - 1)]
+
+    def rank(self, values):
+        """
+        Estimate the fraction of added values that are <= each value
+
+        Args:
+            values (array-like): Values to rank
+
+        Returns:
+            numpy.ndarray: Fractions in [0, 1]
+        """
+        items, cumulative = self._weighted()
+        if not len(items):
+            return np.zeros(np.shape(values))
+        index = np.searchsorted(items, values, side='right')
+        ranked = np.concatenate([[0.0], cumulative])[index]
+        return ranked / cumulative[-1]
+
+    def save(self, path):
+        """
+        Save the sketch to an .npz file
+
+        Args:
+            path (str): Output path
+        """
+        np.savez(path, k=self.k, count=self.count,
+                 sizes=np.array([len(items) for items in self._levels]),
+                 items=np.concatenate(self._levels))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load a sketch saved with save()
+
+        Args:
+            path (str): Input path
+
+        Returns:
+            KLLSketch: The sketch
+        """
+        with np.load(path) as data:
+            sketch = cls(k=int(data['k']))
+            sketch.count = int(data['count'])
+            sketch._levels = np.split(data['items'], np.cumsum(data['sizes'])[:-1])
+        return sketch
+
+
+# Example usage
+if __name__ == "__main__":
+    sketch = KLLSketch(seed=0)
+    data = np.random.default_rng(0).normal(size=1_000_000)
+    for chunk in np.array_split(data, 100):
+        sketch.update(chunk)
+
+    fractions = [0.01, 0.1, 0.5, 0.9, 0.99]
+    print(f"Retained {len(sketch)} of {sketch.count} values")
+    print("Sketch:", np.round(sketch.quantiles(fractions), 3))
+    print("Exact: ", np.round(np.quantile(data, fractions), 3))
@@ -0,0 +1,308 @@
+import json
+import os
+
+import numpy as np
+
+from fraudguard_app.components.feature_encoder import FEATURE_COLUMNS
+
+try:
+    import yaml
+except ImportError:  # YAML rule tables are optional
+    yaml = None
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), 'risk_rules.json')
+
+# Pseudo-feature holding the model's risk score before adjustment
+RISK_SCORE = 'risk_score'
+
+OPERATORS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+class RuleError(ValueError):
+    """A rule table that could not be read or compiled"""
+
+
+# What a missing, malformed or mistyped rule table can raise while loading or compiling
+TABLE_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError)
+if yaml is not None:
+    TABLE_ERRORS += (yaml.YAMLError,)
+
+
+def load_rule_table(path):
+    """
+    Load a rule table from a JSON or YAML file
+
+    Args:
+        path (str): Path to a .json, .yaml or .yml file
+
+    Returns:
+        dict: The rule table
+    """
+    with open(path) as f:
+        if path.endswith(('.yaml', '.yml')):
+            if yaml is None:
+                raise ImportError("PyYAML is required to load YAML rule tables")
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+class RuleSet:
+    def __init__(self, table, columns=FEATURE_COLUMNS):
+        """
+        Compile a rule table into vectorized masks and adjustments
+
+        Each rule is an AND of one or more conditions and carries an 'add'
+        amount and/or a 'multiply' factor. Rules sharing a 'group' are
+        exclusive: only the first matching rule of the group, in table order,
+        fires. Adjusted scores are score * product(multipliers) + sum(adds),
+        clipped to the table's 'clamp' range.
+
+        Args:
+            table (dict): Rule table with 'rules' and optional 'clamp'
+            columns (list): Feature matrix column names
+        """
+        rules = table.get('rules', [])
+        self.names = [rule['name'] for rule in rules]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Rule names must be unique")
+        self.reason_text = [rule.get('reason', rule['name']) for rule in rules]
+        self.clamp = tuple(table.get('clamp', (0.0, 1.0)))
+
+        column_index = {name: i for i, name in enumerate(columns)}
+        # Conditions are numbered in rule order so each rule's conditions are contiguous
+        by_operator = {}
+        starts = []
+        position = 0
+        for rule in rules:
+            conditions = rule.get('when') or []
+            if not conditions:
+                raise ValueError(f"Rule '{rule['name']}' has no conditions")
+            starts.append(position)
+            for condition in conditions:
+                feature, op = condition['feature'], condition['op']
+                if op not in OPERATORS:
+                    raise ValueError(f"Rule '{rule['name']}': unknown operator '{op}'")
+                if feature == RISK_SCORE:
+                    column = -1
+                elif feature in column_index:
+                    column = column_index[feature]
+                else:
+                    raise ValueError(f"Rule '{rule['name']}': unknown feature '{feature}'")
+                by_operator.setdefault(op, []).append((position, column, float(condition['value'])))
+                position += 1
+        self.num_conditions = position
+        self._starts = np.array(starts, dtype=np.intp)
+        # AND the j-th condition into every rule that has one, a slot at a time
+        counts = np.diff(np.append(self._starts, position))
+        self._and_slots = []
+        for slot in range(1, counts.max() if len(counts) else 0):
+            slot_rules = np.flatnonzero(counts > slot)
+            self._and_slots.append((slot_rules, self._starts[slot_rules] + slot))
+
+        # One broadcast comparison per operator covers all of its conditions
+        self._comparisons = []
+        for op, entries in by_operator.items():
+            positions, cols, values = (np.array(v) for v in zip(*entries))
+            feature_mask = cols >= 0
+            self._comparisons.append((
+                OPERATORS[op],
+                positions[feature_mask], cols[feature_mask].astype(np.intp), values[feature_mask],
+                positions[~feature_mask], values[~feature_mask],
+            ))
+
+        groups = {}
+        for i, rule in enumerate(rules):
+            if rule.get('group') is not None:
+                groups.setdefault(rule['group'], []).append(i)
+        self._groups = [np.array(members) for members in groups.values() if len(members) > 1]
+
+        self._adds = np.array([float(rule.get('add', 0.0)) for rule in rules])
+        factors = np.array([float(rule.get('multiply', 1.0)) for rule in rules])
+        self._multiply_rules = np.flatnonzero(factors != 1.0)
+        self._factors = factors[self._multiply_rules]
+
+    def __len__(self):
+        return len(self.names)
+
+    def fired(self, features, risk_scores):
+        """
+        Evaluate which rules fire for each row
+
+        Args:
+            features (numpy.ndarray): (n_rows, n_columns) feature matrix
+            risk_scores (numpy.ndarray): Unadjusted risk scores
+
+        Returns:
+            numpy.ndarray: (n_rows, n_rules) bool matrix
+        """
+        return self._fired_by_rule(features, risk_scores).T
+
+    def _fired_by_rule(self, features, risk_scores):
+        """Rule-major (n_rules, n_rows) version of fired(), contiguous per rule"""
+        n_rows = len(risk_scores)
+        if not self.names:
+            return np.zeros((0, n_rows), dtype=bool)
+
+        # Rule-major layout keeps every condition and rule a contiguous row
+        by_column = np.ascontiguousarray(features.T)
+        conditions = np.empty((self.num_conditions, n_rows), dtype=bool)
+        for compare, positions, cols, values, score_positions, score_values in self._comparisons:
+            if len(positions):
+                conditions[positions] = compare(by_column[cols], values[:, None])
+            if len(score_positions):
+                conditions[score_positions] = compare(risk_scores, score_values[:, None])
+
+        fired = conditions[self._starts]
+        for slot_rules, slot_conditions in self._and_slots:
+            fired[slot_rules] &= conditions[slot_conditions]
+
+        # Keep only the first firing rule of each exclusive group
+        for members in self._groups:
+            group_fired = fired[members]
+            fired[members] = group_fired & (np.cumsum(group_fired, axis=0) == 1)
+        return fired
+
+    def apply(self, features, risk_scores):
+        """
+        Adjust a batch of risk scores
+
+        Args:
+            features (numpy.ndarray): (n_rows, n_columns) feature matrix
+            risk_scores (numpy.ndarray): Unadjusted risk scores
+
+        Returns:
+            tuple: (adjusted scores, packed fired-rule bitmask of shape
+                (n_rows, ceil(n_rules / 8)), bit i set when rule i fired)
+        """
+        fired = self._fired_by_rule(features, risk_scores)
+        adjusted = np.array(risk_scores, dtype=np.float64)
+        if len(self._multiply_rules):
+            adjusted *= np.where(fired[self._multiply_rules], self._factors[:, None], 1.0).prod(axis=0)
+        if len(self.names):
+            adjusted += self._adds @ fired
+        np.clip(adjusted, self.clamp[0], self.clamp[1], out=adjusted)
+        return adjusted, np.ascontiguousarray(np.packbits(fired, axis=0, bitorder='little').T)
+
+    def fired_names(self, bits):
+        """
+        Decode one row of a fired-rule bitmask
+
+        Args:
+            bits (numpy.ndarray): One row returned by apply()
+
+        Returns:
+            list: Names of the rules that fired
+        """
+        indexes = np.flatnonzero(np.unpackbits(bits, count=len(self.names), bitorder='little'))
+        return [self.names[i] for i in indexes]
+
+    def reasons(self, bits):
+        """
+        Get the reasons of the rules that fired for one row
+
+        Args:
+            bits (numpy.ndarray): One row returned by apply()
+
+        Returns:
+            list: Reason strings
+        """
+        indexes = np.flatnonzero(np.unpackbits(bits, count=len(self.names), bitorder='little'))
+        return [self.reason_text[i] for i in indexes]
+
+
+class RiskRuleEngine:
+    def __init__(self, source=DEFAULT_RULES_PATH, columns=FEATURE_COLUMNS):
+        """
+        Initialize a reloadable risk adjustment engine
+
+        Args:
+            source: Path to a JSON/YAML rule table, or the table itself
+            columns (list): Feature matrix column names
+        """
+        self.source = source
+        self.columns = list(columns)
+        self._mtime = None
+        self.reload()
+
+    def reload(self):
+        """
+        Recompile the rule table from its source
+
+        The new rule set is compiled before it replaces the current one, so
+        concurrent evaluations see either the old or the new rules, and a
+        table that fails to compile leaves the current rules in place.
+
+        Raises:
+            RuleError: If the table cannot be read or compiled
+        """
+        try:
+            if isinstance(self.source, dict):
+                self.ruleset = RuleSet(self.source, self.columns)
+                return
+            mtime = os.path.getmtime(self.source)
+            ruleset = RuleSet(load_rule_table(self.source), self.columns)
+        except TABLE_ERRORS as e:
+            raise RuleError(f"{type(e).__name__}: {e}") from e
+        self.ruleset = ruleset
+        self._mtime = mtime
+
+    def reload_if_changed(self):
+        """
+        Reload the rule table if its file changed since the last load
+
+        Returns:
+            bool: True if the rules were reloaded
+
+        Raises:
+            RuleError: If the changed table cannot be read or compiled; the
+                current rules stay in place and the next call retries
+        """
+        if isinstance(self.source, dict):
+            return False
+        try:
+            mtime = os.path.getmtime(self.source)
+        except OSError as e:
+            raise RuleError(f"{type(e).__name__}: {e}") from e
+        if mtime == self._mtime:
+            return False
+        self.reload()
+        return True
+
+    def apply(self, features, risk_scores):
+        """
+        Adjust a batch of risk scores with the current rules
+
+        Returns:
+            tuple: (adjusted scores, packed fired-rule bitmask), see RuleSet.apply
+        """
+        return self.ruleset.apply(features, risk_scores)
+
+    def reasons(self, bits):
+        """
+        Get the reasons of the rules that fired for one row
+
+        Returns:
+            list: Reason strings, see RuleSet.reasons
+        """
+        return self.ruleset.reasons(bits)
+
+
+# Example usage
+if __name__ == "__main__":
+    from fraudguard_app.components.feature_encoder import FeatureEncoder
+
+    engine = RiskRuleEngine()
+    features = FeatureEncoder().encode([
+        {'merchant': 'Suspicious Merchant', 'account_age_days': 5, 'previous_transactions': 1},
+        {'merchant': 'Amazon', 'account_age_days': 900, 'previous_transactions': 40},
+    ])
+    scores, bits = engine.apply(features, np.array([0.4, 0.4]))
+    for score, row in zip(scores, bits):
+        print(f"{score:.2f}", engine.reasons(row))
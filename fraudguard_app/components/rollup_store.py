@@ -0,0 +1,234 @@
+import numpy as np
+
+# (name, bucket width in seconds, buckets kept): 1 s for an hour, 1 min for a
+# day, 1 h for 30 days and 1 day (UTC) for 5 years, each with some slack so a
+# range of exactly that length, ending now, is still fully held
+TIERS = (
+    ('1s', 1, 3660),
+    ('1min', 60, 1500),
+    ('1h', 3600, 744),
+    ('1d', 86400, 1830),
+)
+# Most buckets a query reads before downsampling; picks the coarsest tier needed
+MAX_QUERY_BUCKETS = 4096
+# Marks ring slots that have never held a bucket
+_EMPTY = np.iinfo(np.int64).min
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+
+    Keeps the first and last points and, from each of n_out - 2 equal
+    buckets in between, the point forming the largest triangle with the
+    point kept before it and the mean of the next bucket. Peaks and dips
+    survive, unlike with striding or averaging.
+
+    Args:
+        x (numpy.ndarray): Increasing x values
+        y (numpy.ndarray): y values
+        n_out (int): Points to keep
+
+    Returns:
+        numpy.ndarray: Indices of the kept points, increasing
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    kept = np.empty(n_out, dtype=np.intp)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        following = slice(stop, edges[i + 2]) if i + 2 < len(edges) else slice(n - 1, n)
+        mean_x, mean_y = x[following].mean(), y[following].mean()
+        # Twice the triangle area, up to sign, for every candidate at once
+        areas = np.abs((x[previous] - mean_x) * (y[start:stop] - y[previous])
+                       - (x[previous] - x[start:stop]) * (mean_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        kept[i + 1] = previous
+    return kept
+
+
+class _Tier:
+    def __init__(self, name, width, capacity):
+        """Ring buffer of per-bucket counts; slot = bucket % capacity"""
+        self.name = name
+        self.width = width
+        self.capacity = capacity
+        self.buckets = np.full(capacity, _EMPTY, dtype=np.int64)
+        self.transactions = np.zeros(capacity, dtype=np.int64)
+        self.frauds = np.zeros(capacity, dtype=np.int64)
+        self.risk_sum = np.zeros(capacity)
+        self.newest = _EMPTY
+
+    def add(self, seconds, is_fraud, risk_scores):
+        buckets = np.floor_divide(seconds, self.width).astype(np.int64)
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        slots = unique % self.capacity
+        # The newest bucket claims a slot; rows for buckets already evicted are dropped
+        claimed = self.buckets.copy()
+        np.maximum.at(claimed, slots, unique)
+        reset = claimed != self.buckets
+        self.buckets[reset] = claimed[reset]
+        self.transactions[reset] = 0
+        self.frauds[reset] = 0
+        self.risk_sum[reset] = 0.0
+        keep = (claimed[slots] == unique)[inverse]
+        self.newest = max(self.newest, int(unique[-1]))
+
+        rows = slots[inverse][keep]
+        self.transactions += np.bincount(rows, minlength=self.capacity)
+        self.frauds += np.bincount(rows, weights=is_fraud[keep], minlength=self.capacity).astype(np.int64)
+        self.risk_sum += np.bincount(rows, weights=risk_scores[keep], minlength=self.capacity)
+
+    def add_bucket(self, bucket, transactions, frauds, risk_sum):
+        slot = bucket % self.capacity
+        if self.buckets[slot] > bucket:
+            return
+        if self.buckets[slot] < bucket:
+            self.buckets[slot] = bucket
+            self.transactions[slot] = self.frauds[slot] = 0
+            self.risk_sum[slot] = 0.0
+        self.transactions[slot] += transactions
+        self.frauds[slot] += frauds
+        self.risk_sum[slot] += risk_sum
+        self.newest = max(self.newest, bucket)
+
+    def retains(self, start):
+        """Whether every bucket from start on is still held"""
+        return self.newest == _EMPTY or start // self.width > self.newest - self.capacity
+
+    def read(self, start, end):
+        ids = np.arange(int(start // self.width), int(end // self.width) + 1, dtype=np.int64)
+        slots = ids % self.capacity
+        present = self.buckets[slots] == ids
+        return {
+            'time': ids.astype(np.float64) * self.width,
+            'transactions': np.where(present, self.transactions[slots], 0),
+            'frauds': np.where(present, self.frauds[slots], 0),
+            'risk_sum': np.where(present, self.risk_sum[slots], 0.0),
+        }
+
+    def clear(self):
+        self.buckets.fill(_EMPTY)
+        self.transactions.fill(0)
+        self.frauds.fill(0)
+        self.risk_sum.fill(0.0)
+        self.newest = _EMPTY
+
+
+class RollupStore:
+    def __init__(self, tiers=TIERS):
+        """
+        Initialize multi-resolution transaction and fraud counts
+
+        Every tier is a fixed ring of buckets, so memory is constant and
+        old buckets are overwritten as time moves on. Each slot remembers
+        which bucket it holds, so a slot left over from an earlier lap of
+        the ring reads as empty.
+
+        Args:
+            tiers (tuple): (name, bucket seconds, buckets kept) per tier,
+                finest first
+        """
+        self.tiers = [_Tier(name, width, capacity) for name, width, capacity in tiers]
+
+    def add(self, timestamps, is_fraud, risk_scores):
+        """
+        Count a batch of scored transactions in every tier
+
+        Args:
+            timestamps: Epoch seconds, an array with one per transaction or
+                a number for the whole batch
+            is_fraud (array-like): Fraud flags
+            risk_scores (array-like): Risk scores
+        """
+        is_fraud = np.asarray(is_fraud, dtype=np.float64).ravel()
+        if not len(is_fraud):
+            return
+        risk_scores = np.asarray(risk_scores, dtype=np.float64).ravel()
+        if np.ndim(timestamps) == 0:
+            # One timestamp for the batch: a single bucket per tier
+            totals = len(is_fraud), int(is_fraud.sum()), float(risk_scores.sum())
+            for tier in self.tiers:
+                tier.add_bucket(int(timestamps // tier.width), *totals)
+            return
+        seconds = np.asarray(timestamps, dtype=np.float64).ravel()
+        for tier in self.tiers:
+            tier.add(seconds, is_fraud, risk_scores)
+
+    def tier_for(self, start, end):
+        """
+        Pick the finest tier that still holds start and covers the range in MAX_QUERY_BUCKETS
+
+        Args:
+            start (float): Range start, epoch seconds
+            end (float): Range end, epoch seconds
+
+        Returns:
+            _Tier: The tier, the coarsest one if none fits
+        """
+        for tier in self.tiers:
+            if tier.retains(start) and (end - start) / tier.width < MAX_QUERY_BUCKETS:
+                return tier
+        return self.tiers[-1]
+
+    def query(self, start, end, max_points=None, metric='frauds'):
+        """
+        Read bucketed counts for a time range
+
+        Args:
+            start (float): Range start, epoch seconds
+            end (float): Range end, epoch seconds
+            max_points (int): Downsample to at most this many points with
+                LTTB on metric; all buckets if omitted
+            metric (str): 'transactions', 'frauds' or 'risk_sum'
+
+        Returns:
+            dict: 'tier' and 'width' of the buckets read, plus 'time'
+                (bucket start, epoch seconds), 'transactions', 'frauds' and
+                'risk_sum' arrays
+        """
+        tier = self.tier_for(start, end)
+        series = tier.read(start, end)
+        if max_points is not None:
+            kept = lttb(series['time'], series[metric], max_points)
+            series = {name: values[kept] for name, values in series.items()}
+        series['tier'] = tier.name
+        series['width'] = tier.width
+        return series
+
+    def clear(self):
+        """
+        Forget all counts
+        """
+        for tier in self.tiers:
+            tier.clear()
+
+    @property
+    def nbytes(self):
+        """Memory held by the ring buffers"""
+        return sum(tier.buckets.nbytes + tier.transactions.nbytes + tier.frauds.nbytes
+                   + tier.risk_sum.nbytes for tier in self.tiers)
+
+
+# Example usage
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    now = time.time()
+    store = RollupStore()
+    # Two days of traffic, one batch per minute
+    for minute in range(2 * 1440):
+        seconds = now - 2 * 86400 + minute * 60 + rng.uniform(0, 60, 50)
+        store.add(seconds, rng.random(50) < 0.05, rng.random(50))
+    for label, window in (("hour", 3600), ("day", 86400), ("week", 7 * 86400)):
+        series = store.query(now - window, now, max_points=200)
+        print(f"Last {label}: {series['tier']} buckets, {len(series['time'])} points, "
+              f"{int(series['frauds'].sum())} frauds in the kept points")
+    print(f"{store.nbytes:,} bytes")
@@ -0,0 +1,643 @@
+import hashlib
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from fraudguard_app.components.dedup import DuplicateFilter, event_time
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.entity_graph import EntityGraph, ESCALATION_FRACTION
+from fraudguard_app.components.rollup_store import RollupStore
+from fraudguard_app.components.quantile_sketch import KLLSketch
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+from fraudguard_app.blockchain_sim.snapshot import save_snapshot, load_snapshot
+
+# Stages of process_batch, in order: duplicate detection, model scoring and
+# rules, attribution of flagged rows, entity graph linking, and recording
+# under the write lock
+STAGES = ('dedup', 'score', 'explain', 'link', 'record')
+# Equal-width bins of the risk score histogram over [0, 1]
+RISK_BINS = 20
+
+
+def _event_timestamp(tx, default):
+    """A transaction's own timestamp as a datetime; default if missing or unparseable"""
+    value = tx.get('timestamp')
+    if isinstance(value, datetime):
+        return value
+    seconds = event_time(tx, None)
+    return default if seconds is None else datetime.fromtimestamp(seconds)
+
+
+def flag_reason(reasons, top_features=(), linked_fraction=0.0):
+    """
+    Build the fraud flag reason recorded in FraudFlagRegistry
+
+    Args:
+        reasons (list): Reasons of the risk rules that fired
+        top_features (list): (feature name, share) pairs from the explainer
+        linked_fraction (float): Share of the account's merchants that were flagged
+
+    Returns:
+        str: The reason
+    """
+    reasons = list(reasons)
+    if linked_fraction >= ESCALATION_FRACTION:
+        reasons.append(f"account linked to flagged merchants ({linked_fraction:.0%})")
+    if top_features:
+        reasons.append("top features: " + ", ".join(
+            f"{name} ({share:.0%})" for name, share in top_features))
+    if not reasons:
+        return "High risk score detected"
+    return "High risk score detected: " + "; ".join(reasons)
+
+
+class ReadWriteLock:
+    def __init__(self):
+        """
+        Initialize a lock allowing many concurrent readers or one writer
+
+        Waiting writers block new readers, so a steady stream of dashboard
+        reads cannot starve the scoring writer.
+        """
+        self._condition = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read_lock(self):
+        with self._condition:
+            while self._writer or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write_lock(self):
+        with self._condition:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._condition.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer = False
+                self._condition.notify_all()
+
+
+class ScoringBackend:
+    def __init__(self, detector=None, alert_bus=None, dedup=None):
+        """
+        Initialize a process-wide scoring backend shared by all dashboard sessions
+
+        One model and one set of registries serve every session. Scoring runs
+        outside the lock; only applying results to shared state takes the
+        write lock, and sessions read through SessionView under the read lock.
+        New alerts are handed to the alert bus after the lock is released.
+        Resubmitted and near-duplicate transactions are caught before
+        scoring; they are not scored or recorded again, only listed as
+        duplicates.
+
+        Args:
+            detector (FraudDetector): Detector to use, a new one if omitted
+            alert_bus (AlertBus): Bus delivering alerts to external sinks;
+                alerts are only kept in memory if omitted
+            dedup (DuplicateFilter): Duplicate detection, a new one with the
+                default windows if omitted; False to score every transaction
+        """
+        self.detector = detector if detector is not None else FraudDetector()
+        self.alert_bus = alert_bus
+        self.dedup = DuplicateFilter() if dedup is None else (dedup or None)
+        self.risk_registry = RiskScoreRegistry()
+        self.fraud_registry = FraudFlagRegistry()
+        self.audit_trail = AuditTrail()
+        self.entity_graph = EntityGraph()
+        self.rollups = RollupStore()
+        self.transaction_data = []
+        self.alerts = []
+        self.duplicates = []
+        self.blockchain_txs = []
+        self.fraud_count = 0
+        self.risk_sum = 0.0
+        # Running summaries of every recorded transaction, so sessions do
+        # not rescan the history on each rerun
+        self.decision_sketch = KLLSketch()
+        self.risk_counts = np.zeros(RISK_BINS, dtype=np.int64)
+        # Bumped on every write so sessions can cheaply detect changes
+        self.version = 0
+        self.lock = ReadWriteLock()
+
+    def _link_entities(self, txs, is_fraud):
+        """
+        Add transactions to the entity graph
+
+        Args:
+            txs (list): Transactions; those without an account_id are skipped
+            is_fraud (list): Fraud flag per transaction
+
+        Returns:
+            list: Per transaction, the share of its account's merchants that
+                were already flagged before this batch
+        """
+        rows = [i for i, tx in enumerate(txs) if tx.get('account_id') is not None]
+        linked = [0.0] * len(txs)
+        if rows:
+            accounts = [txs[i]['account_id'] for i in rows]
+            fractions = self.entity_graph.account_features(accounts)['flagged_neighbor_fraction']
+            for i, fraction in zip(rows, fractions.tolist()):
+                linked[i] = fraction
+            self.entity_graph.add_transactions(accounts, [txs[i]['merchant'] for i in rows],
+                                               [is_fraud[i] for i in rows])
+        return linked
+
+    def _summarize(self, risk_scores, decision_scores):
+        """Fold recorded scores into the decision sketch and risk histogram; caller holds the write lock"""
+        self.decision_sketch.update(decision_scores)
+        bins = np.clip((np.asarray(risk_scores) * RISK_BINS).astype(np.int64), 0, RISK_BINS - 1)
+        self.risk_counts += np.bincount(bins, minlength=RISK_BINS)
+
+    def _flag_reason(self, ruleset, fired_rules, top_features, linked_fraction=0.0):
+        """Build a fraud flag reason from ruleset's fired-rule bits, top model features and entity links"""
+        return flag_reason(ruleset.reasons(fired_rules), top_features, linked_fraction)
+
+    def _drop_duplicates(self, txs, now=None):
+        """
+        Split off resubmitted and near-duplicate transactions and record them
+
+        Args:
+            txs (list): Transactions
+            now (datetime): Arrival time, the current time if omitted
+
+        Returns:
+            list: The transactions to score
+        """
+        if self.dedup is None:
+            return txs
+        now = now or datetime.now()
+        signals = self.dedup.check(txs, now.timestamp())
+        duplicates = [dict(signal, transaction_id=tx.get('transaction_id'), timestamp=now)
+                      for tx, signal in zip(txs, signals) if signal is not None]
+        if not duplicates:
+            return txs
+        with self.lock.write_lock():
+            self.duplicates.extend(duplicates)
+            self.version += 1
+        return [tx for tx, signal in zip(txs, signals) if signal is None]
+
+    def process_transaction(self, tx, enable_blockchain=True):
+        """
+        Score a transaction and record it in the shared state
+
+        Args:
+            tx (dict): Transaction from generate_transaction_stream
+            enable_blockchain (bool): Also write the blockchain registries
+
+        Returns:
+            dict: The recorded transaction, or None for a duplicate
+        """
+        if not self._drop_duplicates([tx]):
+            return None
+        ruleset = self.detector.rules.ruleset
+        is_fraud, risk_scores, fired_rules, decision_scores = self.detector.score_batch([tx], ruleset=ruleset)
+        is_fraud, risk_score = bool(is_fraud[0]), float(risk_scores[0])
+        linked = self._link_entities([tx], [is_fraud])[0]
+        reason = (self._flag_reason(ruleset, fired_rules[0], self.detector.explain([tx])[0], linked)
+                  if is_fraud else None)
+        now = datetime.now()
+        tx_id = tx['transaction_id']
+
+        with self.lock.write_lock():
+            if enable_blockchain:
+                self.risk_registry.store_risk(tx_id, risk_score)
+                if is_fraud:
+                    self.fraud_registry.flag_fraud(tx_id, reason)
+                self.audit_trail.log_audit(tx_id, risk_score, now)
+
+                if is_fraud:
+                    # Simulate blockchain transaction hash
+                    hash_input = f"{tx_id}{risk_score}{now.timestamp()}".encode()
+                    self.blockchain_txs.append({
+                        'transaction_id': tx_id,
+                        'blockchain_tx_hash': "0x" + hashlib.sha256(hash_input).hexdigest()[:64],
+                        'timestamp': now
+                    })
+
+            tx_record = {
+                "timestamp": now,
+                "transaction_id": tx_id,
+                "amount": tx['amount'],
+                "merchant": tx['merchant'],
+                "category": tx['category'],
+                "risk_score": risk_score,
+                "decision_score": float(decision_scores[0]),
+                "is_fraud": is_fraud
+            }
+            self.transaction_data.append(tx_record)
+            self._summarize([risk_score], [tx_record['decision_score']])
+            self.rollups.add(now.timestamp(), [is_fraud], [risk_score])
+            self.risk_sum += risk_score
+
+            if is_fraud:
+                self.fraud_count += 1
+                alert = {
+                    "timestamp": now,
+                    "transaction_id": tx_id,
+                    "risk_score": risk_score,
+                    "reason": reason
+                }
+                self.alerts.append(alert)
+            self.version += 1
+
+        if is_fraud and self.alert_bus is not None:
+            self.alert_bus.publish([alert])
+        return tx_record
+
+    def process_batch(self, txs, enable_blockchain=True, timings=None, use_event_time=False):
+        """
+        Score a batch of transactions in one vectorized pass and record them
+
+        Registry writes use the batch APIs, and the write lock is taken once
+        for the whole batch. Duplicates are dropped first.
+
+        Records, alerts, audit logs and rollups are stamped with the time
+        of processing. With use_event_time, each transaction is stamped
+        with its own 'timestamp' instead (the current time if it has none)
+        and the batch arrives, for duplicate expiry, at its latest one, so
+        a replayed recording is recorded the same way whenever it runs.
+
+        Args:
+            txs (list): Transactions from generate_transaction_stream
+            enable_blockchain (bool): Also write the blockchain registries
+            timings (dict): If given, receives the seconds spent in each of
+                STAGES for this batch
+            use_event_time (bool): Stamp transactions with their own timestamps
+
+        Returns:
+            list: The recorded transactions, without the duplicates
+        """
+        began = time.perf_counter()
+        now = datetime.now()
+        arrival = max((_event_timestamp(tx, now) for tx in txs), default=now) if use_event_time else now
+        txs = self._drop_duplicates(txs, arrival)
+        start = time.perf_counter()
+        if not txs:
+            if timings is not None:
+                timings.update(dict.fromkeys(STAGES, 0.0), dedup=start - began)
+            return []
+        # The rules are read once, so a reload mid-batch cannot change what the bitmask means
+        ruleset = self.detector.rules.ruleset
+        is_fraud, risk_scores, fired_rules, decision_scores = self.detector.score_batch(txs, ruleset=ruleset)
+        scored = time.perf_counter()
+        is_fraud = is_fraud.tolist()
+        risk_scores = risk_scores.tolist()
+        stamps = [_event_timestamp(tx, now) for tx in txs] if use_event_time else [now] * len(txs)
+        tx_ids = [tx['transaction_id'] for tx in txs]
+        flagged = [i for i, fraud in enumerate(is_fraud) if fraud]
+        # Attribution only runs over the flagged rows
+        top_features = self.detector.explain([txs[i] for i in flagged]) if flagged else []
+        explained = time.perf_counter()
+        linked = self._link_entities(txs, is_fraud)
+        reasons = {i: self._flag_reason(ruleset, fired_rules[i], top, linked[i])
+                   for i, top in zip(flagged, top_features)}
+        linked_at = time.perf_counter()
+
+        records = [{
+            "timestamp": stamp,
+            "transaction_id": tx_id,
+            "amount": tx['amount'],
+            "merchant": tx['merchant'],
+            "category": tx['category'],
+            "risk_score": risk_score,
+            "decision_score": decision_score,
+            "is_fraud": fraud
+        } for tx, stamp, tx_id, risk_score, decision_score, fraud
+            in zip(txs, stamps, tx_ids, risk_scores, decision_scores.tolist(), is_fraud)]
+        alerts = [{
+            "timestamp": stamps[i],
+            "transaction_id": tx_ids[i],
+            "risk_score": risk_scores[i],
+            "reason": reasons[i]
+        } for i in flagged]
+
+        with self.lock.write_lock():
+            if enable_blockchain:
+                self.risk_registry.store_risks(zip(tx_ids, risk_scores))
+                self.fraud_registry.flag_frauds((tx_ids[i], reasons[i]) for i in flagged)
+                self.audit_trail.log_audits(zip(tx_ids, risk_scores, stamps))
+
+                for i in flagged:
+                    # Simulate blockchain transaction hash
+                    hash_input = f"{tx_ids[i]}{risk_scores[i]}{stamps[i].timestamp()}".encode()
+                    self.blockchain_txs.append({
+                        'transaction_id': tx_ids[i],
+                        'blockchain_tx_hash': "0x" + hashlib.sha256(hash_input).hexdigest()[:64],
+                        'timestamp': stamps[i]
+                    })
+
+            self.transaction_data.extend(records)
+            self._summarize(risk_scores, decision_scores)
+            self.rollups.add([stamp.timestamp() for stamp in stamps] if use_event_time else now.timestamp(),
+                             is_fraud, risk_scores)
+            self.risk_sum += sum(risk_scores)
+            self.fraud_count += len(flagged)
+            self.alerts.extend(alerts)
+            self.version += 1
+
+        if alerts and self.alert_bus is not None:
+            self.alert_bus.publish(alerts)
+
+        if timings is not None:
+            end = time.perf_counter()
+            timings.update(zip(STAGES, (start - began, scored - start, explained - scored,
+                                        linked_at - explained, end - linked_at)))
+        return records
+
+    def clear(self):
+        """
+        Clear all shared transactions, alerts and registries
+        """
+        with self.lock.write_lock():
+            self.transaction_data = []
+            self.alerts = []
+            self.duplicates = []
+            self.blockchain_txs = []
+            self.fraud_count = 0
+            self.risk_sum = 0.0
+            self.decision_sketch = KLLSketch()
+            self.risk_counts = np.zeros(RISK_BINS, dtype=np.int64)
+            self.risk_registry.clear()
+            self.fraud_registry.clear()
+            self.audit_trail.clear()
+            self.detector.drift_monitor.reset()
+            self.entity_graph.clear()
+            self.rollups.clear()
+            if self.dedup is not None:
+                self.dedup.clear()
+            self.version += 1
+
+    def save_snapshot(self, directory):
+        """
+        Save the shared registries as a columnar snapshot
+
+        Args:
+            directory (str): Snapshot directory
+        """
+        with self.lock.read_lock():
+            save_snapshot(directory, self.risk_registry, self.fraud_registry, self.audit_trail)
+
+    def restore_snapshot(self, directory):
+        """
+        Replace the shared registries with the contents of a snapshot
+
+        Args:
+            directory (str): Snapshot directory
+        """
+        snapshot = load_snapshot(directory)
+        with self.lock.write_lock():
+            snapshot.restore(self.risk_registry, self.fraud_registry, self.audit_trail)
+            self.version += 1
+
+    def view(self):
+        """
+        Get a read-only view of the shared state for one session
+
+        Returns:
+            SessionView: The view
+        """
+        return SessionView(self)
+
+
+def _copies(records, last):
+    """Copies of the last records (all if last is falsy), so callers cannot change the shared ones"""
+    return [dict(record) for record in (records[-last:] if last else records)]
+
+
+class SessionView:
+    def __init__(self, backend):
+        """
+        Initialize a read-only view over a ScoringBackend
+
+        Every read takes the backend's read lock and returns copies, so the
+        caller never holds references into the live shared state.
+
+        Args:
+            backend (ScoringBackend): The shared backend
+        """
+        self._backend = backend
+
+    @property
+    def version(self):
+        return self._backend.version
+
+    def summary(self):
+        """
+        Get dashboard summary metrics
+
+        Returns:
+            dict: total_transactions, fraud_count, avg_risk and
+                duplicate_count
+        """
+        backend = self._backend
+        with backend.lock.read_lock():
+            total = len(backend.transaction_data)
+            return {
+                'total_transactions': total,
+                'fraud_count': backend.fraud_count,
+                'avg_risk': backend.risk_sum / total if total else 0.0,
+                'duplicate_count': len(backend.duplicates),
+            }
+
+    def transactions(self, last=None):
+        """
+        Get recorded transactions, oldest first
+
+        Args:
+            last (int): Only return the most recent transactions
+
+        Returns:
+            list: Copies of the transaction records
+        """
+        with self._backend.lock.read_lock():
+            return _copies(self._backend.transaction_data, last)
+
+    def flagged_count(self, sensitivity):
+        """
+        Estimate how many recorded transactions a sensitivity would flag
+
+        Reads the sketch of recorded decision scores, so the cost does not
+        depend on how many transactions are stored. The count is exact
+        until the sketch starts compacting (a few thousand transactions)
+        and within its rank error (under 1%) after that.
+
+        Args:
+            sensitivity (float): Sensitivity in [0, 1]
+
+        Returns:
+            int: Transactions scoring below the sensitivity's threshold
+        """
+        threshold = self._backend.detector.threshold_for(sensitivity)
+        with self._backend.lock.read_lock():
+            sketch = self._backend.decision_sketch
+            if not sketch.count:
+                return 0
+            # rank() counts values <= threshold; flags are strictly below it
+            return int(round(sketch.count * float(sketch.rank(np.nextafter(threshold, -np.inf)))))
+
+    def risk_histogram(self):
+        """
+        Get the distribution of recorded risk scores
+
+        Returns:
+            tuple: (counts: int array of RISK_BINS, edges: RISK_BINS + 1
+                bin edges over [0, 1])
+        """
+        with self._backend.lock.read_lock():
+            counts = self._backend.risk_counts.copy()
+        return counts, np.linspace(0.0, 1.0, RISK_BINS + 1)
+
+    def alerts(self, last=None):
+        """
+        Get fraud alerts, oldest first
+
+        Args:
+            last (int): Only return the most recent alerts
+
+        Returns:
+            list: Copies of the alert records
+        """
+        with self._backend.lock.read_lock():
+            return _copies(self._backend.alerts, last)
+
+    def duplicates(self, last=None):
+        """
+        Get transactions skipped as duplicates, oldest first
+
+        Args:
+            last (int): Only return the most recent duplicates
+
+        Returns:
+            list: Dicts with transaction_id, timestamp, kind ('exact' or
+                'near'), original_id and seconds_apart
+        """
+        with self._backend.lock.read_lock():
+            return _copies(self._backend.duplicates, last)
+
+    def blockchain_txs(self, last=None):
+        """
+        Get simulated blockchain transactions, oldest first
+
+        Args:
+            last (int): Only return the most recent transactions
+
+        Returns:
+            list: Copies of the blockchain transaction records
+        """
+        with self._backend.lock.read_lock():
+            return _copies(self._backend.blockchain_txs, last)
+
+    def registry_sizes(self):
+        """
+        Get the number of entries in each registry
+
+        Returns:
+            dict: Sizes keyed by 'risk_scores', 'fraud_flags' and 'audit_logs'
+        """
+        backend = self._backend
+        with backend.lock.read_lock():
+            return {
+                'risk_scores': len(backend.risk_registry),
+                'fraud_flags': len(backend.fraud_registry),
+                'audit_logs': len(backend.audit_trail),
+            }
+
+    def drift(self):
+        """
+        Get drift statistics of live traffic against the training baseline
+
+        Returns:
+            dict: 'metrics' (column -> psi, ks, weight), 'alerts' (drifted
+                columns, worst first) and 'transactions_seen'
+        """
+        monitor = self._backend.detector.drift_monitor
+        metrics = monitor.metrics()
+        return {
+            'metrics': metrics,
+            'alerts': monitor.alerts(),
+            'transactions_seen': monitor.total_seen,
+        }
+
+    def entity_graph(self):
+        """
+        Get account/merchant graph statistics
+
+        Returns:
+            dict: accounts, merchants, edges, components, transactions and
+                largest_component
+        """
+        return self._backend.entity_graph.stats()
+
+    def trends(self, window, max_points=200, end=None):
+        """
+        Get transaction and fraud counts over a time window
+
+        Reads the finest rollup tier that holds the whole window, so the
+        cost depends on max_points, not on how much history is stored.
+
+        Args:
+            window (float): Window length in seconds
+            max_points (int): Points to downsample to
+            end (float): Window end in epoch seconds, now if omitted
+
+        Returns:
+            dict: RollupStore.query result
+        """
+        end = time.time() if end is None else end
+        with self._backend.lock.read_lock():
+            return self._backend.rollups.query(end - window, end, max_points)
+
+    def query_registry(self, view, **kwargs):
+        """
+        Run a paginated registry query
+
+        Args:
+            view (str): 'risk_scores', 'fraud_flags' or 'audit_logs'
+            **kwargs: Arguments for the registry's query method
+
+        Returns:
+            dict: Query page
+        """
+        backend = self._backend
+        registry = {
+            'risk_scores': backend.risk_registry,
+            'fraud_flags': backend.fraud_registry,
+            'audit_logs': backend.audit_trail,
+        }[view]
+        if kwargs.get('flagged_only'):
+            kwargs['fraud_registry'] = backend.fraud_registry
+        with backend.lock.read_lock():
+            return registry.query(**kwargs)
+
+
+# Example usage
+if __name__ == "__main__":
+    from fraudguard_app.data.data_generator import generate_transaction_stream
+
+    backend = ScoringBackend()
+    for tx in generate_transaction_stream(20):
+        backend.process_transaction(tx)
+
+    view = backend.view()
+    print("Summary:", view.summary())
+    print("Recent alerts:", view.alerts(last=3))
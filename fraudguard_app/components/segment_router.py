@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from fraudguard_app.components.feature_encoder import FEATURE_COLUMNS, CATEGORY_MAP
+from fraudguard_app.components.latency_stats import LatencyStats
+from fraudguard_app.components.compact_forest import export_compact_forest
+from fraudguard_app.components.model_backends import ModelBackend, IsolationForestBackend, CompactForestBackend
+
+# Segmentations: feature column, and bin edges (None for a column that is
+# already a small integer code)
+SEGMENTATIONS = {
+    'category': ('category_encoded', None),
+    'merchant_tier': ('merchant_risk_score', (0.2, 0.5)),
+    'amount_band': ('amount', (50.0, 500.0, 5000.0)),
+}
+# Segments with fewer training rows than this are scored by the fallback model
+MIN_SEGMENT_ROWS = 100
+# Segment models kept in memory when they are loaded from model_dir
+MAX_RESIDENT_MODELS = 4
+
+_CATEGORY_NAMES = {code: name for name, code in CATEGORY_MAP.items()}
+
+
+def segment_keys(X, segment_by):
+    """
+    Map encoded feature rows to integer segment keys
+
+    Args:
+        X (numpy.ndarray): Encoded features, FEATURE_COLUMNS first
+        segment_by (str): Key of SEGMENTATIONS
+
+    Returns:
+        numpy.ndarray: int64 segment key per row
+    """
+    column, edges = SEGMENTATIONS[segment_by]
+    values = np.asarray(X)[:, FEATURE_COLUMNS.index(column)]
+    if edges is None:
+        return values.astype(np.int64)
+    return np.searchsorted(edges, values, side='right').astype(np.int64)
+
+
+def segment_name(segment_by, key):
+    """Readable name of a segment key, e.g. 'travel' or 'amount_band_2'"""
+    if segment_by == 'category' and key in _CATEGORY_NAMES:
+        return _CATEGORY_NAMES[key]
+    return f"{segment_by}_{key}"
+
+
+class SegmentRouter(ModelBackend):
+    name = 'segment_router'
+
+    def __init__(self, segment_by='category', factory=IsolationForestBackend, min_rows=MIN_SEGMENT_ROWS,
+                 model_dir=None, max_resident=MAX_RESIDENT_MODELS, compact=False):
+        """
+        Initialize a backend scoring each segment of traffic with its own model
+
+        A batch is grouped by segment with a stable argsort, each segment
+        model scores its rows in one call, and the scores are scattered
+        back into the original row order. Segment models' scores are
+        standardized (see ModelBackend.standardized), so one threshold
+        applies across segments. A fallback model fitted on all rows
+        scores segments that had too little training data.
+
+        With a model_dir, fitted segment models are saved there and loaded
+        on first use, keeping at most max_resident in memory (least
+        recently used are evicted); pickling the router then leaves them
+        out. Without one, every segment model stays in memory.
+
+        sklearn's per-call overhead grows with the number of segments in a
+        batch; with compact=True, fitted IsolationForests are exported to
+        CompactForestBackend, whose calls cost little more than the rows.
+
+        Args:
+            segment_by (str): Key of SEGMENTATIONS
+            factory (callable): Returns an unfitted ModelBackend per segment
+            min_rows (int): Training rows a segment needs for its own model
+            model_dir (str): Directory for segment model files
+            max_resident (int): Segment models kept in memory with a model_dir
+            compact (bool): Score with compact exports of fitted IsolationForests
+        """
+        super().__init__()
+        if segment_by not in SEGMENTATIONS:
+            raise ValueError(f"Unknown segmentation '{segment_by}'; expected one of {sorted(SEGMENTATIONS)}")
+        self.segment_by = segment_by
+        self.factory = factory
+        self.min_rows = min_rows
+        self.model_dir = model_dir
+        self.max_resident = max_resident
+        self.compact = compact
+        self.fallback = None
+        self.segments = []
+        self.latency = {}
+        self._lock = threading.Lock()
+        self._reset_models()
+
+    def _reset_models(self):
+        self._resident = OrderedDict()
+        self.loads = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.model_dir, f"{self.segment_by}_{key}.joblib")
+
+    def _fitted_model(self, X, y):
+        model = self.factory().fit(X, y)
+        if not self.compact or model.name != IsolationForestBackend.name:
+            return model
+        compact = CompactForestBackend(export_compact_forest(model.model, scaler=model.scaler))
+        compact.threshold, compact.scale, compact.calibrated = model.threshold, model.scale, True
+        return compact
+
+    def _fit(self, X, y):
+        keys = segment_keys(X, self.segment_by)
+        self.fallback = self._fitted_model(X, y)
+        self._reset_models()
+        self.segments = []
+        if self.model_dir:
+            os.makedirs(self.model_dir, exist_ok=True)
+        for key in np.unique(keys).tolist():
+            rows = keys == key
+            if np.count_nonzero(rows) < self.min_rows:
+                continue
+            model = self._fitted_model(X[rows], None if y is None else np.asarray(y)[rows])
+            if self.model_dir:
+                model.save(self._path(key))
+            else:
+                self._resident[key] = model
+            self.segments.append(key)
+        self.latency = {segment_name(self.segment_by, key): LatencyStats() for key in self.segments}
+        self.latency['fallback'] = LatencyStats()
+
+    def model_for(self, key):
+        """
+        Get the model scoring a segment, loading it if needed
+
+        Args:
+            key (int): Segment key from segment_keys
+
+        Returns:
+            ModelBackend: The segment's model, or the fallback
+        """
+        if key not in self.segments:
+            return self.fallback
+        with self._lock:
+            model = self._resident.get(key)
+            if model is not None:
+                self._resident.move_to_end(key)
+                return model
+            model = ModelBackend.load(self._path(key))
+            self.loads += 1
+            self._resident[key] = model
+            while len(self._resident) > self.max_resident:
+                self._resident.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def decision_function(self, X):
+        """
+        Score a batch, one model call per segment present, recording each segment's latency
+
+        Args:
+            X (numpy.ndarray): Encoded features
+
+        Returns:
+            numpy.ndarray: Standardized decision scores in the rows' order
+        """
+        if not self.fitted:
+            raise Exception(f"{self.name} backend is not trained yet!")
+        return self._route(np.asarray(X), record=True)
+
+    def _decision(self, X):
+        return self._route(X, record=False)
+
+    def _route(self, X, record):
+        scores = np.empty(len(X))
+        if not len(X):
+            return scores
+        keys = segment_keys(X, self.segment_by)
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        for start, stop in zip(starts.tolist(), starts[1:].tolist() + [len(X)]):
+            key = int(sorted_keys[start])
+            rows = order[start:stop]
+            began = time.perf_counter()
+            model = self.model_for(key)
+            scores[rows] = model.standardized(X[rows])
+            if record:
+                name = segment_name(self.segment_by, key) if model is not self.fallback else 'fallback'
+                self.latency[name].record(time.perf_counter() - began, len(rows))
+        return scores
+
+    def stats(self):
+        """
+        Get segment model residency counters
+
+        Returns:
+            dict: segments with their own model, resident models, loads and
+                evictions
+        """
+        with self._lock:
+            return {
+                'segments': [segment_name(self.segment_by, key) for key in self.segments],
+                'resident': [segment_name(self.segment_by, key) for key in self._resident],
+                'loads': self.loads,
+                'evictions': self.evictions,
+            }
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        if self.model_dir:
+            # Segment models are reloaded from model_dir on demand
+            state['_resident'] = OrderedDict()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+
+# Example usage
+if __name__ == "__main__":
+    import tempfile
+    from fraudguard_app.components.fraud_detector import FraudDetector
+    from fraudguard_app.data.data_generator import generate_transaction_stream
+
+    router = SegmentRouter('category', model_dir=tempfile.mkdtemp(), max_resident=2, compact=True)
+    detector = FraudDetector(backend=router)
+    is_fraud, risk_scores = detector.predict_batch(generate_transaction_stream(1000))
+    print(f"Flagged {is_fraud.sum()} of 1000 transactions")
+    print(router.stats())
+    for name, stats in detector.backend_stats()['champion']['members'].items():
+        print(f"  {name:<14} {stats['rows']:>5} rows")
@@ -1,7 +1,9 @@
 import random
 import uuid
 from datetime import datetime, timedelta
-import pandas as pd
+
+# Accounts in the simulated customer base; each stream transaction belongs to one
+NUM_ACCOUNTS = 1000
 
 def generate_transaction_stream(num_transactions=10):
     """
@@ -49,9 +51,13 @@ def generate_transaction_stream(num_transactions=10):
         # Previous transactions (random between 0 and 100)
         previous_transactions = random.randint(0, 100)
         
+        # Paying account
+        account_id = f"ACC{random.randint(1, NUM_ACCOUNTS):05d}"
+        
         # Create transaction dictionary
         transaction = {
             "transaction_id": tx_id,
+            "account_id": account_id,
             "amount": amount,
             "merchant": merchant,
             "category": category,
@@ -123,6 +129,8 @@ def generate_sample_dataset(num_records=10000):
         
         data.append(record)
     
+    # Imported here so streaming callers do not pay for pandas
+    import pandas as pd
     return pd.DataFrame(data)
 
 # Example usage
@@ -0,0 +1,98 @@
+import io
+import json
+import os
+import sys
+
+# File extension -> input format
+INPUT_FORMATS = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl',
+                 '.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet'}
+
+
+def _read_jsonl(stream):
+    """Yield one transaction dict per non-empty JSON line"""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def batches(iterable, size):
+    """Yield lists of up to size items"""
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _open(path, mode):
+    """Open a file, or stdin/stdout for '-'"""
+    if path == '-':
+        return sys.stdin if 'r' in mode else sys.stdout
+    return open(path, mode)
+
+
+def read_chunks(path, chunk_size, input_format=None):
+    """
+    Read transactions in chunks from CSV, Parquet or JSON lines
+
+    Args:
+        path (str): Input file, '-' for stdin
+        chunk_size (int): Transactions per chunk
+        input_format (str): 'jsonl', 'csv' or 'parquet'; from the file
+            extension if omitted, JSON lines for stdin
+
+    Yields:
+        list: Transaction dicts
+    """
+    if input_format is None:
+        input_format = INPUT_FORMATS.get(os.path.splitext(path)[1].lower(), 'jsonl')
+    if input_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("pyarrow is required to read Parquet input")
+        # Parquet needs a seekable file, so stdin is read into memory
+        source = io.BytesIO(sys.stdin.buffer.read()) if path == '-' else path
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+
+    source = _open(path, 'r')
+    try:
+        if input_format == 'csv':
+            import pandas as pd
+
+            for frame in pd.read_csv(source, chunksize=chunk_size):
+                yield frame.to_dict('records')
+        else:
+            yield from batches(_read_jsonl(source), chunk_size)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+def read_transactions(path, input_format=None):
+    """
+    Read a whole transaction file
+
+    Args:
+        path (str): Input file, '-' for stdin
+        input_format (str): 'jsonl', 'csv' or 'parquet'; from the file
+            extension if omitted
+
+    Returns:
+        list: Transaction dicts in file order
+    """
+    return [tx for chunk in read_chunks(path, 10_000, input_format) for tx in chunk]
+
+
+# Example usage
+if __name__ == "__main__":
+    transactions = read_transactions(os.path.join(os.path.dirname(__file__), '..', '..',
+                                                  'datasets', 'sample_transactions.csv'))
+    print(f"Read {len(transactions)} transactions")
+    print(transactions[0])
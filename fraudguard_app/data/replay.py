@@ -0,0 +1,183 @@
+import hashlib
+import os
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from fraudguard_app.components.scoring_backend import ScoringBackend, STAGES
+from fraudguard_app.data.readers import read_transactions
+
+SAMPLE_RECORDING = os.path.join(os.path.dirname(__file__), '..', '..', 'datasets', 'sample_transactions.csv')
+
+# Percentiles reported for every stage
+PERCENTILES = (50, 90, 99)
+
+
+def _parse_timestamp(value):
+    """Recorded timestamp as a datetime, None if missing or unparseable"""
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def amplified_batches(transactions, factor=1, batch_size=500):
+    """
+    Replay a recording factor times, in batches
+
+    Copy 0 is the recording itself. Copy k > 0 rewrites transaction_id to
+    "<id>-<k>" and shifts timestamps by k times the recording's time span,
+    so the copies follow each other in event time. Copies are made one
+    batch at a time.
+
+    Args:
+        transactions (list): Recorded transaction dicts, in replay order
+        factor (int): Number of copies
+        batch_size (int): Transactions per batch
+
+    Yields:
+        list: Transaction dicts
+    """
+    timestamps = [_parse_timestamp(tx.get('timestamp')) for tx in transactions]
+    known = [timestamp for timestamp in timestamps if timestamp is not None]
+    span = (max(known) - min(known) + timedelta(seconds=1)) if known else timedelta(0)
+    for copy in range(factor):
+        shift = span * copy
+        for start in range(0, len(transactions), batch_size):
+            batch = []
+            for tx, timestamp in zip(transactions[start:start + batch_size],
+                                     timestamps[start:start + batch_size]):
+                tx = dict(tx)
+                if copy:
+                    tx['transaction_id'] = f"{tx['transaction_id']}-{copy}"
+                if timestamp is not None:
+                    tx['timestamp'] = timestamp + shift
+                batch.append(tx)
+            yield batch
+
+
+def _latency_summary(seconds):
+    """Percentiles, max and total of per-batch durations"""
+    seconds = np.asarray(seconds)
+    if not len(seconds):
+        return {}
+    summary = {f'p{p}_ms': float(value) * 1000
+               for p, value in zip(PERCENTILES, np.percentile(seconds, PERCENTILES))}
+    summary['max_ms'] = float(seconds.max()) * 1000
+    summary['total_s'] = float(seconds.sum())
+    return summary
+
+
+def replay(transactions, backend=None, factor=1, batch_size=500, rate=None, seed=0,
+           enable_blockchain=True, sketch=None):
+    """
+    Drive recorded transactions through scoring and the registries
+
+    Batches go through ScoringBackend.process_batch, the dashboard's
+    production path, stamped with their recorded timestamps. With a rate,
+    batch i starts no earlier than (rows before it) / rate seconds in; a
+    batch that starts late records its schedule lag. Without one, batches
+    run back to back.
+
+    The replay is deterministic: batch order, transaction ids and
+    timestamps depend only on the inputs, and the detector's score sketch
+    is reseeded, so the digest of (transaction_id, is_fraud, risk_score)
+    is the same on every run of the same code, model and starting sketch,
+    whatever the rate. The flag thresholds come from that sketch, which
+    the dashboard's "Save Snapshot" overwrites in models/; pass a recorded
+    sketch to compare runs across such saves.
+
+    Args:
+        transactions (list): Recorded transaction dicts
+        backend (ScoringBackend): Backend to drive, a new one if omitted.
+            Its state is what the replay builds on, so pass a fresh one to
+            compare runs
+        factor (int): Amplification, see amplified_batches
+        batch_size (int): Transactions per batch
+        rate (float): Target transactions per second, unthrottled if None
+        seed (int): Seed for the score sketch
+        enable_blockchain (bool): Also write the blockchain registries
+        sketch (str): Score sketch .npz (see FraudDetector.save_score_sketch)
+            to start from, the detector's current sketch if omitted
+
+    Returns:
+        dict: rows (scored), duplicates (skipped by the backend's duplicate
+            filter), batches, flagged, seconds, rows_per_s, target_rate,
+            digest, and per-stage latency summaries under 'stages'
+            (STAGES plus 'prepare', 'total' and 'lag')
+    """
+    backend = backend if backend is not None else ScoringBackend()
+    if sketch is not None:
+        backend.detector.load_score_sketch(sketch)
+    backend.detector.score_sketch.reseed(seed)
+    stages = {name: [] for name in ('prepare',) + STAGES + ('total', 'lag')}
+    digest = hashlib.sha256()
+    rows = flagged = duplicates = 0
+
+    batches = amplified_batches(transactions, factor, batch_size)
+    start = time.perf_counter()
+    while True:
+        prepare_start = time.perf_counter()
+        batch = next(batches, None)
+        if batch is None:
+            break
+        stages['prepare'].append(time.perf_counter() - prepare_start)
+        if rate:
+            due = start + rows / rate
+            now = time.perf_counter()
+            if now < due:
+                time.sleep(due - now)
+            stages['lag'].append(max(0.0, now - due))
+        batch_start = time.perf_counter()
+        timings = {}
+        records = backend.process_batch(batch, enable_blockchain, timings=timings, use_event_time=True)
+        stages['total'].append(time.perf_counter() - batch_start)
+        for name in STAGES:
+            stages[name].append(timings[name])
+
+        digest.update("".join(f"{record['transaction_id']},{record['is_fraud']:d},"
+                              f"{record['risk_score']:.6f}\n" for record in records).encode())
+        rows += len(records)
+        duplicates += len(batch) - len(records)
+        flagged += sum(record['is_fraud'] for record in records)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'rows': rows,
+        'duplicates': duplicates,
+        'batches': len(stages['total']),
+        'flagged': flagged,
+        'seconds': elapsed,
+        'rows_per_s': rows / elapsed if elapsed else 0.0,
+        'target_rate': rate,
+        'digest': digest.hexdigest(),
+        'stages': {name: _latency_summary(seconds) for name, seconds in stages.items()},
+    }
+
+
+def replay_file(path=SAMPLE_RECORDING, input_format=None, **options):
+    """
+    Replay a recorded transaction file
+
+    Args:
+        path (str): CSV, Parquet or JSON-lines recording
+        input_format (str): Format, from the file extension if omitted
+        **options: Passed to replay()
+
+    Returns:
+        dict: The replay report
+    """
+    return replay(read_transactions(path, input_format), **options)
+
+
+# Example usage
+if __name__ == "__main__":
+    report = replay_file(factor=2, batch_size=500)
+    print(f"Replayed {report['rows']:,} transactions at {report['rows_per_s']:,.0f}/s, "
+          f"{report['flagged']:,} flagged, digest {report['digest'][:16]}")
+    for name, summary in report['stages'].items():
+        if summary:
+            print(f"  {name:<8} p50 {summary['p50_ms']:7.2f} ms  p99 {summary['p99_ms']:7.2f} ms")
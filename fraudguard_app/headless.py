@@ -0,0 +1,89 @@
+from fraudguard_app.components.compact_forest import CompactForest
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.model_backends import CompactForestBackend, ModelBackend
+from fraudguard_app.components.risk_rules import DEFAULT_RULES_PATH
+
+# Keep this module light: it is the import path of scoring workers and the
+# CLI, so only NumPy-backed components are imported at module load
+
+
+def load_model(path):
+    """
+    Load a model backend from a file
+
+    Args:
+        path (str): Compact export (.npz) or a backend saved with ModelBackend.save()
+
+    Returns:
+        ModelBackend: The backend
+    """
+    if path.endswith('.npz'):
+        return CompactForestBackend(CompactForest.load(path))
+    return ModelBackend.load(path)
+
+
+def load_detector(rules_path=DEFAULT_RULES_PATH, sensitivity=0.5, compact=True, model_path=None):
+    """
+    Load a detector for headless scoring
+
+    With compact=True the detector scores with the NumPy-only compact
+    export in models/. If only the pickled model is current, it is loaded
+    with sklearn once and exported, so later runs skip sklearn.
+
+    Args:
+        rules_path (str): JSON/YAML rule table for risk score adjustments
+        sensitivity (float): Sensitivity in [0, 1]
+        compact (bool): Prefer the compact model
+        model_path (str): Score with this model file instead of models/;
+            its thresholds are calibrated on the sample data
+
+    Returns:
+        FraudDetector: The detector
+    """
+    if model_path is not None:
+        detector = FraudDetector(rules_path, backend=load_model(model_path))
+        detector.set_sensitivity(sensitivity)
+        return detector
+    detector = FraudDetector(rules_path, prefer_compact=compact)
+    if compact and detector.model is not None:
+        detector.export_compact()
+    detector.set_sensitivity(sensitivity)
+    return detector
+
+
+def score_records(transactions, detector):
+    """
+    Score a batch of transactions into plain result records
+
+    Args:
+        transactions (list): Transaction dicts
+        detector (FraudDetector): Detector from load_detector
+
+    Returns:
+        list: One dict per transaction with transaction_id, is_fraud,
+            risk_score, decision_score and reasons (fired risk rules)
+    """
+    if not transactions:
+        return []
+    # Decode with the rules that produced the bitmask, even if they are reloaded meanwhile
+    ruleset = detector.rules.ruleset
+    is_fraud, risk_scores, fired_rules, decision_scores = detector.score_batch(transactions, ruleset=ruleset)
+    return [{
+        'transaction_id': tx.get('transaction_id'),
+        'is_fraud': fraud,
+        'risk_score': risk_score,
+        'decision_score': decision_score,
+        'reasons': ruleset.reasons(bits),
+    } for tx, fraud, risk_score, decision_score, bits
+        in zip(transactions, is_fraud.tolist(), risk_scores.tolist(), decision_scores.tolist(),
+               fired_rules)]
+
+
+# Example usage
+if __name__ == "__main__":
+    from fraudguard_app.data.data_generator import generate_transaction_stream
+
+    detector = load_detector()
+    print(f"Scoring with the {detector.backend.name} backend")
+    for record in score_records(generate_transaction_stream(3), detector):
+        print(record)
@@ -4,12 +4,31 @@ import os
 import pandas as pd
 import numpy as np
 
-# Add the components directory to the path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'fraudguard_app', 'components'))
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'fraudguard_app', 'blockchain_sim'))
+# Add the repository root to the path so the package imports resolve
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
 
-from fraud_detector import FraudDetector
-from registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail
+from fraudguard_app.components.fraud_detector import FraudDetector
+from fraudguard_app.components.feature_encoder import FeatureEncoder, FEATURE_COLUMNS
+from fraudguard_app.components.risk_rules import RiskRuleEngine, RuleSet, RuleError
+from fraudguard_app.components.quantile_sketch import KLLSketch
+from fraudguard_app.components.drift_monitor import DriftMonitor
+from fraudguard_app.components.explainer import PathAttribution
+from fraudguard_app.components.compact_forest import CompactForest, export_compact_forest
+from fraudguard_app.components.entity_graph import EntityGraph, ACCOUNT, MERCHANT
+from fraudguard_app.components.rollup_store import RollupStore, lttb
+from fraudguard_app.components.alert_bus import AlertBus, FileSink, HttpSink, CallableSink
+from fraudguard_app.components.segment_router import SegmentRouter, segment_keys
+from fraudguard_app.components.dedup import DuplicateFilter
+from fraudguard_app.components.model_backends import (
+    ModelBackend, EnsembleBackend, IsolationForestBackend, HistGradientBoostingBackend,
+    LocalOutlierFactorBackend, ShadowScorer, create_backend
+)
+from fraudguard_app.blockchain_sim.registry import RiskScoreRegistry, FraudFlagRegistry, AuditTrail, consistent_snapshot
+from fraudguard_app.blockchain_sim.snapshot import save_snapshot, load_snapshot
+from fraudguard_app.blockchain_sim.sharded_registry import ShardedRegistryService, HashRing
+from fraudguard_app.components.scoring_backend import ScoringBackend
+from fraudguard_app.data.data_generator import generate_transaction_stream
+from fraudguard_app.data.replay import amplified_batches, replay
 
 class TestFraudDetector(unittest.TestCase):
     def setUp(self):
@@ -59,6 +78,1066 @@ class TestFraudDetector(unittest.TestCase):
         self.assertIsInstance(is_fraud, bool)
         self.assertIsInstance(risk_score, float)
 
+    def test_predict_batch_matches_predict(self):
+        """Test that batch prediction agrees with single predictions."""
+        transactions = generate_transaction_stream(50)
+        is_fraud, risk_scores = self.detector.predict_batch(transactions)
+
+        self.assertEqual(len(is_fraud), 50)
+        for i, tx in enumerate(transactions):
+            single_fraud, single_risk = self.detector.predict(tx)
+            self.assertEqual(single_fraud, bool(is_fraud[i]))
+            self.assertAlmostEqual(single_risk, float(risk_scores[i]))
+
+    def test_sensitivity_threshold(self):
+        """Test that sensitivity maps to a calibrated decision score threshold."""
+        X = self.detector.encoder.encode(self.detector._generate_sample_data(2000))
+        training_scores = self.detector.model.decision_function(self.detector.scaler.transform(X))
+
+        # Sensitivity 0.5 reproduces the training contamination of 10%
+        flagged = np.mean(training_scores < self.detector.threshold_for(0.5))
+        self.assertAlmostEqual(flagged, 0.1, delta=0.02)
+        thresholds = [self.detector.threshold_for(s) for s in (0.0, 0.25, 0.5, 0.75, 1.0)]
+        self.assertEqual(thresholds, sorted(thresholds))
+
+        transactions = generate_transaction_stream(30)
+        self.detector.set_sensitivity(0.8)
+        is_fraud, _, _, decision_scores = self.detector.score_batch(transactions)
+        np.testing.assert_array_equal(is_fraud, decision_scores < self.detector.threshold_for(0.8))
+        np.testing.assert_array_equal(self.detector.rethreshold(decision_scores, 0.2),
+                                      decision_scores < self.detector.threshold_for(0.2))
+
+    def test_explain(self):
+        """Test per-feature attributions for flagged transactions."""
+        transactions = generate_transaction_stream(20)
+        explanations = self.detector.explain(transactions, top_k=2)
+
+        self.assertEqual(len(explanations), 20)
+        for top in explanations:
+            self.assertEqual(len(top), 2)
+            self.assertTrue(all(name in FEATURE_COLUMNS for name, _ in top))
+            self.assertGreaterEqual(top[0][1], top[1][1])
+
+class TestPathAttribution(unittest.TestCase):
+    def test_credits_isolating_feature(self):
+        """Test that an outlier in one feature credits that feature."""
+        from sklearn.ensemble import IsolationForest
+
+        X = np.random.default_rng(0).normal(size=(2000, 3))
+        model = IsolationForest(random_state=42).fit(X)
+        attribution = PathAttribution(model, ['a', 'b', 'c'])
+
+        outliers = np.array([[8.0, 0.0, 0.0], [0.0, 0.0, -8.0]])
+        contributions = attribution.contributions(outliers)
+        np.testing.assert_allclose(contributions.sum(axis=1), 1.0)
+        self.assertEqual(attribution.top_features(outliers, top_k=1)[0][0][0], 'a')
+        self.assertEqual(attribution.top_features(outliers, top_k=1)[1][0][0], 'c')
+
+    def test_matches_decision_path(self):
+        """Test the flattened forest walk against sklearn's decision_path."""
+        from sklearn.ensemble import IsolationForest
+
+        rng = np.random.default_rng(1)
+        model = IsolationForest(n_estimators=10, max_features=0.5, random_state=0).fit(
+            rng.normal(size=(500, 4)))
+        X = rng.normal(size=(30, 4)).astype(np.float32)
+
+        expected = np.zeros((30, 4))
+        for tree, features in zip(model.estimators_, model.estimators_features_):
+            structure = tree.tree_
+            paths = tree.decision_path(X[:, features])
+            depths = paths.sum(axis=1).A1 - 1
+            for row in range(30):
+                nodes = paths.indices[paths.indptr[row]:paths.indptr[row + 1]]
+                for depth, node in enumerate(sorted(nodes)[:-1]):
+                    expected[row, features[structure.feature[node]]] += 1 / (depth + 1) / depths[row]
+        expected /= expected.sum(axis=1, keepdims=True)
+        np.testing.assert_allclose(PathAttribution(model, list('abcd')).contributions(X), expected)
+
+class TestModelBackends(unittest.TestCase):
+    def setUp(self):
+        """Build a small labelled dataset with sparse, separable outliers."""
+        rng = np.random.default_rng(0)
+        directions = rng.normal(size=(50, 4))
+        outliers = directions / np.linalg.norm(directions, axis=1, keepdims=True) * rng.uniform(6, 12, (50, 1))
+        self.X = np.vstack([rng.normal(size=(450, 4)), outliers])
+        self.y = np.r_[np.zeros(450), np.ones(50)]
+
+    def test_backends_and_ensemble(self):
+        """Test that every backend and their ensemble flag the outliers."""
+        members = [IsolationForestBackend(), HistGradientBoostingBackend(), LocalOutlierFactorBackend()]
+        ensemble = EnsembleBackend(members, weights=[2, 1, 1]).fit(self.X, self.y)
+        for backend in members + [ensemble]:
+            flags = backend.decision_function(self.X) < backend.threshold
+            self.assertGreater(flags[450:].mean(), 0.9, backend.name)
+        self.assertEqual(ensemble.latency['isolation_forest'].summary()['batches'], 1)
+
+        with self.assertRaises(ValueError):
+            HistGradientBoostingBackend().fit(self.X)
+        with self.assertRaises(ValueError):
+            create_backend('unknown')
+
+    def test_prefitted_ensemble_member(self):
+        """Test that wrapped pre-fitted forests join an ensemble only with a calibrated scale."""
+        fitted = IsolationForestBackend().fit(self.X)
+        with self.assertRaises(ValueError):
+            EnsembleBackend([IsolationForestBackend(model=fitted.model, scaler=fitted.scaler)])
+
+        wrapped = IsolationForestBackend(model=fitted.model, scaler=fitted.scaler, calibration=self.X)
+        self.assertEqual(wrapped.threshold, 0.0)
+        self.assertAlmostEqual(wrapped.scale, fitted.scale)
+        ensemble = EnsembleBackend([wrapped, LocalOutlierFactorBackend()]).fit(self.X)
+        self.assertIs(wrapped.model, fitted.model)
+        flags = ensemble.decision_function(self.X) < ensemble.threshold
+        self.assertGreater(flags[450:].mean(), 0.9)
+
+    def test_shadow_scorer(self):
+        """Test shadow agreement statistics and dropping when the challenger lags."""
+        champion = IsolationForestBackend().fit(self.X)
+        champion_scores = champion.decision_function(self.X)
+        shadow = ShadowScorer(IsolationForestBackend(random_state=1).fit(self.X))
+        shadow.submit(self.X, champion_scores, champion_scores < champion.threshold)
+        shadow.close()
+        stats = shadow.stats()
+        self.assertEqual((stats['rows'], stats['dropped_rows'], stats['errors']), (500, 0, 0))
+        self.assertGreater(stats['agreement'], 0.9)
+        self.assertGreater(stats['score_correlation'], 0.9)
+
+        import threading
+        release = threading.Event()
+
+        class Blocked(ModelBackend):
+            name = 'blocked'
+
+            def _decision(self, X):
+                release.wait()
+                return np.zeros(len(X))
+
+        challenger = Blocked()
+        challenger.fitted = True
+        shadow = ShadowScorer(challenger, max_queue=1)
+        queued = [shadow.submit(self.X[:10], np.zeros(10), np.zeros(10, dtype=bool))
+                  for _ in range(5)]
+        release.set()
+        shadow.close()
+        self.assertFalse(all(queued))
+        stats = shadow.stats()
+        self.assertEqual(stats['rows'] + stats['dropped_rows'], 50)
+        self.assertGreater(stats['dropped_rows'], 0)
+
+    def test_detector_with_backend(self):
+        """Test a detector with a custom champion and a shadow challenger."""
+        detector = FraudDetector(backend=EnsembleBackend([IsolationForestBackend(),
+                                                          HistGradientBoostingBackend()]))
+        detector.start_shadow(create_backend('local_outlier_factor'))
+        transactions = generate_transaction_stream(50)
+        is_fraud, risk_scores, _, _ = detector.score_batch(transactions)
+        self.assertEqual(len(detector.explain(transactions[:2])[0]), 3)
+        detector.shadow.drain()
+        stats = detector.backend_stats()
+        detector.stop_shadow()
+        self.assertEqual(stats['champion']['backend'], 'ensemble')
+        self.assertEqual(stats['champion']['latency']['rows'], 50)
+        self.assertEqual(set(stats['champion']['members']), {'isolation_forest', 'hist_gradient_boosting'})
+        self.assertEqual(stats['shadow']['rows'], 50)
+        self.assertIsNone(detector.backend_stats()['shadow'])
+
+class TestSegmentRouter(unittest.TestCase):
+    def setUp(self):
+        """Encode sample training data and a shuffled live batch."""
+        from functools import partial
+        self.factory = partial(IsolationForestBackend, n_estimators=20)
+        detector = FraudDetector(prefer_compact=True)
+        training = detector._generate_sample_data(2000)
+        self.X = detector.encoder.encode(training)
+        self.y = training['is_fraud'].to_numpy()
+        self.live = detector.encoder.encode(generate_transaction_stream(300))
+
+    def test_grouped_dispatch_matches_per_row_routing(self):
+        """Test that grouped scores equal each row scored by its own segment model, in input order."""
+        router = SegmentRouter('amount_band', factory=self.factory).fit(self.X, self.y)
+        keys = segment_keys(self.live, 'amount_band')
+        expected = np.array([router.model_for(int(key)).standardized(row[None])[0]
+                             for key, row in zip(keys, self.live)])
+        np.testing.assert_allclose(router.decision_function(self.live), expected)
+        # The sparse top band has no model of its own and falls back to the global one
+        self.assertNotIn(3, router.segments)
+        self.assertIs(router.model_for(3), router.fallback)
+        self.assertEqual(sum(stats.summary()['rows'] for stats in router.latency.values()), 300)
+        self.assertEqual(len(router.decision_function(self.live[:0])), 0)
+        with self.assertRaises(ValueError):
+            SegmentRouter('weekday')
+
+        # Compact exports of the same segment forests score the same
+        compact = SegmentRouter('amount_band', factory=self.factory, compact=True).fit(self.X, self.y)
+        self.assertEqual(compact.fallback.name, 'compact_forest')
+        np.testing.assert_allclose(compact.decision_function(self.live), expected, atol=1e-6)
+
+    def test_lazy_loading_with_lru_bound(self):
+        """Test that segment models load on demand, at most max_resident at a time, and survive pickling."""
+        import tempfile
+
+        directory = tempfile.mkdtemp()
+        router = SegmentRouter('category', factory=self.factory, model_dir=directory,
+                               max_resident=2).fit(self.X, self.y)
+        self.assertEqual(len(os.listdir(directory)), 5)
+        scores = router.decision_function(self.live)
+        stats = router.stats()
+        self.assertEqual(len(stats['resident']), 2)
+        self.assertEqual(stats['loads'] - stats['evictions'], 2)
+
+        # The last segments used stay resident; using one again needs no load
+        resident = stats['resident']
+        router.decision_function(self.live[segment_keys(self.live, 'category') == 5])
+        self.assertEqual(router.stats()['loads'], stats['loads'])
+        self.assertEqual(resident[-1], 'utilities')
+
+        path = os.path.join(directory, "router.joblib")
+        router.save(path)
+        restored = ModelBackend.load(path)
+        self.assertEqual(restored.stats()['resident'], [])
+        np.testing.assert_allclose(restored.decision_function(self.live), scores)
+
+        detector = FraudDetector(backend=restored)
+        is_fraud, _ = detector.predict_batch(generate_transaction_stream(50))
+        self.assertEqual(len(is_fraud), 50)
+        self.assertIn('travel', detector.backend_stats()['champion']['members'])
+
+class TestEntityGraph(unittest.TestCase):
+    def test_components_and_neighbours(self):
+        """Test component sizes and flagged-neighbour fractions on a small graph."""
+        graph = EntityGraph()
+        graph.add_transactions(['a1', 'a2', 'a3', 'a4'], ['m1', 'm1', 'm2', 'm3'],
+                               flagged=[True, False, False, False])
+        graph.add_transactions(['a3', 'a3'], ['m3', 'm3'])
+
+        features = graph.account_features(['a1', 'a2', 'a3', 'unknown'])
+        np.testing.assert_array_equal(features['component_size'], [3, 3, 4, 0])
+        np.testing.assert_array_equal(features['flagged_neighbor_fraction'], [1.0, 1.0, 0.0, 0.0])
+        stats = graph.stats()
+        self.assertEqual((stats['edges'], stats['components'], stats['transactions']), (5, 2, 6))
+
+        graph.clear()
+        self.assertEqual(graph.stats()['accounts'], 0)
+
+    def test_matches_connected_components(self):
+        """Test batched updates against scipy's connected components."""
+        import scipy.sparse
+        from scipy.sparse.csgraph import connected_components
+
+        rng = np.random.default_rng(0)
+        graph = EntityGraph(capacity=16)
+        accounts = graph.node_ids(ACCOUNT, range(3000))
+        merchants = graph.node_ids(MERCHANT, range(2000))
+        left = accounts[rng.integers(0, 3000, 40_000)]
+        right = merchants[rng.integers(0, 2000, 40_000)]
+        flagged = rng.random(40_000) < 0.001
+        for start in range(0, 40_000, 5000):
+            end = start + 5000
+            graph.add_edges(left[start:end], right[start:end], flagged[start:end])
+
+        adjacency = scipy.sparse.coo_matrix((np.ones(len(left)), (left, right)), shape=(5000, 5000))
+        num_components, labels = connected_components(adjacency, directed=False)
+        self.assertEqual(graph.num_components, num_components)
+        np.testing.assert_array_equal(graph.component_size(np.arange(5000)),
+                                      np.bincount(labels)[labels])
+        self.assertEqual(graph.num_edges, len(set(zip(left.tolist(), right.tolist()))))
+
+        flagged_merchants = set(right[flagged].tolist())
+        fractions = graph.flagged_neighbor_fraction(accounts[:50])
+        for account, fraction in zip(accounts[:50], fractions):
+            neighbours = set(right[left == account].tolist())
+            self.assertEqual(set(graph.neighbors(account).tolist()), neighbours)
+            self.assertAlmostEqual(fraction, len(neighbours & flagged_merchants) / len(neighbours))
+
+    def test_union_by_size_and_clear(self):
+        """Test smaller components join larger ones, paths are compressed and clear() keeps the lock"""
+        graph = EntityGraph(capacity=4)
+        accounts = graph.node_ids(ACCOUNT, range(10))
+        merchants = graph.node_ids(MERCHANT, range(3))
+        graph.add_edges(accounts[:9], np.repeat(merchants[0], 9))
+        big_root = graph._find(merchants[:1])[0]
+        graph.add_edges(accounts[9:], merchants[1:2])
+        graph.add_edges(accounts[9:], merchants[:1])
+        self.assertEqual(graph._find(accounts[9:])[0], big_root)
+
+        graph.add_edges(merchants[2:], accounts[9:])
+        nodes = np.arange(graph.num_nodes)
+        graph._find(nodes)
+        np.testing.assert_array_equal(graph._parent[nodes], big_root)
+        self.assertEqual(graph.num_components, 1)
+
+        lock = graph._lock
+        graph.clear()
+        self.assertIs(graph._lock, lock)
+        self.assertEqual(graph.stats()['components'], 0)
+        graph.add_transactions(['a1', 'a2'], ['m1', 'm1'])
+        np.testing.assert_array_equal(graph.account_features(['a1'])['component_size'], [3])
+
+class TestCompactForest(unittest.TestCase):
+    def test_matches_isolation_forest(self):
+        """Test that a full export scores like sklearn, including feature subsampling and scaling."""
+        import tempfile
+        from sklearn.ensemble import IsolationForest
+        from sklearn.preprocessing import StandardScaler
+
+        rng = np.random.default_rng(0)
+        X = rng.lognormal(size=(1000, 5))
+        scaler = StandardScaler().fit(X)
+        model = IsolationForest(n_estimators=30, max_features=0.6, contamination=0.1,
+                                random_state=0).fit(scaler.transform(X))
+        X_test = np.vstack([X[:200], rng.lognormal(sigma=3, size=(200, 5))])
+        expected = model.decision_function(scaler.transform(X_test))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'forest.npz')
+            export_compact_forest(model, path, scaler=scaler)
+            forest = CompactForest.load(path)
+        np.testing.assert_allclose(forest.decision_function(X_test), expected, atol=1e-6)
+        np.testing.assert_array_equal(forest.decision_function(X_test) < 0, expected < 0)
+        self.assertEqual(forest.arrays['nodes'].dtype['left'], np.uint16)
+
+        pruned = export_compact_forest(model, scaler=scaler, n_estimators=10, max_depth=4)
+        self.assertEqual(pruned.n_estimators, 10)
+        self.assertLess(pruned.nbytes, forest.nbytes / 3)
+        self.assertGreater(np.corrcoef(pruned.decision_function(X_test), expected)[0, 1], 0.9)
+
+    def test_loads_without_sklearn(self):
+        """Test that loading and scoring an export never imports sklearn."""
+        import subprocess
+        import tempfile
+        from sklearn.ensemble import IsolationForest
+
+        model = IsolationForest(n_estimators=5, random_state=0).fit(np.random.default_rng(0).normal(size=(100, 3)))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'forest.npz')
+            export_compact_forest(model, path)
+            code = ("import sys; from fraudguard_app.components.compact_forest import CompactForest; "
+                    f"CompactForest.load({path!r}).decision_function([[0.0, 0.0, 0.0]]); "
+                    "assert 'sklearn' not in sys.modules")
+            root = os.path.join(os.path.dirname(__file__), '..', '..')
+            subprocess.run([sys.executable, '-c', code], check=True, cwd=root)
+
+class TestHeadlessScoring(unittest.TestCase):
+    def test_cli_scores_without_sklearn_or_pandas(self):
+        """Test that CLI scoring from the compact export matches the full model and skips sklearn and pandas."""
+        import json
+        import subprocess
+        import tempfile
+
+        root = os.path.join(os.path.dirname(__file__), '..', '..')
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'transactions.jsonl')
+            with open(source, 'w') as f:
+                for tx in generate_transaction_stream(50):
+                    tx['timestamp'] = tx['timestamp'].isoformat()
+                    f.write(json.dumps(tx) + "\n")
+
+            results = {}
+            for name, flags in (('full', ['--full-model']), ('compact', [])):
+                output = os.path.join(directory, f'{name}.jsonl')
+                subprocess.run([sys.executable, '-m', 'fraudguard_app', 'score', '-i', source, '-o', output]
+                               + flags, check=True, cwd=root, capture_output=True)
+                with open(output) as f:
+                    results[name] = [json.loads(line) for line in f]
+
+            # The full-model run leaves a current compact export behind
+            code = ("import sys; from fraudguard_app.cli import main; "
+                    f"main(['score', '-i', {source!r}, '-o', {os.devnull!r}]); "
+                    "assert 'sklearn' not in sys.modules and 'pandas' not in sys.modules")
+            subprocess.run([sys.executable, '-c', code], check=True, cwd=root, capture_output=True)
+
+        self.assertEqual(len(results['compact']), 50)
+        self.assertEqual([r['transaction_id'] for r in results['compact']],
+                         [r['transaction_id'] for r in results['full']])
+        np.testing.assert_allclose([r['decision_score'] for r in results['compact']],
+                                   [r['decision_score'] for r in results['full']], atol=1e-6)
+        self.assertEqual(set(results['compact'][0]),
+                         {'transaction_id', 'is_fraud', 'risk_score', 'decision_score', 'reasons'})
+
+    def test_cli_csv_workers_and_registry(self):
+        """Test CSV input scored by worker processes, in input order, with a registry snapshot."""
+        import json
+        import subprocess
+        import tempfile
+
+        transactions = generate_transaction_stream(60)
+        root = os.path.join(os.path.dirname(__file__), '..', '..')
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'transactions.csv')
+            pd.DataFrame(transactions).to_csv(source, index=False)
+            registry = os.path.join(directory, 'registry')
+            result = subprocess.run([sys.executable, '-m', 'fraudguard_app', 'score', '-i', source,
+                                     '--workers', '2', '--chunk-size', '25', '--registry', registry],
+                                    check=True, cwd=root, capture_output=True, text=True)
+            records = [json.loads(line) for line in result.stdout.splitlines()]
+            snapshot = load_snapshot(registry)
+
+            self.assertEqual([r['transaction_id'] for r in records],
+                             [tx['transaction_id'] for tx in transactions])
+            self.assertEqual(snapshot.num_rows('risk_scores'), 60)
+            self.assertEqual(snapshot.num_rows('audit_logs'), 60)
+            self.assertEqual(snapshot.num_rows('fraud_flags'), sum(r['is_fraud'] for r in records))
+        self.assertIn("rows/s", result.stderr)
+        self.assertIn("p99", result.stderr)
+
+class TestRollupStore(unittest.TestCase):
+    def test_tiers_match_brute_force(self):
+        """Test every tier's buckets against direct counts, and ring eviction of old buckets."""
+        rng = np.random.default_rng(0)
+        end = 1_700_000_000.0
+        seconds = np.sort(end - rng.uniform(0, 2 * 86400, 20_000))
+        is_fraud = rng.random(20_000) < 0.1
+        risk = rng.random(20_000)
+        store = RollupStore()
+        for batch in np.array_split(np.arange(20_000), 37):
+            store.add(seconds[batch], is_fraud[batch], risk[batch])
+
+        for window, tier in ((3000, '1s'), (86400, '1min'), (2 * 86400, '1h')):
+            series = store.query(end - window, end)
+            self.assertEqual(series['tier'], tier)
+            width = series['width']
+            in_range = seconds >= (end - window) // width * width
+            self.assertEqual(series['transactions'].sum(), in_range.sum())
+            self.assertEqual(series['frauds'].sum(), is_fraud[in_range].sum())
+            self.assertAlmostEqual(series['risk_sum'].sum(), risk[in_range].sum())
+            busiest = np.argmax(series['transactions'])
+            start = series['time'][busiest]
+            self.assertEqual(series['transactions'][busiest],
+                             ((seconds >= start) & (seconds < start + width)).sum())
+
+        # Seconds from two days ago were overwritten in the 1 s ring; late rows for them are dropped
+        oldest = store.tiers[0].read(seconds[0] - 1, seconds[0] + 1)
+        self.assertEqual(oldest['transactions'].sum(), 0)
+        store.add([seconds[0]], [True], [1.0])
+        self.assertEqual(store.tiers[0].read(seconds[0], seconds[0])['transactions'].sum(), 0)
+        self.assertEqual(store.query(end - 3000, end)['transactions'].sum(), (seconds >= end - 3000).sum())
+
+    def test_lttb(self):
+        """Test LTTB against a plain reference implementation, and that spikes survive."""
+        def reference(x, y, n_out):
+            n = len(x)
+            every = (n - 2) / (n_out - 2)
+            kept, a = [0], 0
+            for i in range(n_out - 2):
+                start, stop = int(i * every) + 1, int((i + 1) * every) + 1
+                next_stop = min(int((i + 2) * every) + 1, n)
+                if next_stop <= stop:
+                    next_stop = n
+                mean_x = np.mean(x[stop:next_stop])
+                mean_y = np.mean(y[stop:next_stop])
+                areas = [abs((x[a] - mean_x) * (y[j] - y[a]) - (x[a] - x[j]) * (mean_y - y[a]))
+                         for j in range(start, stop)]
+                a = start + int(np.argmax(areas))
+                kept.append(a)
+            return kept + [n - 1]
+
+        rng = np.random.default_rng(1)
+        x = np.arange(1000.0)
+        y = rng.normal(size=1000).cumsum()
+        y[517] = 100.0
+        kept = lttb(x, y, 50)
+        self.assertEqual(len(kept), 50)
+        self.assertIn(517, kept.tolist())
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertEqual(kept.tolist(), reference(x, y, 50))
+        np.testing.assert_array_equal(lttb(x[:10], y[:10], 50), np.arange(10))
+
+class TestAlertBus(unittest.TestCase):
+    def test_backend_publishes_to_file_sink(self):
+        """Test that flagged transactions reach a file sink after scoring returns."""
+        import json
+        import tempfile
+
+        path = os.path.join(tempfile.mkdtemp(), "alerts", "alerts.jsonl")
+        bus = AlertBus([FileSink(path)], batch_size=7)
+        backend = ScoringBackend(FraudDetector(prefer_compact=True), alert_bus=bus)
+        backend.process_batch(generate_transaction_stream(200))
+        for tx in generate_transaction_stream(20):
+            backend.process_transaction(tx)
+        self.assertTrue(bus.flush(timeout=5))
+
+        with open(path) as f:
+            delivered = [json.loads(line) for line in f]
+        alerts = backend.view().alerts()
+        self.assertGreater(len(alerts), 0)
+        self.assertEqual([a['transaction_id'] for a in delivered], [a['transaction_id'] for a in alerts])
+        self.assertEqual(delivered[0]['reason'], alerts[0]['reason'])
+        metrics = bus.metrics()[f"file:{path}"]
+        self.assertEqual((metrics['published'], metrics['delivered'], metrics['depth']),
+                         (len(alerts), len(alerts), 0))
+        self.assertIsNotNone(metrics['lag_p99_ms'])
+        bus.close()
+
+    def test_http_sink_retries_with_backoff(self):
+        """Test batch delivery to a mock HTTP endpoint that fails its first requests."""
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+
+        received, statuses = [], [503, 500]
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status = statuses.pop(0) if statuses else 200
+                if status == 200:
+                    received.append(body)
+                self.send_response(status)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            sink = HttpSink(f"http://127.0.0.1:{server.server_port}/alerts", name="case-management")
+            bus = AlertBus([sink], batch_size=100, backoff=0.01)
+            bus.publish([{'transaction_id': f"TX{i:04d}", 'risk_score': 0.9} for i in range(250)])
+            bus.close(timeout=10)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.assertTrue(all(len(batch) <= 100 for batch in received))
+        self.assertEqual([a['transaction_id'] for batch in received for a in batch],
+                         [f"TX{i:04d}" for i in range(250)])
+        metrics = bus.metrics()['case-management']
+        self.assertEqual((metrics['retries'], metrics['failed'], metrics['delivered']), (2, 0, 250))
+
+        # A sink that never recovers gives up after max_retries and counts the batch as failed
+        def broken(alerts):
+            raise ConnectionError("sink down")
+        bus = AlertBus([CallableSink(broken)], max_retries=2, backoff=0.001)
+        bus.publish([{'transaction_id': "TX0"}])
+        bus.close()
+        metrics = bus.metrics()['broken']
+        self.assertEqual((metrics['retries'], metrics['failed'], metrics['delivered']), (2, 1, 0))
+
+    def test_full_queue_policies(self):
+        """Test drop_oldest, drop_newest and block while a sink is stalled, failing instead of hanging."""
+        import threading
+
+        def run_with_timeout(function, *args):
+            worker = threading.Thread(target=function, args=args, daemon=True)
+            worker.start()
+            worker.join(5)
+            self.assertFalse(worker.is_alive(), f"{function.__name__} did not return")
+
+        for policy, expected in (('drop_oldest', list(range(15, 20))), ('drop_newest', list(range(5)))):
+            entered, release, delivered = threading.Event(), threading.Event(), []
+
+            def stalled(alerts):
+                entered.set()
+                release.wait(5)
+                delivered.extend(alert['id'] for alert in alerts)
+
+            bus = AlertBus([CallableSink(stalled)], max_queue=5, batch_size=1, policy=policy)
+            bus.publish([{'id': -1}])
+            self.assertTrue(entered.wait(5))
+            run_with_timeout(bus.publish, [{'id': i} for i in range(20)])
+            metrics = bus.metrics()['stalled']
+            self.assertEqual((metrics['depth'], metrics['dropped']), (5, 15))
+            self.assertGreaterEqual(metrics['oldest_age_s'], 0.0)
+            release.set()
+            bus.close(timeout=5)
+            self.assertEqual(delivered, [-1] + expected)
+
+        # block holds the publisher until the sink frees room, also when the
+        # delivery thread was idle before the publisher filled the queue
+        for stall_first in (True, False):
+            entered, release, delivered = threading.Event(), threading.Event(), []
+            bus = AlertBus([CallableSink(stalled)], max_queue=5, batch_size=1, policy='block')
+            if stall_first:
+                bus.publish([{'id': -1}])
+                self.assertTrue(entered.wait(5))
+            publisher = threading.Thread(target=bus.publish, args=([{'id': i} for i in range(20)],),
+                                         daemon=True)
+            publisher.start()
+            if stall_first:
+                publisher.join(0.1)
+                self.assertTrue(publisher.is_alive())
+            release.set()
+            publisher.join(5)
+            self.assertFalse(publisher.is_alive(), "blocked publisher never resumed")
+            self.assertTrue(bus.flush(timeout=5))
+            bus.close(timeout=5)
+            self.assertEqual(delivered, ([-1] if stall_first else []) + list(range(20)))
+            self.assertEqual(bus.metrics()['stalled']['dropped'], 0)
+
+        # With a block timeout, alerts that find no room in time are dropped
+        entered, release, delivered = threading.Event(), threading.Event(), []
+        bus = AlertBus([CallableSink(stalled)], max_queue=5, batch_size=1, policy='block', block_timeout=0.01)
+        bus.publish([{'id': -1}])
+        self.assertTrue(entered.wait(5))
+        run_with_timeout(bus.publish, [{'id': i} for i in range(8)])
+        self.assertEqual(bus.metrics()['stalled']['dropped'], 3)
+        release.set()
+        bus.close(timeout=5)
+        with self.assertRaises(ValueError):
+            AlertBus([], policy='drop_everything')
+
+class TestDuplicateFilter(unittest.TestCase):
+    def test_exact_and_near_duplicates_expire_with_the_window(self):
+        """Test resubmitted ids within the window, near-duplicates by timestamp gap, and expiry."""
+        dedup = DuplicateFilter(window=600, near_window=60, bucket_seconds=5)
+        tx = {'transaction_id': 'TX1', 'account_id': 'ACC1', 'merchant': 'Shell', 'amount': 25.0,
+              'timestamp': 1_000_000.0}
+        near = dict(tx, transaction_id='TX2', timestamp=1_000_030.0)
+        later = dict(tx, transaction_id='TX3', timestamp=1_000_500.0)
+        self.assertEqual(dedup.check([tx], now=1000.0), [None])
+        exact, close, far = dedup.check([dict(tx), near, later], now=1100.0)
+        self.assertEqual((exact['kind'], exact['original_id']), ('exact', 'TX1'))
+        self.assertEqual((close['kind'], close['original_id'], close['seconds_apart']), ('near', 'TX1', 30.0))
+        self.assertIsNone(far)
+        # Within a batch, the second copy is the duplicate
+        self.assertEqual([s and s['kind'] for s in dedup.check([{'transaction_id': 'TX4'}] * 2, now=1100.0)],
+                         [None, 'exact'])
+        # Forgotten once the window has passed since the last sighting
+        self.assertIsNone(dedup.check([tx], now=1100.0 + 600 + 11)[0])
+        self.assertEqual(dedup.stats()['exact'], 2)
+        self.assertEqual(dedup.stats()['near'], 1)
+
+    def test_near_duplicate_anchor_moves_past_the_window(self):
+        """Test that a transaction too far from the stored one becomes the new near-duplicate anchor."""
+        dedup = DuplicateFilter(window=600, near_window=60, bucket_seconds=5)
+        tx = {'account_id': 'ACC1', 'merchant': 'Shell', 'amount': 25.0}
+        signals = dedup.check([dict(tx, transaction_id='t1', timestamp=1000.0),
+                               dict(tx, transaction_id='t2', timestamp=1100.0),
+                               dict(tx, transaction_id='t3', timestamp=1110.0)], now=1000.0)
+        self.assertEqual(signals[:2], [None, None])
+        self.assertEqual((signals[2]['original_id'], signals[2]['seconds_apart']), ('t2', 10.0))
+
+    def test_memory_is_bounded_by_the_window(self):
+        """Test that a long stream of unique ids only keeps about window x rate of them."""
+        dedup = DuplicateFilter(window=60, bucket_seconds=5)
+        for second in range(600):
+            dedup.check([{'transaction_id': f"{second}-{i}"} for i in range(100)], now=float(second))
+        remembered = dedup.stats()['remembered_ids']
+        self.assertGreaterEqual(remembered, 60 * 100)
+        self.assertLessEqual(remembered, (60 + 2 * 5) * 100)
+        self.assertEqual(dedup.stats()['checked'], 60_000)
+
+    def test_backend_skips_duplicates(self):
+        """Test that the backend scores and records each transaction once and lists the duplicates."""
+        backend = ScoringBackend(FraudDetector(prefer_compact=True))
+        transactions = generate_transaction_stream(50)
+        resubmitted = dict(transactions[3], transaction_id='resubmitted')
+        timings = {}
+        records = backend.process_batch(transactions + transactions[:5] + [resubmitted], timings=timings)
+        self.assertEqual(len(records), 50)
+        self.assertGreater(timings['dedup'], 0.0)
+        self.assertIsNone(backend.process_transaction(transactions[0]))
+        self.assertEqual(backend.process_batch(transactions[:2], timings=timings), [])
+        self.assertEqual(timings['score'], 0.0)
+
+        view = backend.view()
+        self.assertEqual(view.summary()['total_transactions'], 50)
+        self.assertEqual(view.summary()['duplicate_count'], 9)
+        self.assertEqual(view.registry_sizes()['audit_logs'], 50)
+        self.assertEqual(view.duplicates()[5]['kind'], 'near')
+        self.assertEqual(view.duplicates()[5]['original_id'], transactions[3]['transaction_id'])
+        backend.clear()
+        self.assertEqual(len(backend.process_batch(transactions[:5])), 5)
+        self.assertEqual(len(ScoringBackend(backend.detector, dedup=False).process_batch(transactions * 2)), 100)
+
+class TestQuantileSketch(unittest.TestCase):
+    def test_accuracy_and_bounded_memory(self):
+        """Test quantile accuracy and memory of a streamed sketch."""
+        data = np.random.default_rng(0).normal(size=200_000)
+        sketch = KLLSketch(seed=0)
+        for chunk in np.array_split(data, 200):
+            sketch.update(chunk)
+
+        fractions = np.linspace(0.01, 0.99, 50)
+        true_ranks = np.searchsorted(np.sort(data), sketch.quantiles(fractions)) / len(data)
+        self.assertLess(np.abs(true_ranks - fractions).max(), 0.02)
+        self.assertEqual(sketch.count, len(data))
+        self.assertLess(len(sketch), 3 * sketch.k)
+        np.testing.assert_allclose(sketch.rank(np.quantile(data, [0.25, 0.75])), [0.25, 0.75], atol=0.02)
+
+    def test_merge_and_persistence(self):
+        """Test merging sketches and saving/loading one."""
+        import tempfile
+
+        rng = np.random.default_rng(1)
+        a, b = KLLSketch(seed=0), KLLSketch(seed=1)
+        a.update(rng.uniform(0, 1, 50_000))
+        b.update(rng.uniform(1, 2, 50_000))
+        a.merge(b)
+        self.assertEqual(a.count, 100_000)
+        self.assertAlmostEqual(float(a.quantiles(0.5)), 1.0, delta=0.03)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'sketch.npz')
+            a.save(path)
+            loaded = KLLSketch.load(path)
+        self.assertEqual(loaded.count, a.count)
+        np.testing.assert_array_equal(loaded.quantiles([0.1, 0.9]), a.quantiles([0.1, 0.9]))
+        self.assertTrue(np.isnan(KLLSketch().quantiles(0.5)))
+
+class TestDriftMonitor(unittest.TestCase):
+    def test_detects_shift(self):
+        """Test PSI/KS for a stable and a shifted column, and the decayed window."""
+        rng = np.random.default_rng(0)
+        monitor = DriftMonitor.from_training(rng.normal(size=(5000, 2)), ['stable', 'shifted'],
+                                             half_life=1000)
+        self.assertIsNone(monitor.metrics()['stable']['psi'])
+
+        monitor.update(np.column_stack([rng.normal(size=3000), rng.normal(1.0, 1.0, size=3000)]))
+        metrics = monitor.metrics()
+        self.assertLess(metrics['stable']['psi'], 0.05)
+        self.assertGreater(metrics['shifted']['psi'], 0.5)
+        self.assertGreater(metrics['shifted']['ks'], 0.3)
+        self.assertEqual([alert['column'] for alert in monitor.alerts()], ['shifted'])
+
+        # Once traffic returns to normal, decay lets the shift age out
+        for _ in range(20):
+            monitor.update(rng.normal(size=(1000, 2)))
+        self.assertEqual(monitor.alerts(), [])
+        self.assertEqual(monitor.total_seen, 23000)
+
+    def test_persistence_and_backend_view(self):
+        """Test baseline save/load and drift reporting through the backend."""
+        import tempfile
+
+        rng = np.random.default_rng(1)
+        monitor = DriftMonitor.from_training(rng.uniform(size=(1000, 3)), ['a', 'b', 'c'])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'baseline.npz')
+            monitor.save(path)
+            loaded = DriftMonitor.load(path)
+        np.testing.assert_array_equal(loaded.edges, monitor.edges)
+        np.testing.assert_allclose(loaded.baseline, monitor.baseline)
+        self.assertEqual(loaded.columns, ['a', 'b', 'c'])
+
+        # Stream traffic differs from the synthetic training data, notably in amount
+        backend = ScoringBackend(FraudDetector())
+        backend.detector.drift_monitor.reset()
+        backend.process_batch(generate_transaction_stream(600))
+        drift = backend.view().drift()
+        self.assertEqual(drift['transactions_seen'], 600)
+        self.assertEqual(set(drift['metrics']), set(FEATURE_COLUMNS) | {'risk_score'})
+        self.assertIn('amount', [alert['column'] for alert in drift['alerts']])
+
+class TestFeatureEncoder(unittest.TestCase):
+    def test_input_layouts_agree(self):
+        """Test that dicts, columns and DataFrames encode identically."""
+        transactions = generate_transaction_stream(100)
+        frame = pd.DataFrame(transactions)
+        encoder = FeatureEncoder()
+
+        X = encoder.encode(transactions)
+        self.assertEqual(X.shape, (100, len(FEATURE_COLUMNS)))
+        self.assertTrue(X.flags['C_CONTIGUOUS'])
+        np.testing.assert_array_equal(X, encoder.encode(frame))
+        np.testing.assert_array_equal(
+            X, encoder.encode({name: frame[name].to_numpy() for name in frame.columns}))
+
+    def test_defaults_and_mappings(self):
+        """Test merchant/category mapping and missing-value defaults."""
+        encoder = FeatureEncoder()
+        X = encoder.encode([
+            {'amount': 10.0, 'merchant': 'Amazon', 'category': 'travel',
+             'time_of_day': 3, 'account_age_days': 5, 'previous_transactions': 1},
+            {'merchant': 'Somewhere New', 'category': 'unknown'},
+            {},
+        ])
+        np.testing.assert_array_equal(X[0], [10.0, 0.1, 3, 5, 1, 4])
+        np.testing.assert_array_equal(X[1], [0, 0.5, 12, 365, 10, 3])
+        np.testing.assert_array_equal(X[2], [0, 0.7, 12, 365, 10, 3])
+
+    def test_preallocated_buffer_and_derived(self):
+        """Test reuse of one output buffer and derived feature columns."""
+        encoder = FeatureEncoder(derived_features=('is_night',), dtype=np.float32)
+        out = encoder.allocate(10)
+        X = encoder.encode([{'time_of_day': 23}, {'time_of_day': 12}], out=out)
+
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(np.shares_memory(X, out))
+        np.testing.assert_array_equal(X[:, -1], [1, 0])
+        with self.assertRaises(ValueError):
+            encoder.encode([{}] * 11, out=out)
+        with self.assertRaises(ValueError):
+            FeatureEncoder(derived_features=('nope',))
+
+class TestRiskRules(unittest.TestCase):
+    def test_default_rules_match_hardcoded_adjustments(self):
+        """Test that the shipped rule table reproduces the original if-chain."""
+        features = FeatureEncoder().encode(generate_transaction_stream(200))
+        scores = np.random.default_rng(0).uniform(0, 1, 200)
+        adjusted, _ = RiskRuleEngine().apply(features, scores)
+
+        expected = []
+        for row, score in zip(features, scores):
+            if row[1] > 0.7:
+                score += 0.3
+            elif row[1] > 0.4:
+                score += 0.1
+            if row[3] < 30:
+                score += 0.2
+            if row[4] < 3:
+                score += 0.15
+            expected.append(min(score, 1.0))
+        np.testing.assert_allclose(adjusted, expected)
+
+    def test_groups_conditions_and_bitmask(self):
+        """Test exclusive groups, AND-ed conditions, multipliers and fired bits."""
+        ruleset = RuleSet({'rules': [
+            {'name': 'big', 'group': 'amount', 'when': [{'feature': 'amount', 'op': '>=', 'value': 1000}],
+             'add': 0.3, 'reason': 'Large amount'},
+            {'name': 'medium', 'group': 'amount', 'when': [{'feature': 'amount', 'op': '>=', 'value': 100}],
+             'add': 0.1},
+            {'name': 'night_new', 'when': [{'feature': 'time_of_day', 'op': '<', 'value': 6},
+                                           {'feature': 'account_age_days', 'op': '<', 'value': 30}],
+             'multiply': 2.0, 'reason': 'New account at night'},
+            {'name': 'already_risky', 'when': [{'feature': 'risk_score', 'op': '>', 'value': 0.5}],
+             'add': 0.05},
+        ]})
+        features = FeatureEncoder().encode([
+            {'amount': 5000, 'time_of_day': 3, 'account_age_days': 5},
+            {'amount': 500, 'time_of_day': 3, 'account_age_days': 500},
+            {'amount': 10},
+        ])
+        adjusted, bits = ruleset.apply(features, np.array([0.2, 0.6, 0.1]))
+
+        np.testing.assert_allclose(adjusted, [0.7, 0.75, 0.1])
+        self.assertEqual(bits.shape, (3, 1))
+        self.assertEqual(ruleset.fired_names(bits[0]), ['big', 'night_new'])
+        self.assertEqual(ruleset.reasons(bits[0]), ['Large amount', 'New account at night'])
+        self.assertEqual(ruleset.fired_names(bits[1]), ['medium', 'already_risky'])
+        self.assertEqual(ruleset.fired_names(bits[2]), [])
+
+        with self.assertRaises(ValueError):
+            RuleSet({'rules': [{'name': 'bad', 'when': [{'feature': 'nope', 'op': '>', 'value': 1}]}]})
+
+    def test_reload(self):
+        """Test that edits to the rule file are picked up at runtime."""
+        import json
+        import tempfile
+
+        def write_rules(path, amount):
+            with open(path, 'w') as f:
+                json.dump({'rules': [{'name': 'flat', 'add': amount,
+                                      'when': [{'feature': 'amount', 'op': '>=', 'value': 0}]}]}, f)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            write_rules(path, 0.1)
+            engine = RiskRuleEngine(path)
+            features = FeatureEncoder().encode([{'amount': 1}])
+            self.assertAlmostEqual(engine.apply(features, np.array([0.0]))[0][0], 0.1)
+            self.assertFalse(engine.reload_if_changed())
+
+            write_rules(path, 0.4)
+            os.utime(path, (0, 12345))
+            self.assertTrue(engine.reload_if_changed())
+            self.assertAlmostEqual(engine.apply(features, np.array([0.0]))[0][0], 0.4)
+
+            # Broken tables raise RuleError and keep the last good rules
+            broken = ['{"rules": [', '{"rules": [{"name": "x", "add": "lots", "when": '
+                      '[{"feature": "amount", "op": ">", "value": 0}]}]}',
+                      '{"rules": [{"name": "x", "when": [{"feature": "amount", "op": ">", "value": null}]}]}',
+                      '[]']
+            for mtime, text in enumerate(broken, start=20000):
+                with open(path, 'w') as f:
+                    f.write(text)
+                os.utime(path, (0, mtime))
+                with self.assertRaises(RuleError):
+                    engine.reload_if_changed()
+                self.assertAlmostEqual(engine.apply(features, np.array([0.0]))[0][0], 0.4)
+            os.remove(path)
+            with self.assertRaises(RuleError):
+                engine.reload_if_changed()
+
+            yaml_path = os.path.join(tmp, 'rules.yaml')
+            with open(yaml_path, 'w') as f:
+                f.write("rules: [{name: x\n")
+            with self.assertRaises(RuleError):
+                RiskRuleEngine(yaml_path)
+
+class TestScoringBackend(unittest.TestCase):
+    def setUp(self):
+        """Set up a shared backend with a trained detector."""
+        self.backend = ScoringBackend(FraudDetector())
+
+    def test_shared_state_views(self):
+        """Test that every view sees the same shared state."""
+        for tx in generate_transaction_stream(20):
+            self.backend.process_transaction(tx)
+
+        view_a = self.backend.view()
+        view_b = self.backend.view()
+        self.assertEqual(view_a.summary(), view_b.summary())
+        self.assertEqual(view_a.summary()['total_transactions'], 20)
+        self.assertEqual(view_a.registry_sizes()['risk_scores'], 20)
+        self.assertEqual(len(view_b.transactions(last=5)), 5)
+        self.assertEqual(view_a.summary()['fraud_count'], len(view_a.alerts()))
+
+        # Views return copies, not the live lists or records
+        view_a.transactions().clear()
+        self.assertEqual(len(view_b.transactions()), 20)
+        record = view_a.transactions(last=1)[0]
+        original = dict(record)
+        record['is_fraud'] = not record['is_fraud']
+        record['risk_score'] = -1.0
+        self.assertEqual(view_b.transactions(last=1)[0], original)
+        self.assertEqual(self.backend.transaction_data[-1], original)
+        for alert in view_a.alerts():
+            alert['reason'] = "edited"
+        self.assertTrue(all(alert['reason'] != "edited" for alert in view_b.alerts()))
+
+        self.backend.clear()
+        self.assertEqual(view_b.summary()['total_transactions'], 0)
+
+    def test_flagged_count_and_histogram_match_the_history(self):
+        """Test that session counts and the risk histogram match a rescan of every record."""
+        self.backend.process_batch(generate_transaction_stream(300))
+        self.backend.process_transaction(generate_transaction_stream(1)[0])
+        view = self.backend.view()
+        records = view.transactions()
+        decision_scores = [tx['decision_score'] for tx in records]
+        for sensitivity in (0.0, 0.3, 0.7, 1.0):
+            self.assertEqual(view.flagged_count(sensitivity),
+                             int(self.backend.detector.rethreshold(decision_scores, sensitivity).sum()))
+        counts, edges = view.risk_histogram()
+        self.assertEqual(counts.tolist(),
+                         np.histogram([tx['risk_score'] for tx in records], bins=edges)[0].tolist())
+
+        self.backend.clear()
+        self.assertEqual(view.flagged_count(1.0), 0)
+        self.assertEqual(view.risk_histogram()[0].sum(), 0)
+
+    def test_reasons_decode_with_the_rules_that_fired(self):
+        """Test that a rule reload while a batch is processed does not change its flag reasons."""
+        def table(reason, count):
+            return {'rules': [{'name': f"rule_{i}", 'reason': f"{reason} {i}", 'add': 0.0,
+                               'when': [{'feature': 'amount', 'op': '>=', 'value': 0}]} for i in range(count)]}
+
+        detector = self.backend.detector
+        detector.rules = RiskRuleEngine(table("Old rule", 2))
+        detector.threshold = float('inf')
+        explain = detector.explain
+
+        def explain_then_reload(transactions, *args, **kwargs):
+            detector.rules.source = table("New rule", 1)
+            detector.rules.reload()
+            return explain(transactions, *args, **kwargs)
+
+        detector.explain = explain_then_reload
+        self.backend.process_batch(generate_transaction_stream(10))
+        detector.rules = RiskRuleEngine(table("Old rule", 2))
+        self.backend.process_transaction(generate_transaction_stream(1)[0])
+        alerts = self.backend.view().alerts()
+        self.assertEqual(len(alerts), 11)
+        for alert in alerts:
+            self.assertIn("Old rule 0; Old rule 1", alert['reason'])
+
+    def test_process_batch(self):
+        """Test that batch processing records the same state as single processing."""
+        transactions = generate_transaction_stream(40)
+        records = self.backend.process_batch(transactions)
+
+        view = self.backend.view()
+        summary = view.summary()
+        self.assertEqual(len(records), 40)
+        self.assertEqual(summary['total_transactions'], 40)
+        self.assertEqual(summary['fraud_count'], sum(r['is_fraud'] for r in records))
+        self.assertEqual(view.registry_sizes(),
+                         {'risk_scores': 40, 'fraud_flags': summary['fraud_count'], 'audit_logs': 40})
+        self.assertEqual(len(view.alerts()), summary['fraud_count'])
+        self.assertEqual(self.backend.process_batch([]), [])
+        self.assertEqual(view.entity_graph()['transactions'], 40)
+        trends = view.trends(3600, max_points=None)
+        self.assertEqual(trends['tier'], '1s')
+        self.assertEqual(trends['transactions'].sum(), 40)
+        self.assertEqual(trends['frauds'].sum(), summary['fraud_count'])
+
+        # Flag reasons name the risk rules that fired
+        for alert in view.alerts():
+            self.assertTrue(alert['reason'].startswith("High risk score detected"))
+            self.assertIn("top features: ", alert['reason'])
+            flag = self.backend.fraud_registry.get_flag(alert['transaction_id'])
+            self.assertEqual(flag['reason'], alert['reason'])
+
+    def test_concurrent_readers(self):
+        """Test reads running concurrently with a writer."""
+        import threading
+
+        transactions = generate_transaction_stream(30)
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            view = self.backend.view()
+            try:
+                while not stop.is_set():
+                    summary = view.summary()
+                    page = view.query_registry('risk_scores', limit=100)
+                    self.assertLessEqual(summary['fraud_count'], summary['total_transactions'])
+                    self.assertLessEqual(len(page['items']), 100)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for tx in transactions:
+            self.backend.process_transaction(tx)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.backend.view().summary()['total_transactions'], 30)
+
+class TestReplay(unittest.TestCase):
+    def test_amplification_rewrites_ids_and_shifts_time(self):
+        """Test that amplified copies get unique ids and follow each other in event time."""
+        recording = generate_transaction_stream(120)
+        batches = list(amplified_batches(recording, factor=3, batch_size=50))
+        replayed = [tx for batch in batches for tx in batch]
+
+        self.assertEqual([len(batch) for batch in batches], [50, 50, 20] * 3)
+        self.assertEqual(len({tx['transaction_id'] for tx in replayed}), 360)
+        self.assertEqual(replayed[120]['transaction_id'], recording[0]['transaction_id'] + "-1")
+        self.assertGreater(min(tx['timestamp'] for tx in replayed[120:240]),
+                           max(tx['timestamp'] for tx in replayed[:120]))
+        self.assertEqual(replayed[0]['transaction_id'], recording[0]['transaction_id'])
+
+    def test_replay_is_deterministic(self):
+        """Test that two replays on fresh backends produce the same digest and full stage stats."""
+        import tempfile
+
+        recording = generate_transaction_stream(150)
+        reports = []
+        with tempfile.TemporaryDirectory() as tmp:
+            # Pin the starting sketch: models/score_sketch.npz changes whenever the dashboard saves
+            sketch = os.path.join(tmp, 'score_sketch.npz')
+            FraudDetector(prefer_compact=True).save_score_sketch(sketch)
+            for run in range(2):
+                backend = ScoringBackend(FraudDetector(prefer_compact=True))
+                if run:
+                    # As if live traffic had been folded in and saved since
+                    backend.detector.score_sketch.update(np.linspace(-0.3, 0.3, 5000))
+                    backend.detector._refresh_thresholds()
+                reports.append(replay(recording, backend, factor=2, batch_size=64, sketch=sketch))
+        self.assertEqual(reports[0]['digest'], reports[1]['digest'])
+        records = backend.view().transactions()
+        self.assertEqual([record['timestamp'] for record in records[:150]],
+                         [tx['timestamp'] for tx in recording])
+        self.assertEqual(backend.audit_trail.get_logs_for_transaction(recording[0]['transaction_id']),
+                         [{'tx_id': recording[0]['transaction_id'], 'risk_score': records[0]['risk_score'],
+                           'timestamp': recording[0]['timestamp'].isoformat()}])
+        self.assertEqual(reports[0]['flagged'], reports[1]['flagged'])
+        self.assertEqual(reports[0]['rows'], 300)
+        self.assertEqual(len(backend.risk_registry), 300)
+        self.assertEqual(reports[0]['batches'], 6)
+        for stage in ('score', 'explain', 'link', 'record', 'total'):
+            self.assertLessEqual(reports[0]['stages'][stage]['p50_ms'], reports[0]['stages'][stage]['max_ms'])
+        self.assertEqual(reports[0]['stages']['lag'], {})
+
 class TestBlockchainRegistries(unittest.TestCase):
     def setUp(self):
         """Set up test fixtures before each test method."""
@@ -117,5 +1196,467 @@ class TestBlockchainRegistries(unittest.TestCase):
         all_logs = self.audit_trail.get_all_logs()
         self.assertGreaterEqual(len(all_logs), 1)
 
+class TestRegistryQueries(unittest.TestCase):
+    def setUp(self):
+        """Populate registries with a predictable set of entries."""
+        import datetime
+
+        self.risk_registry = RiskScoreRegistry()
+        self.fraud_registry = FraudFlagRegistry()
+        self.audit_trail = AuditTrail()
+        self.base_time = datetime.datetime(2025, 1, 1, 12, 0, 0)
+        for i in range(100):
+            tx_id = f"{'ab' if i % 2 else 'cd'}_{i:03d}"
+            self.risk_registry.store_risk(tx_id, (i % 10) / 10)
+            self.audit_trail.log_audit(tx_id, (i % 10) / 10, self.base_time + datetime.timedelta(seconds=i))
+            if i % 10 == 9:
+                self.fraud_registry.flag_fraud(tx_id, "High risk score detected")
+
+    def test_risk_range_pagination(self):
+        """Test index-only range queries report exact totals and pages."""
+        page = self.risk_registry.query(min_risk=0.5, sort_by='risk_score', offset=10, limit=20)
+        self.assertEqual(page['total'], 50)
+        self.assertEqual(len(page['items']), 20)
+        self.assertTrue(page['has_more'])
+        scores = [item['risk_score'] for item in page['items']]
+        self.assertEqual(scores, sorted(scores))
+        self.assertTrue(all(score >= 0.5 for score in scores))
+
+        last = self.risk_registry.query(min_risk=0.5, sort_by='risk_score', descending=True, offset=40, limit=20)
+        self.assertEqual(len(last['items']), 10)
+        self.assertFalse(last['has_more'])
+        self.assertEqual(last['items'][-1]['risk_score'], 0.5)
+
+    def test_combined_filters(self):
+        """Test combining prefix, risk and flagged filters."""
+        page = self.risk_registry.query(tx_id_prefix='ab_', min_risk=0.9, flagged_only=True,
+                                        fraud_registry=self.fraud_registry, sort_by='tx_id', limit=100)
+        self.assertEqual(page['total'], 10)
+        self.assertTrue(all(item['tx_id'].startswith('ab_') for item in page['items']))
+        self.assertEqual([item['tx_id'] for item in page['items']],
+                         sorted(item['tx_id'] for item in page['items']))
+
+        page = self.risk_registry.query(min_risk=0.3, max_risk=0.3, tx_id_prefix='cd_', limit=3)
+        self.assertEqual([item['risk_score'] for item in page['items']], [])
+
+    def test_overwrite_updates_indexes(self):
+        """Test that re-storing a score moves it within the indexes."""
+        self.risk_registry.store_risk('cd_000', 0.99)
+        page = self.risk_registry.query(min_risk=0.95, limit=10)
+        self.assertEqual([item['tx_id'] for item in page['items']], ['cd_000'])
+        self.assertEqual(self.risk_registry.query(max_risk=0.0)['total'], 9)
+
+    def test_audit_time_range(self):
+        """Test time range and flagged-only queries on the audit trail."""
+        import datetime
+
+        page = self.audit_trail.query(start_time=self.base_time + datetime.timedelta(seconds=10),
+                                      end_time=self.base_time + datetime.timedelta(seconds=19),
+                                      descending=True, limit=5)
+        self.assertEqual(page['total'], 10)
+        self.assertEqual(page['items'][0]['tx_id'], 'ab_019')
+
+        flagged = self.audit_trail.query(flagged_only=True, fraud_registry=self.fraud_registry, limit=100)
+        self.assertEqual(flagged['total'], 10)
+        self.assertEqual(len(self.fraud_registry.query(tx_id_prefix='ab_')['items']), 10)
+
+        with self.assertRaises(ValueError):
+            self.audit_trail.query(sort_by='merchant')
+
+    def test_flagged_index(self):
+        """Test that the flagged-id index follows flag writes and is reused while unchanged."""
+        flagged = self.fraud_registry.flagged_ids()
+        self.assertEqual(flagged, set(self.fraud_registry.get_all_flags()))
+        self.assertIs(self.fraud_registry.flagged_ids(), flagged)
+        # Re-flagging a transaction keeps the index as it is
+        self.fraud_registry.flag_fraud('ab_009', "Reviewed")
+        self.assertIs(self.fraud_registry.flagged_ids(), flagged)
+
+        self.fraud_registry.flag_frauds([('cd_000', "Manual"), ('ab_001', "Manual")])
+        self.assertEqual(self.fraud_registry.flagged_ids(), flagged | {'cd_000', 'ab_001'})
+        page = self.audit_trail.query(flagged_only=True, fraud_registry=self.fraud_registry, limit=100)
+        self.assertEqual(page['total'], 12)
+        page = self.risk_registry.query(flagged_only=True, fraud_registry=self.fraud_registry, max_risk=0.1)
+        self.assertEqual(sorted(item['tx_id'] for item in page['items']), ['ab_001', 'cd_000'])
+
+        self.fraud_registry.clear()
+        self.assertEqual(self.fraud_registry.flagged_ids(), frozenset())
+        self.fraud_registry.load_entries([('cd_002', {'reason': "Restored", 'timestamp': "2025-01-01T12:00:00"})])
+        self.assertEqual(self.fraud_registry.flagged_ids(), {'cd_002'})
+        self.assertEqual(self.audit_trail.query(flagged_only=True, fraud_registry=self.fraud_registry)['total'], 1)
+
+    def test_pages_across_stripes_match_the_full_result(self):
+        """Test that every page equals the slice of the full merged result, with and without filters."""
+        import random
+
+        rng = random.Random(1)
+        risks = RiskScoreRegistry(num_stripes=5)
+        risks.store_risks((f"T{i:04d}", round(rng.random(), 1)) for i in range(600))
+        self.fraud_registry.flag_frauds((f"T{i:04d}", "x") for i in range(0, 600, 7))
+        for kwargs in ({'sort_by': 'risk_score'}, {'sort_by': 'tx_id', 'min_risk': 0.3},
+                       {'sort_by': 'risk_score', 'flagged_only': True, 'fraud_registry': self.fraud_registry}):
+            for descending in (False, True):
+                full = risks.query(descending=descending, limit=1000, **kwargs)['items']
+                keys = [item[kwargs['sort_by']] for item in full]
+                self.assertEqual(keys, sorted(keys, reverse=descending))
+                for offset in (1, 9, len(full) // 2, len(full) - 3, len(full) + 2):
+                    page = risks.query(descending=descending, offset=offset, limit=7, **kwargs)
+                    self.assertEqual(page['items'], full[offset:offset + 7])
+                    self.assertEqual(page['has_more'], offset + 7 < len(full))
+
+class TestRegistryConcurrency(unittest.TestCase):
+    def test_concurrent_writers_and_readers(self):
+        """Stress striped registries with concurrent writers and readers."""
+        import datetime
+        import threading
+
+        risk_registry = RiskScoreRegistry(num_stripes=8)
+        fraud_registry = FraudFlagRegistry(num_stripes=8)
+        audit_trail = AuditTrail(num_stripes=8)
+        num_writers, per_writer = 8, 400
+        errors = []
+        stop = threading.Event()
+
+        def writer(worker):
+            try:
+                for i in range(per_writer):
+                    # Every fourth ID is shared between writers to force overwrites
+                    tx_id = f"shared_{i}" if i % 4 == 0 else f"w{worker}_{i}"
+                    audit_trail.log_audit(tx_id, worker, datetime.datetime.now())
+                    risk_registry.store_risk(tx_id, (i % 100) / 100)
+                    if i % 10 == 0:
+                        fraud_registry.flag_fraud(tx_id, f"writer {worker}")
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                while not stop.is_set():
+                    page = risk_registry.query(min_risk=0.5, sort_by='risk_score', limit=20)
+                    scores = [item['risk_score'] for item in page['items']]
+                    self.assertEqual(scores, sorted(scores))
+                    # Audit logs are written first, so a consistent read never
+                    # sees a score without its log
+                    scores, logs = consistent_snapshot(risk_registry, audit_trail)
+                    self.assertLessEqual(set(scores), {log['tx_id'] for log in logs})
+            except Exception as e:
+                errors.append(e)
+
+        readers = [threading.Thread(target=reader) for _ in range(2)]
+        writers = [threading.Thread(target=writer, args=(w,)) for w in range(num_writers)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        expected_ids = num_writers * per_writer * 3 // 4 + per_writer // 4
+        self.assertEqual(len(risk_registry), expected_ids)
+        self.assertEqual(risk_registry.query(limit=0)['total'], expected_ids)
+        self.assertEqual(risk_registry.query(min_risk=0.0, max_risk=1.0, sort_by='risk_score', limit=0)['total'],
+                         expected_ids)
+        self.assertEqual(len(audit_trail), num_writers * per_writer)
+
+        # Each writer's logs keep their append order in the merged trail
+        logs = audit_trail.get_all_logs()
+        for worker in range(num_writers):
+            own = [log['tx_id'] for log in logs if log['tx_id'].startswith(f"w{worker}_")]
+            self.assertEqual(own, [f"w{worker}_{i}" for i in range(per_writer) if i % 4])
+
+    def test_batch_writes_and_clear(self):
+        """Test batch writes and in-place clear."""
+        import datetime
+
+        risk_registry = RiskScoreRegistry()
+        fraud_registry = FraudFlagRegistry()
+        audit_trail = AuditTrail()
+        risk_registry.store_risks((f"tx_{i}", i / 100) for i in range(100))
+        fraud_registry.flag_frauds([("tx_1", "rule A"), ("tx_2", "rule B")])
+        audit_trail.log_audits((f"tx_{i}", i / 100, datetime.datetime.now()) for i in range(100))
+
+        self.assertEqual(len(risk_registry), 100)
+        self.assertEqual(fraud_registry.get_flag("tx_2")['reason'], "rule B")
+        self.assertEqual(audit_trail.query(min_risk=0.9)['total'], 10)
+
+        scores = risk_registry.get_all_risks()
+        risk_registry.clear()
+        self.assertEqual(len(risk_registry), 0)
+        self.assertEqual(len(scores), 100)
+        self.assertEqual(risk_registry.query()['total'], 0)
+
+class TestRegistrySnapshot(unittest.TestCase):
+    def setUp(self):
+        """Populate registries and create a scratch snapshot directory."""
+        import datetime
+        import tempfile
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.snapshot_dir = os.path.join(self.tmp_dir, 'snapshot')
+        self.risk_registry = RiskScoreRegistry()
+        self.fraud_registry = FraudFlagRegistry()
+        self.audit_trail = AuditTrail()
+        for i in range(25):
+            tx_id = f"tx_{i:03d}"
+            self.risk_registry.store_risk(tx_id, i / 25)
+            self.audit_trail.log_audit(tx_id, i / 25, datetime.datetime(2025, 1, 1, 12, 0, i))
+        self.fraud_registry.flag_fraud("tx_024", "High risk score detected")
+        self.fraud_registry.flag_fraud("tx_023", "Suspicious merchant: é")
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_snapshot_pages(self):
+        """Test paginated reads from a memory-mapped snapshot."""
+        save_snapshot(self.snapshot_dir, self.risk_registry, self.fraud_registry, self.audit_trail)
+        snapshot = load_snapshot(self.snapshot_dir)
+
+        self.assertEqual(snapshot.num_rows('risk_scores'), 25)
+        page = snapshot.read_page('risk_scores', offset=20, limit=10)
+        self.assertEqual(len(page), 5)
+        for row in page:
+            self.assertEqual(row['risk_score'], self.risk_registry.get_risk(row['tx_id'])['risk_score'])
+        all_rows = snapshot.read_page('risk_scores', limit=25)
+        self.assertEqual(sorted(row['tx_id'] for row in all_rows), [f"tx_{i:03d}" for i in range(25)])
+
+        flags = {row['tx_id']: row['reason'] for row in snapshot.read_page('fraud_flags')}
+        self.assertEqual(flags["tx_023"], "Suspicious merchant: é")
+        logs = snapshot.read_page('audit_logs', offset=3, limit=1)
+        self.assertEqual(logs[0]['timestamp'], "2025-01-01T12:00:03")
+        self.assertEqual(snapshot.read_page('audit_logs', offset=100), [])
+
+    def test_snapshot_restore(self):
+        """Test restoring registries from a snapshot."""
+        save_snapshot(self.snapshot_dir, self.risk_registry, self.fraud_registry, self.audit_trail)
+
+        risk_registry = RiskScoreRegistry()
+        fraud_registry = FraudFlagRegistry()
+        audit_trail = AuditTrail()
+        load_snapshot(self.snapshot_dir).restore(risk_registry, fraud_registry, audit_trail)
+
+        self.assertEqual(len(risk_registry), 25)
+        self.assertAlmostEqual(risk_registry.get_risk("tx_010")['risk_score'], 10 / 25)
+        self.assertTrue(fraud_registry.is_flagged("tx_023"))
+        self.assertEqual(len(audit_trail.get_logs_for_transaction("tx_007")), 1)
+        # Timestamps come back exactly as isoformat() wrote them
+        self.assertEqual(risk_registry.get_all_risks(), self.risk_registry.get_all_risks())
+        self.assertEqual(fraud_registry.get_all_flags(), self.fraud_registry.get_all_flags())
+        self.assertEqual(audit_trail.get_logs_for_transaction("tx_007"),
+                         self.audit_trail.get_logs_for_transaction("tx_007"))
+
+    def test_audit_order_survives_batches_and_restore(self):
+        """Test that batch-logged audits keep input order, also after a snapshot restore."""
+        import datetime
+
+        audit_trail = AuditTrail()
+        when = datetime.datetime(2025, 1, 1)
+        # Many ids spread over all stripes, interleaved with single writes
+        audit_trail.log_audits((f"batch_{i:03d}", i / 100, when) for i in range(100))
+        audit_trail.log_audit("single", 0.5, when)
+        audit_trail.log_audits((f"later_{i:03d}", i / 100, when) for i in reversed(range(20)))
+        expected = ([f"batch_{i:03d}" for i in range(100)] + ["single"]
+                    + [f"later_{i:03d}" for i in reversed(range(20))])
+        self.assertEqual([log['tx_id'] for log in audit_trail.get_all_logs()], expected)
+
+        save_snapshot(self.snapshot_dir, audit_trail=audit_trail)
+        snapshot = load_snapshot(self.snapshot_dir)
+        self.assertEqual([row['tx_id'] for row in snapshot.read_page('audit_logs', limit=200)], expected)
+        restored = AuditTrail()
+        snapshot.restore(audit_trail=restored)
+        self.assertEqual(restored.get_all_logs(), audit_trail.get_all_logs())
+        restored.log_audit("after_restore", 0.1, when)
+        self.assertEqual(restored.get_all_logs()[-1]['tx_id'], "after_restore")
+
+    def test_timezones_and_numeric_ids_round_trip(self):
+        """Test that UTC offsets survive a snapshot and numeric tx_ids are stored as text."""
+        import datetime
+
+        audit_trail = AuditTrail()
+        plus_two = datetime.timezone(datetime.timedelta(hours=2))
+        audit_trail.log_audit("naive", 0.1, datetime.datetime(2025, 1, 1, 12))
+        audit_trail.log_audit("aware", 0.2, datetime.datetime(2025, 1, 1, 12, 0, 0, 500, tzinfo=plus_two))
+        audit_trail.log_audit("utc", 0.3, datetime.datetime(2025, 1, 1, 12, tzinfo=datetime.timezone.utc))
+        save_snapshot(self.snapshot_dir, audit_trail=audit_trail)
+        restored = AuditTrail()
+        load_snapshot(self.snapshot_dir).restore(audit_trail=restored)
+        self.assertEqual(restored.get_all_logs(), audit_trail.get_all_logs())
+        self.assertEqual(restored.get_all_logs()[1]['timestamp'], "2025-01-01T12:00:00.000500+02:00")
+
+        risk_registry = RiskScoreRegistry()
+        risk_registry.store_risks([(101, 0.5), (7, 0.9)])
+        save_snapshot(self.snapshot_dir, risk_registry)
+        rows = load_snapshot(self.snapshot_dir).read_page('risk_scores')
+        self.assertEqual(sorted(row['tx_id'] for row in rows), ["101", "7"])
+
+    def test_open_snapshot_survives_later_saves(self):
+        """Test that a snapshot opened before two later saves still reads its own rows."""
+        save_snapshot(self.snapshot_dir, self.risk_registry)
+        snapshot = load_snapshot(self.snapshot_dir)
+        for _ in range(2):
+            save_snapshot(self.snapshot_dir, self.risk_registry, self.fraud_registry)
+        rows = snapshot.read_page('risk_scores', limit=25)
+        self.assertEqual(sorted(row['tx_id'] for row in rows), [f"tx_{i:03d}" for i in range(25)])
+        self.assertEqual(load_snapshot(self.snapshot_dir).num_rows('fraud_flags'), 2)
+        # Only the current version and the one it replaced are kept
+        self.assertEqual(len([name for name in os.listdir(self.snapshot_dir) if name.startswith('v')]), 2)
+
+class TestShardedRegistry(unittest.TestCase):
+    def setUp(self):
+        """Start a two-shard service and fill it alongside in-process registries."""
+        from datetime import datetime, timedelta
+        self.service = ShardedRegistryService(num_shards=2, pipeline_depth=2)
+        self.local = RiskScoreRegistry(), FraudFlagRegistry(), AuditTrail()
+        start = datetime(2024, 1, 1)
+        self.tx_ids = [f"tx_{i:04d}" for i in range(600)]
+        self.expected_logs = []
+        # Written in several pipelined batches; tx_0000 is logged twice
+        for offset in range(0, 600, 100):
+            batch = self.tx_ids[offset:offset + 100]
+            audits = [(tx_id, (int(tx_id[3:]) % 10) / 10, start + timedelta(seconds=int(tx_id[3:])))
+                      for tx_id in batch]
+            self.expected_logs.extend({'tx_id': tx_id, 'risk_score': score, 'timestamp': timestamp.isoformat()}
+                                      for tx_id, score, timestamp in audits)
+            for risks, flags, audit in (self.local, (self.service.risk_scores, self.service.fraud_flags,
+                                                     self.service.audit_trail)):
+                risks.store_risks((tx_id, score) for tx_id, score, _ in audits)
+                flags.flag_frauds((tx_id, "High risk") for tx_id, score, _ in audits if score >= 0.8)
+                audit.log_audits(audits)
+        for audit in (self.local[2], self.service.audit_trail):
+            audit.log_audit("tx_0000", 0.5, start)
+        self.expected_logs.append({'tx_id': "tx_0000", 'risk_score': 0.5, 'timestamp': start.isoformat()})
+
+    def tearDown(self):
+        self.service.close()
+
+    def test_ring_routing_is_stable_and_spread(self):
+        """Test that every shard owns keys and equal rings route keys identically."""
+        ring, other = HashRing(), HashRing()
+        for shard in range(4):
+            ring.add(shard)
+            other.add(shard)
+        owners = [ring.owner(tx_id) for tx_id in self.tx_ids]
+        self.assertEqual(owners, [other.owner(tx_id) for tx_id in self.tx_ids])
+        self.assertEqual(set(owners), {0, 1, 2, 3})
+        self.assertEqual(ring.shards, [0, 1, 2, 3])
+
+    def test_matches_in_process_registries(self):
+        """Test that point reads, full reads and queries match the in-process registries."""
+        risks, flags, audit = self.local
+        service = self.service
+        self.assertEqual(len(service.risk_scores), 600)
+        self.assertEqual(service.risk_scores.get_risk("tx_0042")['risk_score'], 0.2)
+        self.assertIsNone(service.risk_scores.get_risk("missing"))
+        self.assertTrue(service.fraud_flags.is_flagged("tx_0009"))
+        self.assertFalse(service.fraud_flags.is_flagged("tx_0001"))
+        self.assertEqual(service.fraud_flags.get_flag("tx_0009")['reason'], "High risk")
+        self.assertEqual(set(service.risk_scores.get_all_risks()), set(risks.get_all_risks()))
+        self.assertEqual(set(service.fraud_flags.get_all_flags()), set(flags.get_all_flags()))
+        self.assertEqual(service.audit_trail.get_all_logs(), self.expected_logs)
+        self.assertEqual(service.audit_trail.get_logs_for_transaction("tx_0000"),
+                         audit.get_logs_for_transaction("tx_0000"))
+        self.assertEqual(sum(size['risk_scores'] for size in service.sizes().values()), 600)
+
+        for kwargs in ({'min_risk': 0.5, 'sort_by': 'tx_id', 'descending': True, 'offset': 30, 'limit': 40},
+                       {'tx_id_prefix': 'tx_01', 'sort_by': 'tx_id', 'limit': 25}):
+            self.assertEqual([item['tx_id'] for item in service.risk_scores.query(**kwargs)['items']],
+                             [item['tx_id'] for item in risks.query(**kwargs)['items']])
+        page = service.audit_trail.query(flagged_only=True, sort_by='timestamp', offset=10, limit=20)
+        expected = audit.query(flagged_only=True, fraud_registry=flags, sort_by='timestamp', offset=10, limit=20)
+        self.assertEqual(page['items'], expected['items'])
+        self.assertEqual(page['total'], expected['total'])
+        with self.assertRaises(ValueError):
+            service.risk_scores.query(sort_by='reason')
+
+    def test_add_shard_moves_only_reassigned_keys(self):
+        """Test that a new shard receives exactly the keys its ring points take over."""
+        old_owners = {tx_id: self.service.ring.owner(tx_id) for tx_id in self.tx_ids}
+        risks_before = self.service.risk_scores.get_all_risks()
+        logs_before = self.service.audit_trail.get_all_logs()
+        moved = self.service.add_shard()
+
+        self.assertEqual(moved['shard'], 2)
+        new_owners = {tx_id: self.service.ring.owner(tx_id) for tx_id in self.tx_ids}
+        reassigned = [tx_id for tx_id in self.tx_ids if new_owners[tx_id] != old_owners[tx_id]]
+        self.assertTrue(reassigned)
+        self.assertTrue(all(new_owners[tx_id] == 2 for tx_id in reassigned))
+        self.assertEqual(moved['risk_scores'], len(reassigned))
+        self.assertEqual(self.service.sizes()[2]['risk_scores'], len(reassigned))
+
+        self.assertEqual(len(self.service.risk_scores), 600)
+        self.assertEqual(self.service.risk_scores.get_all_risks(), risks_before)
+        self.assertEqual(self.service.audit_trail.get_all_logs(), logs_before)
+        for tx_id in reassigned[:20]:
+            self.assertEqual(self.service.risk_scores.get_risk(tx_id)['risk_score'],
+                             self.local[0].get_risk(tx_id)['risk_score'])
+            self.assertEqual(self.service.fraud_flags.is_flagged(tx_id), self.local[1].is_flagged(tx_id))
+
+        # Writes after the move land on the new owner
+        self.service.risk_scores.store_risk(reassigned[0], 0.99)
+        self.assertEqual(self.service.risk_scores.get_risk(reassigned[0])['risk_score'], 0.99)
+        self.assertEqual(len(self.service.risk_scores), 600)
+
+    def test_deep_pages_match_the_full_result(self):
+        """Test that consecutive sharded pages tile the in-process result, ties included."""
+        risks, flags, audit = self.local
+        for kwargs in ({'sort_by': 'risk_score'}, {'sort_by': 'tx_id', 'tx_id_prefix': 'tx_02'},
+                       {'sort_by': 'tx_id', 'min_risk': 0.3}):
+            for descending in (False, True):
+                expected = risks.query(descending=descending, limit=1000, **kwargs)['items']
+                items = []
+                for offset in range(0, len(expected) + 70, 70):
+                    page = self.service.risk_scores.query(descending=descending, offset=offset, limit=70,
+                                                          **kwargs)
+                    self.assertEqual(page['has_more'], offset + 70 < len(expected))
+                    items.extend(page['items'])
+                self.assertEqual([item[kwargs['sort_by']] for item in items],
+                                 [item[kwargs['sort_by']] for item in expected])
+                self.assertEqual(sorted(item['tx_id'] for item in items),
+                                 sorted(item['tx_id'] for item in expected))
+        page = self.service.audit_trail.query(sort_by='timestamp', descending=True, offset=500, limit=50)
+        expected = audit.query(sort_by='timestamp', descending=True, offset=500, limit=50)
+        self.assertEqual([log['timestamp'] for log in page['items']],
+                         [log['timestamp'] for log in expected['items']])
+        self.assertEqual(page['total'], 601)
+
+    def test_concurrent_writers_keep_shard_sequences_ordered(self):
+        """Test that audit batches written from several threads reach every shard in sequence order."""
+        import threading
+        from datetime import datetime
+        self.service.clear()
+        start = datetime(2024, 1, 1)
+
+        def write(worker):
+            for batch in range(20):
+                self.service.audit_trail.log_audits(
+                    [(f"tx_{index:04d}", worker / 10, start) for index in range(batch * 10, batch * 10 + 10)]
+                )
+
+        threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for logs in self.service._broadcast(None, 'all_logs'):
+            sequences = [sequence for sequence, _ in logs]
+            self.assertEqual(sequences, sorted(sequences))
+        logs = self.service.audit_trail.get_all_logs()
+        self.assertEqual(len(logs), 800)
+        for worker in range(4):
+            self.assertEqual([log['tx_id'] for log in logs if log['risk_score'] == worker / 10],
+                             [f"tx_{index:04d}" for index in range(200)])
+
+    def test_pipelined_write_errors_surface(self):
+        """Test that a failed pipelined write is raised by a later call, and clear() empties every shard."""
+        self.service.audit_trail.log_audits([("tx_bad", 0.5, "not a datetime")])
+        with self.assertRaises(AttributeError):
+            self.service.flush()
+        self.service.clear()
+        self.assertEqual(len(self.service.risk_scores), 0)
+        self.assertEqual(self.service.audit_trail.get_all_logs(), [])
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file